@@ -0,0 +1,259 @@
+import asyncio
+import atexit
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+import httpx
+from retry_policy import RETRYABLE_STATUS_CODES, call_with_retry_async, parse_retry_after
+
+# -------------------------------------
+# CONFIG
+# -------------------------------------
+GOOGLE_CALENDAR_BASE = "https://www.googleapis.com/calendar/v3"
+GRAPH_BASE = "https://graph.microsoft.com/v1.0"
+# httpcore scans every connection in a pool for every queued request, so one
+# large pool slows down quadratically under load (~100 req/s at 100 sockets
+# against a 50 ms stub). Connections are split over several small pools, and
+# requests wait on our own per-pool semaphore instead of httpcore's queue.
+POOL_COUNT = 10                   # AsyncClients per event loop
+POOL_CONNECTIONS = 10             # Sockets (all kept alive) per client
+KEEPALIVE_EXPIRY = 30.0           # Seconds an idle socket is kept
+# Connect/read budget for every request; a single call may pass its own timeout
+REQUEST_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+CALL_TIMEOUT = 60.0               # Seconds run_sync waits (retries included) before cancelling
+MAX_CONCURRENT_REQUESTS = 8       # Requests one gather_limited call keeps in flight
+
+# 403s with these reasons are Google's rate limiting, not a permission problem
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+# All I/O runs on one event loop in a background thread. Streamlit script
+# threads hand it coroutines through run_sync, so a slow Google or Graph
+# response occupies a socket, not a thread, and one loop serves every session.
+_loop = None
+_loop_lock = threading.Lock()
+# Client pools per event loop (httpx connections belong to the loop that opened them):
+# {loop: [{'client': AsyncClient, 'slots': Semaphore, 'in_flight': int}, ...]}
+_pools = {}
+
+
+# -------------------------------------
+# EVENT LOOP AND CLIENTS
+# -------------------------------------
+def _get_loop():
+    """Return the background I/O loop, starting its thread on first use"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="calendar-io", daemon=True).start()
+                _loop = loop
+    return _loop
+
+def _get_pools():
+    """Return the client pools for the running event loop, creating them on first use"""
+    loop = asyncio.get_running_loop()
+    pools = _pools.get(loop)
+    if pools is None:
+        limits = httpx.Limits(max_connections=POOL_CONNECTIONS, max_keepalive_connections=POOL_CONNECTIONS,
+                              keepalive_expiry=KEEPALIVE_EXPIRY)
+        pools = [{'client': httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT),
+                  'slots': asyncio.Semaphore(POOL_CONNECTIONS),
+                  'in_flight': 0}
+                 for _ in range(POOL_COUNT)]
+        _pools[loop] = pools
+    return pools
+
+@asynccontextmanager
+async def pooled_client():
+    """Borrow a shared AsyncClient with a free connection for one request.
+
+    Keep-alive connections are reused across users and requests, up to
+    POOL_COUNT * POOL_CONNECTIONS in total; beyond that, requests wait here.
+    """
+    pool = min(_get_pools(), key=lambda pool: pool['in_flight'])
+    pool['in_flight'] += 1
+    try:
+        async with pool['slots']:
+            yield pool['client']
+    finally:
+        pool['in_flight'] -= 1
+
+def run_sync(coro, timeout=CALL_TIMEOUT):
+    """Run a coroutine on the background I/O loop and return its result.
+
+    This is how the blocking API functions use the async client. If the
+    wait times out (TimeoutError) or the caller is interrupted, the
+    coroutine is cancelled, which closes its in-flight request.
+
+    Args:
+        coro: The coroutine to run.
+        timeout (float): Seconds to wait, or None to wait until it finishes.
+    """
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync called from the I/O loop; await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+async def gather_limited(calls, limit=MAX_CONCURRENT_REQUESTS):
+    """Await calls (zero-argument coroutine functions) with at most `limit` in flight.
+
+    Returns one result per call, in input order; a call that raised
+    contributes its exception instead.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(call):
+        async with semaphore:
+            return await call()
+
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+
+def close_async_clients():
+    """Close the background loop's clients and their pooled connections"""
+    if _loop is None or not _loop.is_running():
+        return
+    pools = _pools.pop(_loop, None)
+    if pools:
+        try:
+            run_sync(asyncio.gather(*(pool['client'].aclose() for pool in pools)), timeout=5)
+        except Exception:
+            pass
+
+atexit.register(close_async_clients)
+
+
+# -------------------------------------
+# REQUESTS
+# -------------------------------------
+def google_rate_limited(response):
+    """True if a Google 403 is rate limiting (rateLimitExceeded) rather than a real refusal"""
+    try:
+        details = response.json()["error"]
+        reason = (details.get("errors") or [{}])[0].get("reason") or details.get("status")
+    except (ValueError, KeyError, AttributeError, TypeError):
+        return False
+    return reason in RATE_LIMIT_REASONS
+
+def _retry_decision(response, error):
+    """Return (retry, retry_after) for one attempt"""
+    if error is not None:
+        return isinstance(error, httpx.TransportError), None
+    if response.status_code in RETRYABLE_STATUS_CODES or \
+            (response.status_code == 403 and google_rate_limited(response)):
+        return True, parse_retry_after(response.headers.get("Retry-After"))
+    return False, None
+
+async def calendar_request(method, url, token, user_key=None, **kwargs):
+    """
+    Send a request on a shared AsyncClient (see pooled_client).
+    Paths starting with '/' are resolved against GRAPH_BASE, a bearer
+    header is added, and 429/5xx (and Google's rate-limit 403) responses
+    are retried under the shared retry policy. Returns the final
+    httpx.Response; transport errors and timeouts are raised once retries
+    are exhausted.
+    """
+    if url.startswith("/"):
+        url = GRAPH_BASE + url
+    headers = {"Authorization": f"Bearer {token}"}
+    headers.update(kwargs.pop("headers", None) or {})
+
+    async def send():
+        async with pooled_client() as client:
+            return await client.request(method, url, headers=headers, **kwargs)
+
+    return await call_with_retry_async(send, _retry_decision, user_key=user_key)
+
+def _json(response):
+    """Parsed body of a successful response (None if empty); raises httpx.HTTPStatusError otherwise"""
+    response.raise_for_status()
+    return response.json() if response.content else None
+
+
+# -------------------------------------
+# GOOGLE CALENDAR
+# -------------------------------------
+# Each call takes an access token (see google_api_connection_v2) and raises
+# httpx.HTTPStatusError for an error response.
+
+def _google_events_url(calendar_id, event_id=None):
+    url = f"{GOOGLE_CALENDAR_BASE}/calendars/{quote(calendar_id, safe='')}/events"
+    return f"{url}/{quote(event_id, safe='')}" if event_id else url
+
+async def google_create_event(token, event_details, calendar_id="primary", user_key=None):
+    """Insert an event; returns the created event"""
+    return _json(await calendar_request("POST", _google_events_url(calendar_id), token,
+                                        user_key=user_key, json=event_details))
+
+async def google_get_event(token, event_id, calendar_id="primary", user_key=None):
+    """Fetch one event"""
+    return _json(await calendar_request("GET", _google_events_url(calendar_id, event_id), token,
+                                        user_key=user_key))
+
+async def google_update_event(token, event_id, event_details, calendar_id="primary", user_key=None):
+    """Replace an event; returns the updated event"""
+    return _json(await calendar_request("PUT", _google_events_url(calendar_id, event_id), token,
+                                        user_key=user_key, json=event_details))
+
+async def google_delete_event(token, event_id, calendar_id="primary", user_key=None):
+    """Delete an event (or a whole recurring series, given its master id)"""
+    _json(await calendar_request("DELETE", _google_events_url(calendar_id, event_id), token,
+                                 user_key=user_key))
+    return True
+
+async def google_list_events(token, calendar_id="primary", user_key=None, **params):
+    """List events, following nextPageToken; params are Calendar API query parameters"""
+    events = []
+    while True:
+        page = _json(await calendar_request("GET", _google_events_url(calendar_id), token,
+                                            user_key=user_key, params=params))
+        events.extend(page.get("items", []))
+        if not page.get("nextPageToken"):
+            return events
+        params = dict(params, pageToken=page["nextPageToken"])
+
+async def google_list_instances(token, event_id, calendar_id="primary", user_key=None, **params):
+    """List one page of a recurring event's instances; params are Calendar API query parameters"""
+    page = _json(await calendar_request("GET", f"{_google_events_url(calendar_id, event_id)}/instances", token,
+                                        user_key=user_key, params=params))
+    return page.get("items", [])
+
+
+
+# -------------------------------------
+# MICROSOFT GRAPH
+# -------------------------------------
+async def graph_create_event(token, event, endpoint="/me/events", user_key=None):
+    """Create an Outlook event; returns the created event"""
+    return _json(await calendar_request("POST", endpoint, token, user_key=user_key, json=event))
+
+async def graph_update_event(token, event_id, event, user_key=None):
+    """Patch an Outlook event; returns the updated event"""
+    return _json(await calendar_request("PATCH", f"/me/events/{event_id}", token,
+                                        user_key=user_key, json=event))
+
+async def graph_delete_event(token, event_id, user_key=None):
+    """Delete an Outlook event"""
+    _json(await calendar_request("DELETE", f"/me/events/{event_id}", token, user_key=user_key))
+    return True
+
+async def graph_list_events(token, endpoint="/me/events", user_key=None, **params):
+    """List Outlook events, following @odata.nextLink; params are OData query options"""
+    events = []
+    url = endpoint
+    while url:
+        page = _json(await calendar_request("GET", url, token, user_key=user_key, params=params))
+        events.extend(page.get("value", []))
+        # nextLink already carries the query string
+        url, params = page.get("@odata.nextLink"), None
+    return events
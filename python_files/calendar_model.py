@@ -0,0 +1,117 @@
+from datetime import date, datetime, time
+from recurrence import DAY_CODES as _DAY_CODE_LIST, DAY_NAMES
+
+# -------------------------------------
+# TIME SLOTS
+# -------------------------------------
+# Class slots start at 7:45 AM and end at 5:30 PM, each 60 minutes with a 15 minute break in between
+TIME_SLOTS = [
+    "7:45 AM - 8:45 AM",
+    "9:00 AM - 10:00 AM",
+    "10:15 AM - 11:15 AM",
+    "11:30 AM - 12:30 PM",
+    "12:45 PM - 1:45 PM",
+    "2:00 PM - 3:00 PM",
+    "3:15 PM - 4:15 PM",
+    "4:30 PM - 5:30 PM"
+]
+
+# Days a class can meet on
+WEEKDAYS = DAY_NAMES[:5]
+
+# Day name -> RFC 5545 day code ("Monday" -> "MO")
+DAY_CODES = dict(zip(DAY_NAMES, _DAY_CODE_LIST))
+
+# Day name -> bit in a weekday mask (Monday = 1, Tuesday = 2, ... Sunday = 64)
+DAY_BITS = {day: 1 << index for index, day in enumerate(DAY_NAMES)}
+
+def day_mask(days):
+    """Weekday bitmask for a list of day names; unknown names are ignored"""
+    mask = 0
+    for day in days or []:
+        mask |= DAY_BITS.get(day, 0)
+    return mask
+
+def days_from_mask(mask):
+    """Day names (Monday first) set in a weekday bitmask"""
+    return [day for day in DAY_NAMES if mask & DAY_BITS[day]]
+
+def _clock_minutes(clock):
+    """Minutes after midnight for a clock string like '7:45 AM'"""
+    parsed = datetime.strptime(clock.strip(), "%I:%M %p")
+    return parsed.hour * 60 + parsed.minute
+
+def _parse_slot(slot):
+    start, end = slot.split(' - ')
+    return _clock_minutes(start), _clock_minutes(end)
+
+# Slot string -> (start_minute, end_minute), parsed once
+SLOT_MINUTES = {slot: _parse_slot(slot) for slot in TIME_SLOTS}
+
+# Slot string -> index in TIME_SLOTS
+SLOT_INDEX = {slot: index for index, slot in enumerate(TIME_SLOTS)}
+
+def slot_minutes(slot):
+    """(start_minute, end_minute) of a time slot.
+
+    Standard slots are a table lookup; anything else (e.g. a slot that came
+    back from a calendar sync) is parsed. Raises ValueError if unparseable.
+    """
+    minutes = SLOT_MINUTES.get(slot)
+    if minutes is None:
+        minutes = _parse_slot(slot)
+    return minutes
+
+def event_minutes(event):
+    """(start_minute, end_minute) of an event dict, using the stored columns when present.
+
+    Returns None if the event has neither stored minutes nor a parseable time slot.
+    """
+    if event.get('start_minute') is not None and event.get('end_minute') is not None:
+        return event['start_minute'], event['end_minute']
+    try:
+        return slot_minutes(event['time_slot'])
+    except (KeyError, AttributeError, ValueError):
+        return None
+
+def slot_datetimes(day, slot):
+    """Start and end datetimes of a time slot on a given day ('YYYY-MM-DD' or date)"""
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    start, end = slot_minutes(slot)
+    return (datetime.combine(day, time(start // 60, start % 60)),
+            datetime.combine(day, time(end // 60, end % 60)))
+
+
+# -------------------------------------
+# SEMESTERS
+# -------------------------------------
+# Semester -> ((start month, day), (end month, day))
+SEMESTERS = {
+    "Fall": ((9, 1), (12, 31)),
+    "Winter": ((1, 1), (4, 30)),
+    "Spring": ((4, 1), (7, 31))
+}
+
+def _build_semester_windows(today):
+    """Semester -> (first day, last day), using this year's dates if today falls
+    inside the semester and next year's otherwise"""
+    windows = {}
+    for semester, ((start_month, start_day), (end_month, end_day)) in SEMESTERS.items():
+        year = today.year
+        if not date(year, start_month, start_day) <= today <= date(year, end_month, end_day):
+            year += 1
+        windows[semester] = (date(year, start_month, start_day), date(year, end_month, end_day))
+    return windows
+
+_windows_built_on = date.today()
+SEMESTER_WINDOWS = _build_semester_windows(_windows_built_on)
+
+def get_semester_window(semester):
+    """(first day, last day) of a semester; the table is rebuilt only when the date changes"""
+    global _windows_built_on, SEMESTER_WINDOWS
+    today = date.today()
+    if today != _windows_built_on:
+        SEMESTER_WINDOWS = _build_semester_windows(today)
+        _windows_built_on = today
+    return SEMESTER_WINDOWS[semester]
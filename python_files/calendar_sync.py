@@ -0,0 +1,242 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import httpx
+from googleapiclient.errors import HttpError
+from database_manager import apply_calendar_changes, get_sync_token, resolve_outlook_removals, store_sync_token
+from graph_client import graph_request
+from recurrence import DAY_CODES, DAY_NAMES, parse_recurrence
+
+# -------------------------------------
+# CONFIG
+# -------------------------------------
+GOOGLE_PROVIDER = "google"
+GOOGLE_PAGE_SIZE = 250  # events().list maxResults per page
+OUTLOOK_PROVIDER = "outlook"
+OUTLOOK_PAGE_SIZE = 100  # odata.maxpagesize for calendarView/delta
+OUTLOOK_WINDOW_PAST_DAYS = 30    # calendarView/delta needs a fixed window;
+OUTLOOK_WINDOW_FUTURE_DAYS = 365  # it is chosen once, on the initial sync
+# Google and Graph report times in the calendar's zone or UTC unless asked
+# for one; the scheduler's time slots are wall-clock times in the zone it
+# creates events in
+SCHEDULER_TIMEZONE = "America/Denver"
+
+# RFC 5545 day codes back to the day names stored in the events table
+_DAY_NAMES_BY_CODE = dict(zip(DAY_CODES, DAY_NAMES))
+
+
+# -------------------------------------
+# EVENT MAPPING
+# -------------------------------------
+def _format_clock(moment):
+    """Format a datetime like the scheduler's time slots, e.g. '7:45 AM'"""
+    hour = moment.hour % 12 or 12
+    return f"{hour}:{moment.minute:02d} {'AM' if moment.hour < 12 else 'PM'}"
+
+def google_event_to_update(event):
+    """Map a Google Calendar event onto the events table columns.
+
+    Fields that can't be derived from the event are left as None so the
+    stored value is kept.
+    """
+    update = {
+        'event_id': event['id'],
+        'class_name': event.get('summary'),
+        'location': event.get('location'),
+        'time_slot': None,
+        'days': None,
+        'start_date': None,
+        'end_date': None
+    }
+    start = event.get('start', {}).get('dateTime')
+    end = event.get('end', {}).get('dateTime')
+    if start and end:
+        # Listed with timeZone=SCHEDULER_TIMEZONE; converted anyway in case an offset differs
+        zone = ZoneInfo(SCHEDULER_TIMEZONE)
+        start_dt = datetime.fromisoformat(start.replace("Z", "+00:00")).astimezone(zone)
+        end_dt = datetime.fromisoformat(end.replace("Z", "+00:00")).astimezone(zone)
+        update['time_slot'] = f"{_format_clock(start_dt)} - {_format_clock(end_dt)}"
+        update['start_date'] = start_dt.strftime("%Y-%m-%d")
+
+    rule, _ = parse_recurrence(event.get('recurrence'))
+    if rule.get("BYDAY"):
+        update['days'] = [_DAY_NAMES_BY_CODE[code] for code in rule["BYDAY"].split(",")
+                          if code in _DAY_NAMES_BY_CODE]
+    if rule.get("UNTIL"):
+        update['end_date'] = datetime.strptime(rule["UNTIL"][:8], "%Y%m%d").strftime("%Y-%m-%d")
+    return update
+
+
+# -------------------------------------
+# GOOGLE INCREMENTAL SYNC
+# -------------------------------------
+def _list_google_pages(service, execute, sync_token):
+    """Yield pages of events().list, following nextPageToken"""
+    page_token = None
+    while True:
+        params = {"calendarId": "primary", "maxResults": GOOGLE_PAGE_SIZE, "timeZone": SCHEDULER_TIMEZONE}
+        if sync_token:
+            params["syncToken"] = sync_token
+        if page_token:
+            params["pageToken"] = page_token
+        page = execute(service.events().list(**params))
+        yield page
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return
+
+def sync_google_events(service, user_id, execute=None):
+    """Pull calendar changes since the last sync into the local events table.
+
+    The first run (or a run after the server expires the token with 410
+    Gone) lists the whole calendar once; every later run sends the stored
+    syncToken, so only events that changed since then are transferred.
+    Pages are applied as they arrive. Only events the scheduler created
+    (already in the events table) are updated or removed.
+
+    Args:
+        service: Google Calendar API service.
+        user_id (str): Owner of the local events to reconcile.
+        execute (callable): Runs a request; defaults to request.execute().
+            Pass a retrying executor to apply the shared retry policy.
+
+    Returns:
+        dict: 'updated' and 'removed' event IDs, and 'full_sync' (bool).
+    """
+    execute = execute or (lambda request: request.execute())
+    sync_token = get_sync_token(user_id, GOOGLE_PROVIDER)
+    result = {'updated': [], 'removed': [], 'full_sync': sync_token is None}
+
+    while True:
+        try:
+            for page in _list_google_pages(service, execute, sync_token):
+                items = page.get("items", [])
+                updates = [google_event_to_update(event) for event in items if event.get("status") != "cancelled"]
+                removed = [event["id"] for event in items if event.get("status") == "cancelled"]
+                updated_ids, removed_ids = apply_calendar_changes(user_id, updates, removed)
+                result['updated'].extend(updated_ids)
+                result['removed'].extend(removed_ids)
+
+                # Only the last page carries the token for the next sync
+                if "nextSyncToken" in page:
+                    store_sync_token(user_id, GOOGLE_PROVIDER, page["nextSyncToken"])
+            return result
+        except HttpError as error:
+            if error.resp.status != 410 or sync_token is None:
+                raise
+            # 410 Gone: the sync token expired or was invalidated; start over
+            store_sync_token(user_id, GOOGLE_PROVIDER, None)
+            sync_token = None
+            result['full_sync'] = True
+
+
+# -------------------------------------
+# OUTLOOK DELTA SYNC
+# -------------------------------------
+def _graph_local_time(value):
+    """Parse a Graph dateTimeTimeZone as a naive wall-clock time in SCHEDULER_TIMEZONE"""
+    # Graph sends fractional seconds (7 digits) that fromisoformat rejects
+    moment = datetime.fromisoformat(value['dateTime'].split(".")[0])
+    zone = value.get('timeZone')
+    if zone and zone != SCHEDULER_TIMEZONE:
+        try:
+            moment = moment.replace(tzinfo=ZoneInfo(zone)).astimezone(ZoneInfo(SCHEDULER_TIMEZONE)).replace(tzinfo=None)
+        except (ZoneInfoNotFoundError, ValueError):
+            # A Windows zone name the Prefer header should have prevented; keep the time as sent
+            pass
+    return moment
+
+def outlook_event_to_update(event):
+    """Map a Microsoft Graph calendarView item onto the events table columns.
+
+    calendarView returns occurrences, so they are folded onto their series
+    master's ID; only per-occurrence fields (name, location, time) are set.
+    sync_outlook_events does not pass exceptions (moved occurrences) here.
+    """
+    update = {
+        'event_id': event.get('seriesMasterId') or event['id'],
+        'class_name': event.get('subject'),
+        'location': (event.get('location') or {}).get('displayName'),
+        'time_slot': None,
+        'days': None,
+        'start_date': None,
+        'end_date': None
+    }
+    start = event.get('start') or {}
+    end = event.get('end') or {}
+    if start.get('dateTime') and end.get('dateTime'):
+        start_dt = _graph_local_time(start)
+        end_dt = _graph_local_time(end)
+        update['time_slot'] = f"{_format_clock(start_dt)} - {_format_clock(end_dt)}"
+    return update
+
+def _iter_outlook_delta_pages(token, delta_link):
+    """Yield calendarView/delta pages one at a time, following @odata.nextLink"""
+    headers = {"Prefer": f'odata.maxpagesize={OUTLOOK_PAGE_SIZE}, outlook.timezone="{SCHEDULER_TIMEZONE}"'}
+    if delta_link:
+        url, params = delta_link, None
+    else:
+        now = datetime.now(timezone.utc)
+        url = "/me/calendarView/delta"
+        params = {
+            "startDateTime": (now - timedelta(days=OUTLOOK_WINDOW_PAST_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "endDateTime": (now + timedelta(days=OUTLOOK_WINDOW_FUTURE_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        }
+    while url:
+        response = graph_request("GET", url, token, headers=headers, params=params)
+        response.raise_for_status()
+        page = response.json()
+        yield page
+        # nextLink/deltaLink already carry every query parameter
+        url, params = page.get("@odata.nextLink"), None
+
+def sync_outlook_events(token, user_id):
+    """Pull Outlook calendar changes since the last sync into the local events table.
+
+    Built on Graph calendarView/delta: the first run walks the sync window
+    once; later runs resume from the stored deltaLink, so each refresh
+    costs only as much as what changed. Pages are streamed and applied one
+    at a time rather than loaded whole. A 410 (sync state expired) restarts
+    with a full sync. Removals arrive as occurrence IDs; a stored series is
+    removed once every occurrence seen of it has been removed.
+
+    Returns:
+        dict: 'updated' and 'removed' event IDs, and 'full_sync' (bool).
+    """
+    delta_link = get_sync_token(user_id, OUTLOOK_PROVIDER)
+    result = {'updated': [], 'removed': [], 'full_sync': delta_link is None}
+
+    while True:
+        try:
+            for page in _iter_outlook_delta_pages(token, delta_link):
+                items = page.get("value", [])
+                # Several occurrences of one series collapse to one update
+                updates = {}
+                occurrences = []
+                removed = []
+                for event in items:
+                    if "@removed" in event:
+                        removed.append(event["id"])
+                        continue
+                    if event.get('seriesMasterId'):
+                        occurrences.append((event['id'], event['seriesMasterId']))
+                    # A moved or renamed occurrence says nothing about the rest of
+                    # its series; only regular occurrences update the stored row
+                    if event.get('type') == "exception":
+                        continue
+                    update = outlook_event_to_update(event)
+                    updates[update['event_id']] = update
+                removed = resolve_outlook_removals(user_id, occurrences, removed)
+                updated_ids, removed_ids = apply_calendar_changes(user_id, updates.values(), removed)
+                result['updated'].extend(updated_ids)
+                result['removed'].extend(removed_ids)
+
+                # Only the last page carries the link for the next sync
+                if "@odata.deltaLink" in page:
+                    store_sync_token(user_id, OUTLOOK_PROVIDER, page["@odata.deltaLink"])
+            return result
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code != 410 or delta_link is None:
+                raise
+            store_sync_token(user_id, OUTLOOK_PROVIDER, None)
+            delta_link = None
+            result['full_sync'] = True
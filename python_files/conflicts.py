@@ -0,0 +1,76 @@
+from bisect import bisect_left
+from calendar_model import event_minutes, slot_minutes
+from recurrence import DAY_NAMES
+
+# -------------------------------------
+# INTERVAL INDEX
+# -------------------------------------
+# The index maps a weekday (0 = Monday) to two parallel lists kept sorted by
+# start minute: 'starts' for bisecting and 'entries' holding
+# (start_minute, end_minute, start_date, end_date, event). Anything that
+# starts at or after a candidate's end can't overlap it, so each lookup only
+# scans the prefix before that point.
+
+def _entry(event):
+    """Index entry for an event dict, or None if its time slot can't be parsed"""
+    minutes = event_minutes(event)
+    if minutes is None:
+        return None
+    start, end = minutes
+    return start, end, event.get('start_date'), event.get('end_date'), event
+
+def add_to_index(index, event):
+    """Add an event dict (events table shape: days, time_slot, start_date, end_date) to the index"""
+    entry = _entry(event)
+    if entry is None:
+        return
+    for day in event.get('days') or []:
+        if day not in DAY_NAMES:
+            continue
+        bucket = index.setdefault(DAY_NAMES.index(day), {'starts': [], 'entries': []})
+        position = bisect_left(bucket['starts'], entry[0])
+        bucket['starts'].insert(position, entry[0])
+        bucket['entries'].insert(position, entry)
+
+def build_conflict_index(events):
+    """Build an interval index over a user's events (e.g. from get_events_from_db)"""
+    index = {}
+    for event in events:
+        add_to_index(index, event)
+    return index
+
+def _dates_overlap(start_a, end_a, start_b, end_b):
+    """ISO date ranges overlap; a missing bound is treated as open-ended"""
+    return (start_a is None or end_b is None or start_a <= end_b) and \
+           (start_b is None or end_a is None or start_b <= end_a)
+
+def find_conflicts(index, days, time_slot, start_date=None, end_date=None):
+    """Events in the index that meet at the same time as a candidate class.
+
+    Two meetings conflict when they share a weekday, their time slots
+    overlap and their date ranges overlap. Back-to-back slots don't conflict.
+
+    Args:
+        index (dict): From build_conflict_index().
+        days (list): Day names the candidate meets on.
+        time_slot (str): e.g. "9:00 AM - 10:00 AM".
+        start_date, end_date (str): ISO dates bounding the candidate.
+
+    Returns:
+        list: Conflicting event dicts, each listed once.
+    """
+    start, end = slot_minutes(time_slot)
+    conflicts = []
+    seen = set()
+    for day in days:
+        if day not in DAY_NAMES:
+            continue
+        bucket = index.get(DAY_NAMES.index(day))
+        if bucket is None:
+            continue
+        for entry_start, entry_end, entry_first, entry_last, event in bucket['entries'][:bisect_left(bucket['starts'], end)]:
+            if entry_end > start and _dates_overlap(entry_first, entry_last, start_date, end_date) \
+                    and id(event) not in seen:
+                seen.add(id(event))
+                conflicts.append(event)
+    return conflicts
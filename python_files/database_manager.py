@@ -1,27 +1,63 @@
+import atexit
+import queue
 import sqlite3
+import threading
 import streamlit as st
 import json
+from contextlib import contextmanager
+from calendar_model import SEMESTERS, day_mask, slot_minutes
+from read_cache import cached_read, invalidate_all, invalidate_user
 
 # Database configuration
 DB_NAME = 'scheduled_events.db'
 
-def init_database():
-    """Initialize the SQLite database with proper schema"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Create users table
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
+# Connection pool configuration. Streamlit runs every rerun on its own thread,
+# so connections are pooled per process rather than pinned to a thread.
+POOL_SIZE = 5
+CONNECT_TIMEOUT = 5.0
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",       # readers don't block the writer
+    "PRAGMA synchronous=NORMAL",     # safe with WAL, avoids an fsync per commit
+    "PRAGMA busy_timeout=5000",      # wait on a locked database instead of failing
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",       # 8 MB page cache per connection
+)
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+def _encode_schedule(days, time_slot):
+    """(day_mask, start_minute, end_minute) columns for an event's days and time slot.
+
+    Minutes are None when the slot isn't in the 'H:MM AM - H:MM PM' form.
+    """
+    try:
+        start_minute, end_minute = slot_minutes(time_slot)
+    except (AttributeError, ValueError):
+        start_minute, end_minute = None, None
+    return day_mask(days), start_minute, end_minute
+
+def _backfill_schedule_columns(conn):
+    """Fill day_mask/start_minute/end_minute for rows written before they existed"""
+    rows = conn.execute("SELECT event_id, days, time_slot FROM events").fetchall()
+    conn.executemany("UPDATE events SET day_mask = ?, start_minute = ?, end_minute = ? WHERE event_id = ?",
+                     [_encode_schedule(days.split(',') if days else [], time_slot) + (event_id,)
+                      for event_id, days, time_slot in rows])
+
+# Versioned schema migrations, applied in order the first time a connection
+# is checked out in this process. Append new entries; never edit one that
+# has already shipped. A step is either a SQL statement or a callable that
+# takes the connection (for data backfills).
+MIGRATIONS = [
+    (1, "initial users and events tables", (
+        '''CREATE TABLE IF NOT EXISTS users (
                 user_id TEXT PRIMARY KEY,
                 email TEXT UNIQUE NOT NULL,
                 name TEXT,
                 credentials TEXT NOT NULL,
                 created_at TEXT NOT NULL,
                 last_login TEXT
-                )''')
-    
-    # Create events table with user_id reference
-    c.execute('''CREATE TABLE IF NOT EXISTS events (
+                )''',
+        '''CREATE TABLE IF NOT EXISTS events (
                 event_id TEXT PRIMARY KEY,
                 user_id TEXT NOT NULL,
                 class_name TEXT NOT NULL,
@@ -32,165 +68,874 @@ def init_database():
                 end_date TEXT NOT NULL,
                 created_at TEXT NOT NULL,
                 FOREIGN KEY(user_id) REFERENCES users(user_id)
-                )''')
-    conn.commit()
-    conn.close()
+                )''',
+    )),
+    # event_id lookups already use the primary key. This index served the
+    # per-user listing and the user + date range filter until migration 6's
+    # index took over its (user_id, start_date) prefix; migration 9 drops it.
+    (2, "index events by user and date range", (
+        "CREATE INDEX IF NOT EXISTS idx_events_user_dates ON events (user_id, start_date, end_date)",
+    )),
+    (3, "remember the working Graph events endpoint per account", (
+        '''CREATE TABLE IF NOT EXISTS graph_endpoints (
+                account_key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+                )''',
+    )),
+    (4, "incremental calendar sync state per user and provider", (
+        '''CREATE TABLE IF NOT EXISTS sync_state (
+                user_id TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                sync_token TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (user_id, provider)
+                )''',
+    )),
+    # days and time_slot stay as the display values; these columns carry the
+    # same information in a form SQL can filter on. Weekday tests are a bit
+    # AND on day_mask, which rides in the index so no row is fetched to test it.
+    (5, "weekday bitmask and start/end minutes on events", (
+        "ALTER TABLE events ADD COLUMN day_mask INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE events ADD COLUMN start_minute INTEGER",
+        "ALTER TABLE events ADD COLUMN end_minute INTEGER",
+        _backfill_schedule_columns,
+        "CREATE INDEX IF NOT EXISTS idx_events_user_start_minute ON events (user_id, start_minute, day_mask)",
+    )),
+    # The Manage tab pages through a user's events in (start_date, event_id)
+    # order. With event_id in the index a page is a range scan that starts
+    # right after the previous page's last row, however deep the page is.
+    (6, "index events by user, start date and id for keyset paging", (
+        "CREATE INDEX IF NOT EXISTS idx_events_user_start_id ON events (user_id, start_date, event_id)",
+    )),
+    # Calendar writes are queued here and drained by outbox.py's workers.
+    # next_attempt_at (epoch seconds) is when a pending op is due, or when a
+    # running op's lease runs out and another worker may take it over.
+    (7, "outbox of queued calendar writes", (
+        '''CREATE TABLE IF NOT EXISTS outbox (
+                op_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                op TEXT NOT NULL,
+                idempotency_key TEXT UNIQUE NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                result TEXT,
+                created_at TEXT NOT NULL,
+                finished_at TEXT
+                )''',
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_job ON outbox (job_id)",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_event ON outbox (event_id, status)",
+    )),
+    # Graph delta reports a deleted series as @removed occurrence IDs, with
+    # no seriesMasterId. Occurrences seen in earlier syncs are remembered
+    # here so a removal can be traced back to the stored series master.
+    (8, "map Outlook occurrence IDs to their series master", (
+        '''CREATE TABLE IF NOT EXISTS outlook_occurrences (
+                user_id TEXT NOT NULL,
+                occurrence_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                PRIMARY KEY (user_id, occurrence_id)
+                )''',
+        "CREATE INDEX IF NOT EXISTS idx_outlook_occurrences_event ON outlook_occurrences (user_id, event_id)",
+    )),
+    # idx_events_user_start_id (migration 6) has the same (user_id,
+    # start_date) prefix, so the planner picks it for every per-user, date
+    # range and keyset query, and the older index was only slowing writes.
+    # The overlap test on end_date now reads the row.
+    (9, "drop idx_events_user_dates, superseded by idx_events_user_start_id", (
+        "DROP INDEX IF EXISTS idx_events_user_dates",
+    )),
+]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _open_connection():
+    """Open a new SQLite connection with the tuned pragmas applied"""
+    conn = sqlite3.connect(DB_NAME, timeout=CONNECT_TIMEOUT, check_same_thread=False)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _apply_migrations(conn):
+    """Bring the schema up to the latest version in a single transaction"""
+    from datetime import datetime
+
+    with conn:
+        # IMMEDIATE takes the write lock up front so two processes starting
+        # at once can't both apply the same migration
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TEXT NOT NULL
+                    )''')
+        applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+        for version, description, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute("INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                         (version, description, datetime.now().isoformat()))
+
+def _ensure_schema(conn):
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            _apply_migrations(conn)
+            _schema_ready = True
+
+def _checkout():
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    if not _schema_ready:
+        try:
+            _ensure_schema(conn)
+        except Exception:
+            conn.close()
+            raise
+    return conn
+
+def _checkin(conn):
+    # Never hand a half-finished transaction to the next caller
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+@contextmanager
+def get_connection():
+    """Borrow a pooled connection for the duration of a with-block.
+
+    A connection is only ever used by one thread at a time; it goes back
+    to the pool (or is closed if the pool is full) when the block exits.
+    """
+    conn = _checkout()
+    try:
+        yield conn
+    finally:
+        _checkin(conn)
+
+@contextmanager
+def transaction():
+    """Borrow a pooled connection and commit the block as one transaction"""
+    with get_connection() as conn:
+        with conn:
+            yield conn
+
+def close_all_connections():
+    """Close every idle pooled connection (registered to run at exit)"""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+atexit.register(close_all_connections)
+
+def init_database():
+    """Initialize the SQLite database with proper schema.
+
+    Migrations run once per process; after that this is a no-op.
+    """
+    with get_connection():
+        pass
 
 def store_user(user_id, email, name, credentials_json):
     """Store or update user credentials"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
     from datetime import datetime
     
     try:
-        c.execute("""INSERT OR REPLACE INTO users 
-                    (user_id, email, name, credentials, created_at, last_login) 
-                    VALUES (?, ?, ?, ?, ?, ?)""",
-                  (user_id, email, name, credentials_json, datetime.now().isoformat(), datetime.now().isoformat()))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("""INSERT OR REPLACE INTO users 
+                        (user_id, email, name, credentials, created_at, last_login) 
+                        VALUES (?, ?, ?, ?, ?, ?)""",
+                      (user_id, email, name, credentials_json, datetime.now().isoformat(), datetime.now().isoformat()))
         return True
     except Exception as e:
         st.error(f"Error storing user: {e}")
         return False
-    finally:
-        conn.close()
 
 def get_user(user_id):
     """Retrieve user by ID"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    try:
-        c.execute("SELECT user_id, email, name, credentials FROM users WHERE user_id = ?", (user_id,))
-        row = c.fetchone()
-        if row:
-            return {
-                'user_id': row[0],
-                'email': row[1],
-                'name': row[2],
-                'credentials': row[3]
-            }
-        return None
-    finally:
-        conn.close()
+    with get_connection() as conn:
+        row = conn.execute("SELECT user_id, email, name, credentials FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    if row:
+        return {
+            'user_id': row[0],
+            'email': row[1],
+            'name': row[2],
+            'credentials': row[3]
+        }
+    return None
 
 def get_user_by_email(email):
     """Retrieve user by email"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    try:
-        c.execute("SELECT user_id, email, name, credentials FROM users WHERE email = ?", (email,))
-        row = c.fetchone()
-        if row:
-            return {
-                'user_id': row[0],
-                'email': row[1],
-                'name': row[2],
-                'credentials': row[3]
-            }
-        return None
-    finally:
-        conn.close()
+    with get_connection() as conn:
+        row = conn.execute("SELECT user_id, email, name, credentials FROM users WHERE email = ?", (email,)).fetchone()
+    if row:
+        return {
+            'user_id': row[0],
+            'email': row[1],
+            'name': row[2],
+            'credentials': row[3]
+        }
+    return None
 
 def store_event_in_db(event_info, user_id):
     """Store event information in the database"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
     try:
-        c.execute("""INSERT INTO events 
-                    (event_id, user_id, class_name, location, time_slot, days, start_date, end_date, created_at) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                  (event_info['event_id'], user_id, event_info['class_name'], event_info['location'], 
-                   event_info['time_slot'], ','.join(event_info['days']), 
-                   event_info['start_date'], event_info['end_date'], event_info['created_at']))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute("""INSERT INTO events 
+                        (event_id, user_id, class_name, location, time_slot, days, start_date, end_date, created_at, 
+                         day_mask, start_minute, end_minute) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                      (event_info['event_id'], user_id, event_info['class_name'], event_info['location'], 
+                       event_info['time_slot'], ','.join(event_info['days']), 
+                       event_info['start_date'], event_info['end_date'], event_info['created_at'])
+                      + _encode_schedule(event_info['days'], event_info['time_slot']))
+        _mark_data_changed(user_id)
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
-def get_events_from_db(user_id=None):
-    """Retrieve all events from the database, optionally filtered by user_id"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+def _row_to_event(row):
+    """Convert an events row (SELECT * column order) into an event dict"""
+    return {
+        'event_id': row[0],
+        'user_id': row[1],
+        'class_name': row[2],
+        'location': row[3],
+        'time_slot': row[4],
+        'days': row[5].split(',') if row[5] else [],
+        'start_date': row[6],
+        'end_date': row[7],
+        'created_at': row[8],
+        'day_mask': row[9],
+        'start_minute': row[10],
+        'end_minute': row[11]
+    }
+
+def _mark_data_changed(user_id):
+    """Invalidation hook: drop cached reads for the user whose events were written"""
+    invalidate_user(user_id)
+
+_UPSERT_EVENT_SQL = """INSERT INTO events 
+                    (event_id, user_id, class_name, location, time_slot, days, start_date, end_date, created_at, 
+                     day_mask, start_minute, end_minute) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(event_id) DO UPDATE SET 
+                        class_name = excluded.class_name, location = excluded.location, 
+                        time_slot = excluded.time_slot, days = excluded.days, 
+                        start_date = excluded.start_date, end_date = excluded.end_date, 
+                        day_mask = excluded.day_mask, start_minute = excluded.start_minute, 
+                        end_minute = excluded.end_minute
+                    WHERE events.user_id = excluded.user_id 
+                      AND (events.class_name, events.location, events.time_slot, events.days, 
+                           events.start_date, events.end_date) 
+                          IS NOT (excluded.class_name, excluded.location, excluded.time_slot, 
+                                  excluded.days, excluded.start_date, excluded.end_date)"""
+
+_UPDATE_EVENT_SQL = """UPDATE events SET 
+                    class_name = ?, location = ?, time_slot = ?, days = ?, 
+                    day_mask = ?, start_minute = ?, end_minute = ? 
+                    WHERE event_id = ? 
+                    RETURNING user_id"""
+
+def _event_row(event_info, user_id):
+    """Parameters for _UPSERT_EVENT_SQL"""
+    return ((event_info['event_id'], user_id, event_info['class_name'], event_info['location'],
+             event_info['time_slot'], ','.join(event_info['days']),
+             event_info['start_date'], event_info['end_date'], event_info['created_at'])
+            + _encode_schedule(event_info['days'], event_info['time_slot']))
+
+def _update_params(event_id, updated_info):
+    """Parameters for _UPDATE_EVENT_SQL"""
+    return ((updated_info['class_name'], updated_info['location'],
+             updated_info['time_slot'], ','.join(updated_info['days']))
+            + _encode_schedule(updated_info['days'], updated_info['time_slot']) + (event_id,))
+
+def store_events_in_db(events, user_id):
+    """Store many events in one transaction.
+
+    Existing rows owned by the same user are updated in place; rows that
+    are unchanged or belong to another user are skipped.
+
+    Returns:
+        dict: Counts of 'inserted', 'updated' and 'skipped' events.
+    """
+    rows = [_event_row(event_info, user_id) for event_info in events]
+    if not rows:
+        return {'inserted': 0, 'updated': 0, 'skipped': 0}
+    
+    with transaction() as conn:
+        # Take the write lock before reading, so no other connection can add
+        # one of these IDs between the lookup and the upsert
+        conn.execute("BEGIN IMMEDIATE")
+        event_ids = list({row[0] for row in rows})
+        existing = set()
+        for start in range(0, len(event_ids), 500):
+            chunk = event_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(row[0] for row in conn.execute(
+                f"SELECT event_id FROM events WHERE event_id IN ({placeholders})", chunk))
+        changes_before = conn.total_changes
+        conn.executemany(_UPSERT_EVENT_SQL, rows)
+        changed = conn.total_changes - changes_before
+    inserted = len(event_ids) - len(existing)
+    if changed:
+        _mark_data_changed(user_id)
+    return {
+        'inserted': inserted,
+        'updated': changed - inserted,
+        'skipped': len(rows) - changed
+    }
+
+def _event_filters(user_id=None, start_date=None, end_date=None, days=None,
+                   min_start_minute=None, max_end_minute=None, class_name=None, semester=None):
+    """WHERE clauses and parameters shared by get_events_from_db and count_events"""
+    clauses = []
+    params = []
+    if user_id:
+        clauses.append("user_id = ?")
+        params.append(user_id)
+    if end_date:
+        clauses.append("start_date <= ?")
+        params.append(end_date)
+    if start_date:
+        clauses.append("end_date >= ?")
+        params.append(start_date)
+    if days:
+        clauses.append("day_mask & ? != 0")
+        params.append(day_mask(days))
+    if min_start_minute is not None:
+        clauses.append("start_minute >= ?")
+        params.append(min_start_minute)
+    if max_end_minute is not None:
+        clauses.append("end_minute <= ?")
+        params.append(max_end_minute)
+    if class_name:
+        # Case-insensitive substring match; % and _ typed by the user are literal
+        escaped = class_name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("class_name LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    if semester:
+        # Events whose series starts within the semester's months, in any year
+        (start_month, start_day), (end_month, end_day) = SEMESTERS[semester]
+        clauses.append("substr(start_date, 6, 5) BETWEEN ? AND ?")
+        params.extend([f"{start_month:02d}-{start_day:02d}", f"{end_month:02d}-{end_day:02d}"])
+    return clauses, params
+
+def get_events_from_db(user_id=None, start_date=None, end_date=None, days=None,
+                       min_start_minute=None, max_end_minute=None, class_name=None,
+                       semester=None, limit=None, after=None):
+    """Retrieve all events from the database, optionally filtered by user_id.
+
+    start_date/end_date ('YYYY-MM-DD') limit the result to events whose
+    date range overlaps that window. days (day names) keeps events that
+    meet on any of those days, and min_start_minute/max_end_minute (minutes
+    after midnight) bound the time of day; e.g. "Tuesday after noon" is
+    days=["Tuesday"], min_start_minute=720. class_name matches part of the
+    name, ignoring case, and semester (a SEMESTERS key) keeps series that
+    start in that semester's months.
+
+    limit returns one page in (start_date, event_id) order. Pass the last
+    event of a page as after=(start_date, event_id) to get the next one;
+    each page is an index range scan, so deep pages cost the same as the first.
+    """
+    clauses, params = _event_filters(user_id, start_date, end_date, days, min_start_minute,
+                                     max_end_minute, class_name, semester)
+    if after is not None:
+        clauses.append("(start_date, event_id) > (?, ?)")
+        params.extend(after)
+    query = "SELECT * FROM events"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    if limit is not None or after is not None:
+        query += " ORDER BY start_date, event_id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    def load():
+        with get_connection() as conn:
+            return [_row_to_event(row) for row in conn.execute(query, params).fetchall()]
+
     try:
         if user_id:
-            c.execute("SELECT * FROM events WHERE user_id = ?", (user_id,))
-        else:
-            c.execute("SELECT * FROM events")
-        rows = c.fetchall()
-        events = []
-        for row in rows:
-            event = {
-                'event_id': row[0],
-                'user_id': row[1],
-                'class_name': row[2],
-                'location': row[3],
-                'time_slot': row[4],
-                'days': row[5].split(',') if row[5] else [],
-                'start_date': row[6],
-                'end_date': row[7],
-                'created_at': row[8]
-            }
-            events.append(event)
-        return events
+            # Cached until this user's events are written; copies keep the cached rows intact
+            key = (start_date, end_date, tuple(days or ()), min_start_minute, max_end_minute,
+                   class_name, semester, limit, tuple(after) if after is not None else None)
+            return [dict(event) for event in cached_read("events", user_id, key, load)]
+        return load()
     except sqlite3.OperationalError:
         return []
-    finally:
-        conn.close()
+
+def count_events(user_id=None, **filters):
+    """Number of events matching the same filters as get_events_from_db (without paging).
+
+    With no user_id this is the count across all users. Cached until a write
+    that could change it.
+    """
+    clauses, params = _event_filters(user_id, **filters)
+    query = "SELECT COUNT(*) FROM events"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+
+    def load():
+        with get_connection() as conn:
+            return conn.execute(query, params).fetchone()[0]
+
+    key = tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                       for name, value in filters.items()))
+    try:
+        return cached_read("event_count", user_id, key, load)
+    except sqlite3.OperationalError:
+        return 0
+
+def get_events_snapshot(user_id, limit, after=None, **filters):
+    """Everything one Manage tab render reads, from a single query.
+
+    The user's event count, the count matching the filters and one keyset
+    page of matching events come back together, where they used to be
+    three reads. Cached per user until that user's events are written.
+
+    Args:
+        user_id (str): Whose events.
+        limit (int): Page size.
+        after (tuple): (start_date, event_id) of the last event before the
+            page, as for get_events_from_db.
+        **filters: Any get_events_from_db filter.
+
+    Returns:
+        dict: 'events' (the page, in (start_date, event_id) order),
+        'has_more' (another page follows), 'total' and 'matching'.
+    """
+    clauses, params = _event_filters(user_id, **filters)
+    page_clauses, page_params = list(clauses), list(params)
+    if after is not None:
+        page_clauses.append("(start_date, event_id) > (?, ?)")
+        page_params.extend(after)
+    # The counts live in a one-row derived table so they still come back
+    # when the page is empty (the LEFT JOIN yields a single NULL row)
+    query = f"""SELECT counts.total, counts.matching, page.*
+                FROM (SELECT (SELECT COUNT(*) FROM events WHERE user_id = ?) AS total,
+                             (SELECT COUNT(*) FROM events WHERE {" AND ".join(clauses)}) AS matching) AS counts
+                LEFT JOIN (SELECT * FROM events WHERE {" AND ".join(page_clauses)}
+                           ORDER BY start_date, event_id LIMIT ?) AS page
+                ORDER BY page.start_date, page.event_id"""
+    query_params = [user_id] + params + page_params + [limit + 1]
+
+    def load():
+        with get_connection() as conn:
+            rows = conn.execute(query, query_params).fetchall()
+        events = [_row_to_event(row[2:]) for row in rows if row[2] is not None]
+        return {
+            'events': events[:limit],
+            'has_more': len(events) > limit,
+            'total': rows[0][0],
+            'matching': rows[0][1]
+        }
+
+    key = (limit, tuple(after) if after is not None else None,
+           tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                        for name, value in filters.items())))
+    try:
+        snapshot = cached_read("snapshot", user_id, key, load)
+    except sqlite3.OperationalError:
+        return {'events': [], 'has_more': False, 'total': 0, 'matching': 0}
+    # Hand out copies so callers can't mutate the cached rows
+    return dict(snapshot, events=[dict(event) for event in snapshot['events']])
 
 def delete_event_from_db(event_id):
     """Delete an event from the database"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM events WHERE event_id = ?", (event_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        owner = conn.execute("DELETE FROM events WHERE event_id = ? RETURNING user_id", (event_id,)).fetchone()
+    if owner:
+        _mark_data_changed(owner[0])
 
 def update_event_in_db(event_id, updated_info):
     """Update an event in the database"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""UPDATE events SET 
-                class_name = ?, location = ?, time_slot = ?, days = ? 
-                WHERE event_id = ?""",
-              (updated_info['class_name'], updated_info['location'], 
-               updated_info['time_slot'], ','.join(updated_info['days']), event_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        owner = conn.execute(_UPDATE_EVENT_SQL, _update_params(event_id, updated_info)).fetchone()
+    if owner:
+        _mark_data_changed(owner[0])
 
 def get_all_events(user_id=None):
     """Get events from both session state and database, merge and deduplicate"""
-    # Initialize database
-    init_database()
+    # Session state events take priority over the (cached) database rows
+    all_events = {event['event_id']: event for event in get_events_from_db(user_id=user_id)}
+    for event in st.session_state.get('scheduled_events', []):
+        all_events[event['event_id']] = event
+    return list(all_events.values())
+
+def get_graph_endpoint(account_key, max_age_seconds):
+    """Return the remembered Graph endpoint for an account, or None if unknown or older than max_age_seconds"""
+    from datetime import datetime, timedelta
     
-    # Get events from database (filtered by user_id if provided)
-    db_events = get_events_from_db(user_id=user_id)
+    oldest = (datetime.now() - timedelta(seconds=max_age_seconds)).isoformat()
+    with get_connection() as conn:
+        row = conn.execute("SELECT endpoint FROM graph_endpoints WHERE account_key = ? AND updated_at >= ?",
+                           (account_key, oldest)).fetchone()
+    return row[0] if row else None
+
+def store_graph_endpoint(account_key, endpoint):
+    """Remember which Graph endpoint works for an account"""
+    from datetime import datetime
     
-    # Get events from session state
-    session_events = st.session_state.get('scheduled_events', [])
+    with transaction() as conn:
+        conn.execute("""INSERT INTO graph_endpoints (account_key, endpoint, updated_at) VALUES (?, ?, ?)
+                        ON CONFLICT(account_key) DO UPDATE SET endpoint = excluded.endpoint, updated_at = excluded.updated_at""",
+                     (account_key, endpoint, datetime.now().isoformat()))
+
+def get_sync_token(user_id, provider):
+    """Return the stored incremental sync token (Google syncToken, Graph deltaLink) or None"""
+    with get_connection() as conn:
+        row = conn.execute("SELECT sync_token FROM sync_state WHERE user_id = ? AND provider = ?",
+                           (user_id, provider)).fetchone()
+    return row[0] if row else None
+
+def store_sync_token(user_id, provider, sync_token):
+    """Store the sync token for the next incremental sync; None forgets it (forces a full sync)"""
+    from datetime import datetime
     
-    # Create a dictionary to store unique events (using event_id as key)
-    all_events = {}
+    with transaction() as conn:
+        if sync_token is None:
+            conn.execute("DELETE FROM sync_state WHERE user_id = ? AND provider = ?", (user_id, provider))
+        else:
+            conn.execute("""INSERT INTO sync_state (user_id, provider, sync_token, updated_at) VALUES (?, ?, ?, ?)
+                            ON CONFLICT(user_id, provider) DO UPDATE SET 
+                                sync_token = excluded.sync_token, updated_at = excluded.updated_at""",
+                         (user_id, provider, sync_token, datetime.now().isoformat()))
+
+def apply_calendar_changes(user_id, updates, removed_ids):
+    """Apply changes pulled from a calendar provider to the user's stored events.
     
-    # Add database events
-    for event in db_events:
-        all_events[event['event_id']] = event
+    Only events already in the table are touched. In each update dict,
+    event_id is required; any other field left as None keeps its stored
+    value.
     
-    # Add/update with session state events (session state takes priority)
-    for event in session_events:
-        all_events[event['event_id']] = event
+    Returns:
+        tuple: (updated_ids, removed_ids) that matched stored events.
+    """
+    updates = list(updates)
+    removed_ids = list(removed_ids)
+    if not updates and not removed_ids:
+        return [], []
     
-    return list(all_events.values())
+    with transaction() as conn:
+        # Look up which IDs we actually store so callers can reconcile session state
+        candidate_ids = [update['event_id'] for update in updates] + removed_ids
+        stored = set()
+        for start in range(0, len(candidate_ids), 500):
+            chunk = candidate_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            stored.update(row[0] for row in conn.execute(
+                f"SELECT event_id FROM events WHERE user_id = ? AND event_id IN ({placeholders})",
+                [user_id] + chunk))
+        
+        updates = [update for update in updates if update['event_id'] in stored]
+        removed_ids = [event_id for event_id in removed_ids if event_id in stored]
+        rows = []
+        for update in updates:
+            days = update.get('days') or None
+            time_slot = update.get('time_slot')
+            mask, start_minute, end_minute = _encode_schedule(days, time_slot)
+            rows.append((update.get('class_name'), update.get('location'), time_slot,
+                         ','.join(days) if days else None,
+                         update.get('start_date'), update.get('end_date'),
+                         mask if days else None,
+                         # A new time slot replaces the minutes even when it can't be parsed
+                         time_slot, start_minute, time_slot, end_minute,
+                         update['event_id'], user_id))
+        conn.executemany("""UPDATE events SET 
+                    class_name = COALESCE(?, class_name), location = COALESCE(?, location), 
+                    time_slot = COALESCE(?, time_slot), days = COALESCE(?, days), 
+                    start_date = COALESCE(?, start_date), end_date = COALESCE(?, end_date), 
+                    day_mask = COALESCE(?, day_mask), 
+                    start_minute = CASE WHEN ? IS NULL THEN start_minute ELSE ? END, 
+                    end_minute = CASE WHEN ? IS NULL THEN end_minute ELSE ? END 
+                    WHERE event_id = ? AND user_id = ?""",
+                  rows)
+        conn.executemany("DELETE FROM events WHERE event_id = ? AND user_id = ?",
+                         [(event_id, user_id) for event_id in removed_ids])
+    if updates or removed_ids:
+        _mark_data_changed(user_id)
+    return [update['event_id'] for update in updates], removed_ids
+
+def resolve_outlook_removals(user_id, occurrences, removed_ids):
+    """Record Outlook occurrences and turn removed occurrence IDs into series removals.
+
+    Args:
+        user_id (str): Owner of the stored events.
+        occurrences (iterable): (occurrence_id, series_master_id) pairs seen
+            in a delta page; only those of stored series are kept.
+        removed_ids (iterable): IDs reported as @removed in the same page.
+
+    Returns:
+        list: IDs to remove from the events table: removed IDs that aren't
+        known occurrences (single events), plus series masters none of
+        whose known occurrences are left.
+    """
+    occurrences = list(occurrences)
+    removed_ids = list(removed_ids)
+    if not occurrences and not removed_ids:
+        return []
+    
+    with transaction() as conn:
+        conn.executemany("""INSERT INTO outlook_occurrences (user_id, occurrence_id, event_id)
+                            SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM events WHERE event_id = ? AND user_id = ?)
+                            ON CONFLICT(user_id, occurrence_id) DO UPDATE SET event_id = excluded.event_id""",
+                         [(user_id, occurrence_id, event_id, event_id, user_id)
+                          for occurrence_id, event_id in occurrences])
+        to_remove, masters = [], set()
+        for removed_id in removed_ids:
+            row = conn.execute("SELECT event_id FROM outlook_occurrences WHERE user_id = ? AND occurrence_id = ?",
+                               (user_id, removed_id)).fetchone()
+            if row is None:
+                to_remove.append(removed_id)
+                continue
+            conn.execute("DELETE FROM outlook_occurrences WHERE user_id = ? AND occurrence_id = ?",
+                         (user_id, removed_id))
+            masters.add(row[0])
+        # Cancelling one occurrence leaves the series; removing the last one removes it
+        for event_id in masters:
+            if conn.execute("SELECT 1 FROM outlook_occurrences WHERE user_id = ? AND event_id = ? LIMIT 1",
+                            (user_id, event_id)).fetchone() is None:
+                to_remove.append(event_id)
+    return to_remove
+
+def _outbox_op_to_dict(row):
+    keys = ('op_id', 'job_id', 'user_id', 'event_id', 'op', 'payload', 'status',
+            'attempts', 'last_error', 'result')
+    op = dict(zip(keys, row))
+    op['payload'] = json.loads(op['payload'])
+    op['result'] = json.loads(op['result']) if op['result'] else None
+    return op
+
+_OUTBOX_COLUMNS = "op_id, job_id, user_id, event_id, op, payload, status, attempts, last_error, result"
+
+def enqueue_outbox_ops(job_id, user_id, operations, now):
+    """Queue calendar writes for the outbox workers as one job.
+
+    Args:
+        job_id (str): Groups the operations for progress reporting.
+        user_id (str): Whose calendar and events they change.
+        operations (list): Dicts with 'op' (an outbox.HANDLERS key),
+            'event_id', 'idempotency_key' and a JSON-serializable 'payload'.
+        now (float): Epoch seconds; the operations are due immediately.
+
+    Returns:
+        int: Operations queued; ones whose idempotency key is already
+        pending or running are skipped. A finished (done or dead-lettered)
+        operation with the same key is replaced, so asking again works.
+    """
+    from datetime import datetime
+
+    created_at = datetime.now().isoformat()
+    rows = [(job_id, user_id, operation['event_id'], operation['op'], operation['idempotency_key'],
+             json.dumps(operation['payload']), now, created_at)
+            for operation in operations]
+    with transaction() as conn:
+        # Deleted and inserted anew, not revived in place, so the new row is
+        # ordered after anything queued for the event since
+        conn.executemany("DELETE FROM outbox WHERE idempotency_key = ? AND status IN ('done', 'dead')",
+                         [(row[4],) for row in rows])
+        before = conn.total_changes
+        conn.executemany("""INSERT INTO outbox
+                    (job_id, user_id, event_id, op, idempotency_key, payload, next_attempt_at, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(idempotency_key) DO NOTHING""",
+                         rows)
+        return conn.total_changes - before
+
+def claim_outbox_op(now, lease_seconds, max_attempts):
+    """Lease the next due outbox operation to the calling worker.
+
+    An operation is due when it is pending and its next attempt time has
+    passed, or when it is running but its lease has expired (the worker
+    that held it died). Operations on one event run in the order they were
+    queued. Claiming counts as an attempt; an expired lease on an operation
+    that has already had max_attempts is dead-lettered instead of handed out
+    again, so an operation that keeps killing its worker can't loop forever.
+
+    Returns:
+        dict: The operation (payload decoded), or None if nothing is due.
+    """
+    from datetime import datetime
+
+    with transaction() as conn:
+        conn.execute("""UPDATE outbox SET status = 'dead', finished_at = ?,
+                        last_error = COALESCE(last_error || '; ', '') || 'lease expired on the last attempt'
+                        WHERE status = 'running' AND next_attempt_at <= ? AND attempts >= ?""",
+                     (datetime.now().isoformat(), now, max_attempts))
+        row = conn.execute(f"""UPDATE outbox SET status = 'running', attempts = attempts + 1, next_attempt_at = ?
+                    WHERE op_id = (
+                        SELECT op_id FROM outbox AS candidate
+                        WHERE candidate.status IN ('pending', 'running') AND candidate.next_attempt_at <= ?
+                          AND NOT EXISTS (SELECT 1 FROM outbox AS earlier
+                                          WHERE earlier.event_id = candidate.event_id
+                                            AND earlier.status IN ('pending', 'running')
+                                            AND earlier.op_id < candidate.op_id)
+                        ORDER BY candidate.next_attempt_at, candidate.op_id
+                        LIMIT 1)
+                    RETURNING {_OUTBOX_COLUMNS}""",
+                           (now + lease_seconds, now)).fetchone()
+    return _outbox_op_to_dict(row) if row else None
+
+def claim_outbox_creates(user_id, now, lease_seconds, limit):
+    """Lease up to limit more of a user's due, pending creates to the calling worker.
+
+    Used after claim_outbox_op hands out a create, so the worker can send
+    them all as one Calendar batch call. Same rules as claim_outbox_op;
+    expired leases are left to it.
+
+    Returns:
+        list: The operations (payload decoded), in queue order.
+    """
+    with transaction() as conn:
+        rows = conn.execute(f"""UPDATE outbox SET status = 'running', attempts = attempts + 1, next_attempt_at = ?
+                    WHERE op_id IN (
+                        SELECT op_id FROM outbox AS candidate
+                        WHERE candidate.status = 'pending' AND candidate.next_attempt_at <= ?
+                          AND candidate.user_id = ? AND candidate.op = 'create'
+                          AND NOT EXISTS (SELECT 1 FROM outbox AS earlier
+                                          WHERE earlier.event_id = candidate.event_id
+                                            AND earlier.status IN ('pending', 'running')
+                                            AND earlier.op_id < candidate.op_id)
+                        ORDER BY candidate.op_id
+                        LIMIT ?)
+                    RETURNING {_OUTBOX_COLUMNS}""",
+                            (now + lease_seconds, now, user_id, limit)).fetchall()
+    return sorted((_outbox_op_to_dict(row) for row in rows), key=lambda op: op['op_id'])
+
+def complete_outbox_ops(completions):
+    """Mark claimed operations done and apply them to the events table, all in one transaction.
+
+    A create stores payload['event_info'], an update applies
+    payload['updated_info'] and a delete removes the row, so the table
+    only ever reflects writes the calendar has accepted. Cancelling one
+    occurrence leaves the series row as it is.
+
+    Args:
+        completions (list): (op, result) pairs; result is JSON-serializable.
+    """
+    from datetime import datetime
+
+    if not completions:
+        return
+    finished_at = datetime.now().isoformat()
+    with transaction() as conn:
+        conn.executemany(_UPSERT_EVENT_SQL, [_event_row(op['payload']['event_info'], op['user_id'])
+                                             for op, _ in completions if op['op'] == 'create'])
+        for op, _ in completions:
+            if op['op'] == 'update':
+                conn.execute(_UPDATE_EVENT_SQL, _update_params(op['event_id'], op['payload']['updated_info']))
+            elif op['op'] == 'delete':
+                conn.execute("DELETE FROM events WHERE event_id = ? AND user_id = ?",
+                             (op['event_id'], op['user_id']))
+        conn.executemany("""UPDATE outbox SET status = 'done', result = ?, last_error = NULL, finished_at = ?
+                            WHERE op_id = ?""",
+                         [(json.dumps(result), finished_at, op['op_id']) for op, result in completions])
+    for user_id in {op['user_id'] for op, _ in completions}:
+        _mark_data_changed(user_id)
+
+def complete_outbox_op(op, result):
+    """Mark one claimed operation done (see complete_outbox_ops)"""
+    complete_outbox_ops([(op, result)])
+
+def extend_outbox_leases(op_ids, lease_until):
+    """Keep claimed operations leased to the calling worker until lease_until (epoch seconds)"""
+    with transaction() as conn:
+        conn.executemany("UPDATE outbox SET next_attempt_at = ? WHERE op_id = ? AND status = 'running'",
+                         [(lease_until, op_id) for op_id in op_ids])
+
+def retry_outbox_op(op_id, error, next_attempt_at):
+    """Put a failed operation back in the queue, due again at next_attempt_at (epoch seconds)"""
+    with transaction() as conn:
+        conn.execute("""UPDATE outbox SET status = 'pending', last_error = ?, next_attempt_at = ?
+                        WHERE op_id = ?""",
+                     (error, next_attempt_at, op_id))
+
+def dead_letter_outbox_op(op_id, error):
+    """Give up on an operation; it stays in the outbox with its error until retried by hand"""
+    from datetime import datetime
+
+    with transaction() as conn:
+        conn.execute("""UPDATE outbox SET status = 'dead', last_error = ?, finished_at = ?
+                        WHERE op_id = ?""",
+                     (error, datetime.now().isoformat(), op_id))
+
+def retry_dead_outbox_ops(job_id, now):
+    """Requeue a job's dead-lettered operations with a fresh attempt budget; returns how many"""
+    with transaction() as conn:
+        return conn.execute("""UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ?,
+                                   finished_at = NULL
+                               WHERE job_id = ? AND status = 'dead'""",
+                            (now, job_id)).rowcount
+
+def purge_outbox_ops(finished_before):
+    """Delete done and dead-lettered operations that finished before a cutoff; returns how many.
+
+    Args:
+        finished_before (datetime): Operations that finished earlier go.
+    """
+    with transaction() as conn:
+        return conn.execute("""DELETE FROM outbox WHERE status IN ('done', 'dead') AND finished_at < ?""",
+                            (finished_before.isoformat(),)).rowcount
+
+def get_outbox_job(job_id):
+    """Return a job's operations and how many are in each status.
+
+    Returns:
+        dict: 'job_id', 'ops' (in queue order), 'total' and a count for
+        each of 'pending', 'running', 'done' and 'dead'; None if the job
+        doesn't exist.
+    """
+    with get_connection() as conn:
+        rows = conn.execute(f"SELECT {_OUTBOX_COLUMNS} FROM outbox WHERE job_id = ? ORDER BY op_id",
+                            (job_id,)).fetchall()
+    if not rows:
+        return None
+    ops = [_outbox_op_to_dict(row) for row in rows]
+    job = {'job_id': job_id, 'ops': ops, 'total': len(ops),
+           'pending': 0, 'running': 0, 'done': 0, 'dead': 0}
+    for op in ops:
+        job[op['status']] += 1
+    return job
+
+def get_queued_outbox_events(user_id):
+    """Events a user has queued for creation that the calendar hasn't accepted yet (event_info dicts)"""
+    with get_connection() as conn:
+        rows = conn.execute("""SELECT payload FROM outbox
+                               WHERE user_id = ? AND op = 'create' AND status IN ('pending', 'running')""",
+                            (user_id,)).fetchall()
+    return [json.loads(row[0])['event_info'] for row in rows]
 
 def get_database_stats():
     """Get database statistics"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM events")
-        event_count = c.fetchone()[0]
-        conn.close()
+        with get_connection() as conn:
+            event_count = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
         return {
             'total_events': event_count,
             'database_file': DB_NAME
@@ -203,9 +948,8 @@ def get_database_stats():
 
 def clear_database():
     """Clear all events from the database (use with caution)"""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM events")
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM events")
+        conn.execute("DELETE FROM outlook_occurrences")
+    invalidate_all()
     return True
\ No newline at end of file
@@ -1,11 +1,14 @@
 import datetime
 import os.path
+from zoneinfo import ZoneInfo
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from calendar_sync import sync_google_events
+from recurrence import expand_occurrences, parse_recurrence
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
@@ -76,6 +79,28 @@ def retrieve_schedule(creds, max_results=10):
   except HttpError as error:
     print(f"An error occurred: {error}")
 
+def sync_schedule(creds, user_id):
+  """Incrementally syncs the user's calendar into the local events table.
+  
+  Only changes since the last call are transferred (via syncToken), unlike
+  retrieve_schedule which re-lists upcoming events every time.
+  
+  Args:
+    creds: Authenticated credentials for Google Calendar API access.
+    user_id: Owner of the local events to reconcile.
+  
+  Returns:
+    dict: 'updated' and 'removed' event IDs and 'full_sync', or None if failed.
+  """
+  try:
+    service = build("calendar", "v3", credentials=creds)
+    result = sync_google_events(service, user_id)
+    print(f"Synced: {len(result['updated'])} updated, {len(result['removed'])} removed")
+    return result
+  except HttpError as error:
+    print(f"An error occurred: {error}")
+    return None
+
 def main():
   """Shows basic usage of the Google Calendar API.
   Prints the start and name of the next 10 events on the user's calendar.
@@ -200,14 +225,20 @@ def delete_recurring_series(event_id):
         print(f"An error occurred while deleting recurring series: {error}")
         return False
     
-def get_event_occurrences(event_id):
-    """Retrieves occurrences of a recurring event from the user's primary calendar.
+def get_event_occurrences(event_id, window_end=None):
+    """Retrieves upcoming occurrences of a recurring event from the user's primary calendar.
+    
+    Only the series master is fetched; its RRULE/EXDATE recurrence is then
+    expanded locally, so the result is complete (no pagination limits)
+    without listing the calendar. Single instances that were moved or
+    edited individually are reported at their original time.
     
     Args:
         event_id (str): The ID of any event in the recurring series.
+        window_end (datetime.datetime): Optional latest occurrence start (aware).
     
     Returns:
-        list: List of occurrence start times, or None if failed.
+        list: List of (occurrence ID, start time) tuples, or None if failed.
     """
     creds = authenticate_user()
     
@@ -221,39 +252,51 @@ def get_event_occurrences(event_id):
         if 'recurringEventId' in event:
             master_event_id = event['recurringEventId']
             print(f"Master Event ID: {master_event_id}")
+            master_event = service.events().get(calendarId="primary", eventId=master_event_id).execute()
         elif 'recurrence' in event:
             master_event_id = event_id
+            master_event = event
             print(f"The provided event ID is the master event ID: {master_event_id}")
         else:
             print("The provided event ID does not belong to a recurring series.")
             return None
-        
-        # Now, retrieve all instances of the recurring event
-        now = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
-        events_result = (
-            service.events()
-            .list(
-                calendarId="primary",
-                timeMin=now,
-                singleEvents=True,
-                orderBy="startTime",
-                q=master_event_id  # Filter by master event ID
-            )
-            .execute()
-        )
-        events = events_result.get("items", [])
-        print(f"Found {len(events)} occurrences.")
-        occurrences = []
-        for evt in events:
-            if 'recurringEventId' in evt and evt['recurringEventId'] == master_event_id:
-                start = evt["start"].get("dateTime", evt["start"].get("date"))
-                occurrences.append((evt['id'], start))
-        
-        return occurrences
     except HttpError as error:
         print(f"An error occurred while retrieving occurrences: {error}")
         return None
-
+    
+    rrule, exdates = parse_recurrence(master_event.get('recurrence'))
+    if not rrule:
+        return []
+    
+    # Expand in the series' own time zone so DST shifts keep the wall-clock time
+    all_day = 'date' in master_event['start']
+    if all_day:
+        tz = datetime.timezone.utc
+        dtstart = datetime.datetime.fromisoformat(master_event['start']['date'])
+    else:
+        start = datetime.datetime.fromisoformat(master_event['start']['dateTime'].replace("Z", "+00:00"))
+        tz = ZoneInfo(master_event['start']['timeZone']) if master_event['start'].get('timeZone') else start.tzinfo
+        dtstart = start.astimezone(tz).replace(tzinfo=None)
+        # UNTIL is in UTC; compare it in the series' wall-clock time instead
+        if rrule.get('UNTIL', '').endswith('Z'):
+            until = datetime.datetime.strptime(rrule['UNTIL'], "%Y%m%dT%H%M%SZ").replace(tzinfo=datetime.timezone.utc)
+            rrule['UNTIL'] = until.astimezone(tz).strftime("%Y%m%dT%H%M%S")
+    
+    now = datetime.datetime.now(tz=tz).replace(tzinfo=None)
+    end = window_end.astimezone(tz).replace(tzinfo=None) if window_end else None
+    if 'UNTIL' not in rrule and 'COUNT' not in rrule and end is None:
+        end = now + datetime.timedelta(days=365)
+    
+    occurrences = []
+    for occurrence in expand_occurrences(dtstart, rrule, window_start=now, window_end=end, exdates=exdates):
+        if all_day:
+            occurrences.append((f"{master_event_id}_{occurrence:%Y%m%d}", occurrence.date().isoformat()))
+        else:
+            aware = occurrence.replace(tzinfo=tz)
+            instance_time = aware.astimezone(datetime.timezone.utc)
+            occurrences.append((f"{master_event_id}_{instance_time:%Y%m%dT%H%M%SZ}", aware.isoformat()))
+    print(f"Found {len(occurrences)} occurrences.")
+    return occurrences
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
@@ -1,11 +1,22 @@
 import streamlit as st
 import json
 import datetime
+import threading
+import time
+import httplib2
+import httpx
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from database_manager import store_user, get_user, get_user_by_email
+from calendar_sync import sync_google_events
+from async_calendar import (MAX_CONCURRENT_REQUESTS, RATE_LIMIT_REASONS, gather_limited, google_create_event,
+                            google_delete_event, google_get_event, google_update_event, run_sync)
+from retry_policy import (MAX_ATTEMPTS, RETRYABLE_STATUS_CODES, backoff_delay, call_with_retry,
+                          parse_retry_after, record_metric, throttle)
 
 # -------------------------------------
 # CONFIG
@@ -13,6 +24,12 @@ from database_manager import store_user, get_user, get_user_by_email
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 CLIENT_SECRETS_FILE = "credentials2.json"  # Keep private
 REDIRECT_URI = "http://localhost:8501"  # Change to your deployed URL when live
+SERVICE_CACHE_SIZE = 256  # Max number of users with a cached Calendar service
+BATCH_SIZE = 50  # Calendar API limit on requests per batch call
+
+# Built Calendar services keyed per user: {key: (service, credentials)}
+_service_cache = {}
+_service_cache_lock = threading.Lock()
 
 
 # -------------------------------------
@@ -21,9 +38,11 @@ REDIRECT_URI = "http://localhost:8501"  # Change to your deployed URL when live
 def get_user_info(creds):
     """Get authenticated user's email from calendar settings"""
     try:
-        service = build("calendar", "v3", credentials=creds)
+        service = get_calendar_service(creds)
+        if not service:
+            return None
         # Get primary calendar (which has user's email)
-        calendar = service.calendarList().get(calendarId='primary').execute()
+        calendar = execute_request(service.calendarList().get(calendarId='primary'), creds)
         email = calendar.get('id')  # The email is the calendar ID for primary calendar
         
         # Use email as name if not available
@@ -102,14 +121,141 @@ def restore_user_session():
 # -------------------------------------
 # API SERVICE BUILDERS
 # -------------------------------------
-def get_calendar_service(creds):
-    """Build a Google Calendar API service from credentials."""
+def _credentials_key(creds):
+    """Identify the user behind a credential; stable across access token refreshes"""
+    return (creds.client_id, creds.refresh_token or creds.token)
+
+def _get_service_entry(creds):
+    """Return the cached (service, credentials) pair for a user, building it if needed"""
+    if not creds:
+        return None
+    
+    key = _credentials_key(creds)
+    with _service_cache_lock:
+        cached = _service_cache.get(key)
+    
+    if cached:
+        service, service_creds = cached
+        if service_creds.valid:
+            return cached
+        try:
+            service_creds.refresh(Request())
+            return cached
+        except RefreshError:
+            with _service_cache_lock:
+                _service_cache.pop(key, None)
+    
     try:
-        service = build("calendar", "v3", credentials=creds)
-        return service
+        service = build("calendar", "v3", credentials=creds, static_discovery=True, cache_discovery=False)
     except HttpError as e:
         st.error(f"Error creating Calendar service: {e}")
         return None
+    
+    entry = (service, creds)
+    with _service_cache_lock:
+        # Drop the oldest entry once the cache is full
+        if key not in _service_cache and len(_service_cache) >= SERVICE_CACHE_SIZE:
+            _service_cache.pop(next(iter(_service_cache)))
+        _service_cache[key] = entry
+    return entry
+
+def get_calendar_service(creds):
+    """Return a Google Calendar API service for these credentials.
+
+    Services are built once per user from the discovery document bundled
+    with google-api-python-client (no network fetch) and then reused. When
+    the cached access token expires it is refreshed in place, so the
+    service keeps working; it is only rebuilt if that refresh fails.
+    """
+    entry = _get_service_entry(creds)
+    return entry[0] if entry else None
+
+def _access_token(creds, force_refresh=False):
+    """A current access token for these credentials, refreshed through the service cache if expired.
+
+    force_refresh gets a new token even if this one looks valid, e.g. after
+    the calendar rejected it with a 401.
+    """
+    entry = _get_service_entry(creds)
+    if not entry:
+        return None
+    service_creds = entry[1]
+    if force_refresh or not service_creds.valid:
+        # A freshly built entry still holds whatever token it was given
+        service_creds.refresh(Request())
+    return service_creds.token
+
+def get_stored_token(user_id, force_refresh=False):
+    """Access token for a user from the credentials saved at login.
+
+    For work done outside the user's Streamlit session (the outbox
+    workers). Raises RefreshError if the stored grant has been revoked.
+    force_refresh is passed on to _access_token.
+
+    Returns:
+        tuple: (access_token, user_key), or (None, None) if nothing is stored.
+    """
+    user = get_user(user_id)
+    if not user or not user['credentials']:
+        return None, None
+    creds = Credentials.from_authorized_user_info(json.loads(user['credentials']), SCOPES)
+    return _access_token(creds, force_refresh), _credentials_key(creds)
+
+def get_stored_service(user_id):
+    """Calendar API service for a user's stored credentials, for insert_events_batch.
+
+    Built per call (about a millisecond with the bundled discovery document)
+    rather than taken from the service cache: httplib2 connections are not
+    safe to share between the outbox worker threads.
+
+    Returns:
+        tuple: (service, user_key), or (None, None) if nothing is stored.
+    """
+    token, user_key = get_stored_token(user_id)
+    if not token:
+        return None, None
+    service = build("calendar", "v3", credentials=Credentials(token=token),
+                    static_discovery=True, cache_discovery=False)
+    return service, user_key
+
+
+# -------------------------------------
+# REQUEST EXECUTION (retries + rate limiting)
+# -------------------------------------
+def _http_error_reason(error):
+    """Extract the first error reason (e.g. 'rateLimitExceeded') from an HttpError body"""
+    try:
+        details = json.loads(error.content.decode("utf-8"))["error"]
+        return (details.get("errors") or [{}])[0].get("reason") or details.get("status")
+    except (ValueError, KeyError, AttributeError, TypeError):
+        return None
+
+def _retry_decision(error):
+    """Return (retry, retry_after) for a failed Calendar API call"""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status in RETRYABLE_STATUS_CODES or (status == 403 and _http_error_reason(error) in RATE_LIMIT_REASONS):
+            return True, parse_retry_after(error.resp.get("retry-after"))
+        return False, None
+    if isinstance(error, (ConnectionError, TimeoutError, httplib2.HttpLib2Error)):
+        return True, None
+    return False, None
+
+def is_retryable_error(error):
+    """True if a failed Calendar API call (HttpError or transport error) is worth another attempt"""
+    return _retry_decision(error)[0]
+
+def execute_request(request, creds, http=None):
+    """Execute a Calendar API request under the shared retry policy.
+    
+    Rate-limit (429, 403 rateLimitExceeded) and 5xx failures are retried
+    with jittered exponential backoff, honoring Retry-After, and every
+    attempt first waits on the user's token-bucket limiter. The final
+    HttpError is raised if all attempts fail.
+    """
+    return call_with_retry(lambda: request.execute(http=http),
+                           lambda outcome, error: _retry_decision(error),
+                           user_key=_credentials_key(creds))
 
 
 # Example function using creds (unchanged structure)
@@ -120,17 +266,153 @@ def schedule_event(event_details):
         st.warning("Please authenticate before scheduling events.")
         return None
 
-    service = get_calendar_service(creds)
-    if not service:
+    token = _access_token(creds)
+    if not token:
         return None
 
     try:
-        event = service.events().insert(calendarId="primary", body=event_details).execute()
-        return event
-    except HttpError as e:
+        return run_sync(google_create_event(token, event_details, user_key=_credentials_key(creds)))
+    except (httpx.HTTPError, TimeoutError) as e:
         st.error(f"Error creating event: {e}")
         return None
 
+def insert_events_batch(service, event_details_list, user_key, calendar_id="primary"):
+    """Create many events using Calendar API batch requests.
+    
+    Inserts are packed BATCH_SIZE at a time into batch calls, so N events
+    cost ceil(N / BATCH_SIZE) round trips instead of N. Items that fail with a retryable error are resubmitted (only those)
+    under the shared retry policy. Makes no Streamlit calls, so it can run
+    outside a script thread.
+    
+    Returns:
+        list: One (event, error) tuple per input, in input order.
+    """
+    results = [(None, None)] * len(event_details_list)
+
+    def collect(request_id, response, exception):
+        # request_id is the item's index in event_details_list
+        results[int(request_id)] = (response, exception)
+
+    pending = list(range(len(event_details_list)))
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        for start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[start:start + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=collect)
+            for index in chunk:
+                batch.add(service.events().insert(calendarId=calendar_id, body=event_details_list[index]),
+                          request_id=str(index))
+            # Every item in a batch counts against the user's quota
+            throttle(user_key, tokens=len(chunk))
+            record_metric("attempts", len(chunk))
+            try:
+                batch.execute()
+            except (HttpError, httplib2.HttpLib2Error, ConnectionError, TimeoutError) as error:
+                # The whole batch call failed, so every item in it failed with it
+                print(f"An error occurred while sending event batch: {error}")
+                for index in chunk:
+                    results[index] = (None, error)
+
+        # Resubmit only the items that were throttled or hit a transient error
+        retry_after = None
+        retryable = []
+        for index in pending:
+            event, error = results[index]
+            if event is None:
+                retry, item_retry_after = _retry_decision(error)
+                if retry:
+                    retryable.append(index)
+                    if item_retry_after is not None:
+                        retry_after = max(retry_after or 0.0, item_retry_after)
+        if not retryable:
+            break
+        if attempt == MAX_ATTEMPTS:
+            record_metric("gave_up", len(retryable))
+            break
+        record_metric("retries", len(retryable))
+        if retry_after is not None:
+            record_metric("retry_after_honored", len(retryable))
+        time.sleep(backoff_delay(attempt, retry_after))
+        pending = retryable
+
+    return results
+
+def schedule_events_batch(event_details_list):
+    """Create many events in the user's primary calendar using batch requests.
+    
+    Returns:
+        list: One (event, error) tuple per input, in input order.
+    """
+    if not event_details_list:
+        return []
+
+    creds = authenticate_user()
+    if not creds:
+        st.warning("Please authenticate before scheduling events.")
+        return [(None, "Not authenticated")] * len(event_details_list)
+
+    service = get_calendar_service(creds)
+    if not service:
+        return [(None, "Calendar service unavailable")] * len(event_details_list)
+    return insert_events_batch(service, event_details_list, _credentials_key(creds))
+
+def insert_events_concurrently(token, event_details_list, user_key, max_workers=MAX_CONCURRENT_REQUESTS,
+                               calendar_id="primary"):
+    """Create many events as independent requests on the shared async client.
+    
+    The whole set takes about as long as the slowest insert, with at most
+    max_workers in flight. Makes no Streamlit calls, so it can run outside
+    a script thread.
+    
+    Returns:
+        list: One (event, error) tuple per input, in input order.
+    """
+    calls = [lambda event_details=event_details: google_create_event(token, event_details, calendar_id,
+                                                                      user_key=user_key)
+             for event_details in event_details_list]
+    # No overall deadline: every request has its own timeout and retry budget
+    outcomes = run_sync(gather_limited(calls, max_workers), timeout=None)
+
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            print(f"An error occurred while creating event: {outcome}")
+            results.append((None, outcome))
+        else:
+            results.append((outcome, None))
+    return results
+
+def schedule_events_concurrently(event_details_list, max_workers=MAX_CONCURRENT_REQUESTS):
+    """Create many events in the user's primary calendar as concurrent requests.
+    
+    Credentials are resolved here, on the calling (Streamlit) thread; the
+    requests themselves never touch st.session_state or any st.* call.
+    
+    Returns:
+        list: One (event, error) tuple per input, in input order.
+    """
+    if not event_details_list:
+        return []
+
+    creds = authenticate_user()
+    if not creds:
+        st.warning("Please authenticate before scheduling events.")
+        return [(None, "Not authenticated")] * len(event_details_list)
+
+    token = _access_token(creds)
+    if not token:
+        return [(None, "Calendar service unavailable")] * len(event_details_list)
+    return insert_events_concurrently(token, event_details_list, _credentials_key(creds), max_workers)
+
+def schedule_events(event_details_list, mode="batch"):
+    """Create many events, either as batch calls ("batch") or in parallel ("concurrent").
+    
+    Returns:
+        list: One (event, error) tuple per input, in input order.
+    """
+    if mode == "concurrent":
+        return schedule_events_concurrently(event_details_list)
+    return schedule_events_batch(event_details_list)
+
 def update_event(event_id, updated_event_details):
     """Updates an existing event on the user's primary calendar.
     
@@ -144,17 +426,16 @@ def update_event(event_id, updated_event_details):
     creds = authenticate_user()
     
     try:
-        service = build("calendar", "v3", credentials=creds)
+        token = _access_token(creds)
+        if not token:
+            return None
         print(f"Updating event ID: {event_id}")
         print(f"Updated event details: {updated_event_details}")
-        event = service.events().update(
-            calendarId="primary", 
-            eventId=event_id, 
-            body=updated_event_details
-        ).execute()
+        event = run_sync(google_update_event(token, event_id, updated_event_details,
+                                             user_key=_credentials_key(creds)))
         print(f"Event updated: {event.get('htmlLink')}")
         return event
-    except HttpError as error:
+    except (httpx.HTTPError, TimeoutError) as error:
         print(f"An error occurred while updating event: {error}")
         return None
 
@@ -170,11 +451,13 @@ def delete_event(event_id):
     creds = authenticate_user()
     
     try:
-        service = build("calendar", "v3", credentials=creds)
-        service.events().delete(calendarId="primary", eventId=event_id).execute()
+        token = _access_token(creds)
+        if not token:
+            return False
+        run_sync(google_delete_event(token, event_id, user_key=_credentials_key(creds)))
         print(f"Event deleted successfully. Event ID: {event_id}")
         return True
-    except HttpError as error:
+    except (httpx.HTTPError, TimeoutError) as error:
         print(f"An error occurred while deleting event: {error}")
         return False
 
@@ -190,30 +473,54 @@ def delete_recurring_series(event_id):
     creds = authenticate_user()
     
     try:
-        service = build("calendar", "v3", credentials=creds)
+        token = _access_token(creds)
+        if not token:
+            return False
+        user_key = _credentials_key(creds)
         
         # First, get the event to check if it's part of a recurring series
-        event = service.events().get(calendarId="primary", eventId=event_id).execute()
+        event = run_sync(google_get_event(token, event_id, user_key=user_key))
         
         # Check if this event has a recurring event ID (meaning it's part of a series)
         if 'recurringEventId' in event:
             # This is an instance of a recurring event, delete the master event
             master_event_id = event['recurringEventId']
-            service.events().delete(calendarId="primary", eventId=master_event_id).execute()
+            run_sync(google_delete_event(token, master_event_id, user_key=user_key))
             print(f"Recurring series deleted successfully. Master Event ID: {master_event_id}")
         else:
             # This might be the master event itself, or a single event
             # Check if it has recurrence rules
             if 'recurrence' in event:
                 # This is a master recurring event
-                service.events().delete(calendarId="primary", eventId=event_id).execute()
+                run_sync(google_delete_event(token, event_id, user_key=user_key))
                 print(f"Master recurring event deleted successfully. Event ID: {event_id}")
             else:
                 # This is a single event, just delete it normally
-                service.events().delete(calendarId="primary", eventId=event_id).execute()
+                run_sync(google_delete_event(token, event_id, user_key=user_key))
                 print(f"Single event deleted successfully. Event ID: {event_id}")
         
         return True
-    except HttpError as error:
+    except (httpx.HTTPError, TimeoutError) as error:
         print(f"An error occurred while deleting recurring series: {error}")
-        return False
\ No newline at end of file
+        return False
+
+def sync_calendar():
+    """Pull changes made in Google Calendar into the local events table.
+    
+    Uses the stored syncToken so only events changed since the last sync
+    are transferred.
+    
+    Returns:
+        dict: 'updated' and 'removed' event IDs and 'full_sync', or None if failed.
+    """
+    creds = authenticate_user()
+    service = get_calendar_service(creds)
+    if not service:
+        return None
+    
+    try:
+        return sync_google_events(service, st.session_state.user_id,
+                                  execute=lambda request: execute_request(request, creds))
+    except HttpError as error:
+        print(f"An error occurred while syncing calendar: {error}")
+        return None
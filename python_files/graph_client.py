@@ -0,0 +1,153 @@
+import time
+import httpx
+# GRAPH_BASE lives with the other base URLs; the Outlook modules import it from here
+from async_calendar import GRAPH_BASE, calendar_request, run_sync
+from retry_policy import MAX_ATTEMPTS, backoff_delay, parse_retry_after, record_metric
+
+# --------------------------
+# Config
+# --------------------------
+BATCH_LIMIT = 20            # Graph JSON batching allows at most 20 requests per $batch
+
+
+# --------------------------
+# Requests
+# --------------------------
+def graph_request(method, url, token, user_key=None, **kwargs):
+    """
+    Blocking Graph request on the shared keep-alive pools of async_calendar.
+    Paths starting with '/' are resolved against GRAPH_BASE; headers,
+    timeouts and retries (429/5xx under the shared retry policy) are those
+    of calendar_request. Returns the final httpx.Response; transport
+    errors and timeouts are raised once retries are exhausted.
+    """
+    return run_sync(calendar_request(method, url, token, user_key=user_key, **kwargs))
+
+
+# --------------------------
+# JSON batching
+# --------------------------
+def _relative_url(url):
+    """$batch items take URLs relative to the version root ('/me/events')"""
+    if url.startswith(GRAPH_BASE):
+        url = url[len(GRAPH_BASE):]
+    return url if url.startswith("/") else "/" + url
+
+def _dependency_groups(operations):
+    """Group operations linked by dependsOn; each group must share one $batch"""
+    parent = {op["id"]: op["id"] for op in operations}
+
+    def find(op_id):
+        while parent[op_id] != op_id:
+            parent[op_id] = parent[parent[op_id]]
+            op_id = parent[op_id]
+        return op_id
+
+    for op in operations:
+        for dependency in op.get("dependsOn", []):
+            if dependency in parent:
+                parent[find(op["id"])] = find(dependency)
+
+    groups = {}
+    for op in operations:
+        groups.setdefault(find(op["id"]), []).append(op)
+    return list(groups.values())
+
+def _pack_batches(operations):
+    """Split operations into $batch payloads of at most BATCH_LIMIT, keeping dependency groups together"""
+    batches = []
+    current = []
+    for group in _dependency_groups(operations):
+        if len(group) > BATCH_LIMIT:
+            raise ValueError(f"dependsOn chain of {len(group)} requests exceeds the $batch limit of {BATCH_LIMIT}")
+        if len(current) + len(group) > BATCH_LIMIT:
+            batches.append(current)
+            current = []
+        current.extend(group)
+    if current:
+        batches.append(current)
+    return batches
+
+def graph_batch(token, operations, user_key=None):
+    """
+    Run many Graph operations through JSON $batch, BATCH_LIMIT per request.
+
+    Each operation is a dict with "method" and "url", plus optional "id",
+    "body", "headers" and "dependsOn" (ids of operations that must succeed
+    first; those are always packed into the same $batch). Items that come
+    back throttled (429/503/504), or that failed only because a throttled
+    dependency did (424), are re-split into fresh batches and retried after
+    the longest Retry-After the server sent.
+
+    Returns a dict mapping each operation id to its response:
+    {"status": int, "headers": dict, "body": parsed JSON or None}.
+    """
+    operations = [dict(op, id=str(op.get("id", index))) for index, op in enumerate(operations)]
+    results = {}
+    pending = operations
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        for chunk in _pack_batches(pending):
+            payload = {"requests": []}
+            for op in chunk:
+                item = {"id": op["id"], "method": op["method"].upper(), "url": _relative_url(op["url"])}
+                # Dependencies that already succeeded in an earlier round aren't in this batch
+                depends_on = [dep for dep in op.get("dependsOn", []) if dep not in results]
+                if depends_on:
+                    item["dependsOn"] = depends_on
+                if "body" in op:
+                    item["body"] = op["body"]
+                    item["headers"] = {"Content-Type": "application/json", **op.get("headers", {})}
+                elif op.get("headers"):
+                    item["headers"] = op["headers"]
+                payload["requests"].append(item)
+
+            record_metric("attempts", len(chunk))
+            try:
+                response = graph_request("POST", "/$batch", token, user_key=user_key, json=payload)
+                if response.status_code == 200:
+                    for item in response.json().get("responses", []):
+                        results[str(item.get("id"))] = {
+                            "status": int(item.get("status", 0)),
+                            "headers": item.get("headers") or {},
+                            "body": item.get("body")
+                        }
+                else:
+                    for op in chunk:
+                        results[op["id"]] = {"status": response.status_code, "headers": {}, "body": response.text}
+            except (httpx.HTTPError, TimeoutError) as e:
+                for op in chunk:
+                    results[op["id"]] = {"status": 0, "headers": {}, "body": str(e)}
+
+        throttled = [op for op in pending
+                     if results.get(op["id"], {}).get("status") in (429, 503, 504)]
+        # 424 means a dependency failed; retry those whose dependency chain was only throttled
+        retry_ids = {op["id"] for op in throttled}
+        blocked = [op for op in pending if results.get(op["id"], {}).get("status") == 424]
+        while True:
+            unblocked = [op for op in blocked
+                         if op["id"] not in retry_ids and any(dep in retry_ids for dep in op.get("dependsOn", []))]
+            if not unblocked:
+                break
+            retry_ids.update(op["id"] for op in unblocked)
+        retry = [op for op in pending if op["id"] in retry_ids]
+        if not retry:
+            break
+        if attempt == MAX_ATTEMPTS:
+            record_metric("gave_up", len(retry))
+            break
+
+        retry_after = None
+        for op in throttled:
+            headers = {key.lower(): value for key, value in results[op["id"]]["headers"].items()}
+            item_retry_after = parse_retry_after(headers.get("retry-after"))
+            if item_retry_after is not None:
+                retry_after = max(retry_after or 0.0, item_retry_after)
+        record_metric("retries", len(retry))
+        if retry_after is not None:
+            record_metric("retry_after_honored", len(retry))
+        time.sleep(backoff_delay(attempt, retry_after))
+        for op in retry:
+            results.pop(op["id"], None)
+        pending = retry
+
+    return results
@@ -0,0 +1,295 @@
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import httpx
+from googleapiclient.errors import HttpError
+from async_calendar import (google_create_event, google_delete_event, google_get_event, google_list_instances,
+                            google_rate_limited, google_update_event, run_sync)
+from database_manager import (claim_outbox_creates, claim_outbox_op, complete_outbox_op, complete_outbox_ops,
+                              dead_letter_outbox_op, enqueue_outbox_ops, extend_outbox_leases, get_outbox_job,
+                              purge_outbox_ops, retry_dead_outbox_ops, retry_outbox_op)
+from google_api_connection_v2 import (BATCH_SIZE, get_stored_service, get_stored_token, insert_events_batch,
+                                      is_retryable_error)
+from retry_policy import RETRYABLE_STATUS_CODES
+
+# -------------------------------------
+# CONFIG
+# -------------------------------------
+# Calendar writes go through the outbox table: the UI queues them as a job
+# and returns, and these workers send them to Google and only then record
+# them in the events table. A crash or outage leaves the rest of the job
+# queued instead of half-applied.
+WORKER_COUNT = 4           # Worker threads per process
+MAX_ATTEMPTS = 6           # Claims of one operation before it is dead-lettered
+BASE_DELAY = 5.0           # Seconds before the first retry; doubles each attempt
+MAX_DELAY = 300.0          # Cap on the wait between attempts
+POLL_INTERVAL = 1.0        # Seconds an idle worker sleeps unless woken by enqueue_job
+# How long a claimed operation belongs to its worker. It must outlast one
+# attempt (a delete is two calls of up to async_calendar.CALL_TIMEOUT, a batch
+# of creates one rate-limited batch call); after that, the operation is
+# assumed orphaned by a crash and handed out again.
+LEASE_SECONDS = 300.0
+# Finished (done or dead-lettered) operations are kept this long for job
+# progress and "Retry failed", then an idle worker purges them
+RETENTION = timedelta(days=7)
+PURGE_INTERVAL = 3600.0    # Seconds between purges in one process
+
+# Statuses that mean the calendar already has (or never had) what we asked for
+GONE_STATUS_CODES = {404, 410}
+# Batch items that failed with these are sent again one at a time: a 409 is
+# an insert that went through unacknowledged, a 401 needs a token refresh
+SINGLE_RETRY_STATUS_CODES = {401, 409}
+
+_workers = []
+_workers_lock = threading.Lock()
+_wake = threading.Event()
+_last_purge = None
+_purge_lock = threading.Lock()
+
+
+class OutboxError(Exception):
+    """A retryable failure that isn't an HTTP or transport error"""
+
+
+# -------------------------------------
+# OPERATIONS
+# -------------------------------------
+# Each handler performs one queued operation against Google Calendar and
+# returns a JSON-serializable result. Handlers must be safe to run again
+# after a partial or unacknowledged success.
+
+async def _create(token, user_key, op):
+    # The event ID is chosen when the job is queued, so a retry after an
+    # insert that succeeded but wasn't acknowledged gets a 409, not a duplicate
+    event_details = dict(op['payload']['event_details'], id=op['event_id'])
+    try:
+        created = await google_create_event(token, event_details, user_key=user_key)
+    except httpx.HTTPStatusError as error:
+        if error.response.status_code != 409:
+            raise
+        created = await google_get_event(token, op['event_id'], user_key=user_key)
+    return {'id': created['id'], 'htmlLink': created.get('htmlLink')}
+
+async def _update(token, user_key, op):
+    updated = await google_update_event(token, op['event_id'], op['payload']['event_details'], user_key=user_key)
+    return {'id': updated['id'], 'htmlLink': updated.get('htmlLink')}
+
+async def _delete(token, user_key, op):
+    # Delete the whole series: the master event if this is one of its instances
+    try:
+        event = await google_get_event(token, op['event_id'], user_key=user_key)
+        await google_delete_event(token, event.get('recurringEventId') or op['event_id'], user_key=user_key)
+    except httpx.HTTPStatusError as error:
+        if error.response.status_code not in GONE_STATUS_CODES:
+            raise
+    return {'id': op['event_id']}
+
+async def _delete_occurrence(token, user_key, op):
+    # Deleting one instance cancels that meeting; the rest of the series stays.
+    # originalStart finds it even if it was moved, and an already cancelled
+    # instance (or a deleted series) leaves nothing to do.
+    try:
+        instances = await google_list_instances(token, op['event_id'], user_key=user_key,
+                                                originalStart=op['payload']['original_start'])
+        for instance in instances:
+            await google_delete_event(token, instance['id'], user_key=user_key)
+    except httpx.HTTPStatusError as error:
+        if error.response.status_code not in GONE_STATUS_CODES:
+            raise
+    return {'id': op['event_id'], 'original_start': op['payload']['original_start']}
+
+HANDLERS = {
+    'create': _create,
+    'update': _update,
+    'delete': _delete,
+    'delete_occurrence': _delete_occurrence
+}
+
+
+# -------------------------------------
+# WORKERS
+# -------------------------------------
+def _is_retryable(error):
+    """True if another attempt later could succeed"""
+    if isinstance(error, httpx.HTTPStatusError):
+        response = error.response
+        # A 401 only gets here after _process refreshed the token and was refused again
+        return (response.status_code in RETRYABLE_STATUS_CODES
+                or (response.status_code == 403 and google_rate_limited(response)))
+    # HttpError and httplib2 errors come from Calendar batch calls
+    return isinstance(error, (httpx.TransportError, TimeoutError, OutboxError)) or is_retryable_error(error)
+
+def _retry_delay(attempts):
+    """Seconds before the next attempt, with jitter so a failed job's operations spread out"""
+    return min(MAX_DELAY, BASE_DELAY * (2 ** (attempts - 1))) * random.uniform(0.5, 1.0)
+
+def _run(op, force_refresh=False):
+    token, user_key = get_stored_token(op['user_id'], force_refresh)
+    if not token:
+        raise OutboxError(f"No stored Google credentials for {op['user_id']}")
+    return run_sync(HANDLERS[op['op']](token, user_key, op))
+
+def _process(op):
+    """Run one claimed operation and record its outcome.
+
+    Any error is recorded against the operation: retryable ones are
+    scheduled again, everything else (a revoked grant, unusable stored
+    credentials, a bug in a handler) is dead-lettered at once.
+    """
+    try:
+        try:
+            result = _run(op)
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code != 401:
+                raise
+            # Credentials only refresh once .valid turns False, so a token the
+            # calendar has stopped accepting would be reused on every retry
+            result = _run(op, force_refresh=True)
+    except Exception as error:
+        _record_failure(op, error)
+        return
+    complete_outbox_op(op, result)
+
+def _record_failure(op, error):
+    """Queue a failed operation again if it can still succeed and has attempts left; dead-letter it otherwise"""
+    message = f"{type(error).__name__}: {error}"
+    if _is_retryable(error) and op['attempts'] < MAX_ATTEMPTS:
+        retry_outbox_op(op['op_id'], message, time.time() + _retry_delay(op['attempts']))
+    else:
+        dead_letter_outbox_op(op['op_id'], message)
+
+def _process_creates(ops):
+    """Send a user's claimed creates as Calendar batch calls and record each outcome.
+
+    Created events are recorded together in one transaction. Items that
+    failed with a SINGLE_RETRY_STATUS_CODES status (or got no answer) go
+    through _process one at a time; every other failure is retried later
+    or dead-lettered directly, as _process would.
+    """
+    try:
+        service, user_key = get_stored_service(ops[0]['user_id'])
+        if service is None:
+            raise OutboxError(f"No stored Google credentials for {ops[0]['user_id']}")
+        bodies = [dict(op['payload']['event_details'], id=op['event_id']) for op in ops]
+        results = insert_events_batch(service, bodies, user_key)
+    except Exception as error:
+        results = [(None, error)] * len(ops)
+
+    completions = []
+    one_at_a_time = []
+    for op, (created, error) in zip(ops, results):
+        if created is not None:
+            completions.append((op, {'id': created['id'], 'htmlLink': created.get('htmlLink')}))
+        elif error is None or (isinstance(error, HttpError) and error.resp.status in SINGLE_RETRY_STATUS_CODES):
+            one_at_a_time.append(op)
+        else:
+            _record_failure(op, error)
+    complete_outbox_ops(completions)
+
+    for position, op in enumerate(one_at_a_time):
+        # Each one can take up to a lease, so renew the lease of every op still waiting
+        extend_outbox_leases([waiting['op_id'] for waiting in one_at_a_time[position:]],
+                             time.time() + LEASE_SECONDS)
+        _process(op)
+
+def _run_next():
+    """Claim and run the next due operation; False if nothing was due"""
+    op = claim_outbox_op(time.time(), LEASE_SECONDS, MAX_ATTEMPTS)
+    if op is None:
+        return False
+    # A user's due creates go out together: one batch call per BATCH_SIZE events
+    ops = [op]
+    if op['op'] == 'create':
+        ops += claim_outbox_creates(op['user_id'], time.time(), LEASE_SECONDS, BATCH_SIZE - 1)
+    if len(ops) > 1:
+        _process_creates(ops)
+    else:
+        _process(op)
+    return True
+
+def _purge_finished():
+    """Drop operations that finished more than RETENTION ago, at most once per PURGE_INTERVAL"""
+    global _last_purge
+    now = time.monotonic()
+    with _purge_lock:
+        if _last_purge is not None and now - _last_purge < PURGE_INTERVAL:
+            return
+        _last_purge = now
+    purge_outbox_ops(datetime.now() - RETENTION)
+
+def _worker_loop():
+    while True:
+        try:
+            if not _run_next():
+                _purge_finished()
+                _wake.wait(POLL_INTERVAL)
+                _wake.clear()
+        except Exception as e:
+            # Keep the worker alive; an operation it held is reclaimed when its lease runs out
+            print(f"Outbox worker error: {e}")
+            time.sleep(POLL_INTERVAL)
+
+def start_outbox_workers(count=WORKER_COUNT):
+    """Start the worker threads (once per process; later calls do nothing)"""
+    with _workers_lock:
+        if _workers:
+            return
+        for index in range(count):
+            worker = threading.Thread(target=_worker_loop, name=f"outbox-worker-{index}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+# -------------------------------------
+# JOBS
+# -------------------------------------
+def new_event_id():
+    """A Google Calendar event ID (base32hex, 32 characters) for an event we are about to create"""
+    return uuid.uuid4().hex
+
+def _idempotency_key(job_id, operation):
+    # An event (or one occurrence) has at most one create or delete queued
+    # at a time, whichever job asks for it; every job's update is applied
+    if operation['op'] == 'update':
+        return f"update:{operation['event_id']}:{job_id}"
+    if operation['op'] == 'delete_occurrence':
+        return f"delete_occurrence:{operation['event_id']}:{operation['payload']['original_start']}"
+    return f"{operation['op']}:{operation['event_id']}"
+
+def enqueue_job(user_id, operations):
+    """Queue calendar writes for the workers and return without waiting for them.
+
+    Args:
+        user_id (str): Whose calendar to write to.
+        operations (list): Dicts with 'op' ('create', 'update', 'delete' or
+            'delete_occurrence'), 'event_id' (from new_event_id for creates)
+            and 'payload'. Every payload has a 'label' for progress messages;
+            creates also carry 'event_details' and 'event_info', updates
+            'event_details' and 'updated_info', and occurrence deletes the
+            series event_id plus 'original_start' (RFC 3339).
+
+    Returns:
+        tuple: (job_id, queued); queued excludes operations already in the
+        outbox, such as a second delete of the same event.
+    """
+    job_id = uuid.uuid4().hex
+    queued = enqueue_outbox_ops(job_id, user_id,
+                                [dict(operation, idempotency_key=_idempotency_key(job_id, operation))
+                                 for operation in operations],
+                                time.time())
+    if queued:
+        _wake.set()
+    return job_id, queued
+
+def get_job(job_id):
+    """A job's operations and status counts (see database_manager.get_outbox_job)"""
+    return get_outbox_job(job_id)
+
+def retry_dead_ops(job_id):
+    """Queue a job's dead-lettered operations again; returns how many"""
+    requeued = retry_dead_outbox_ops(job_id, time.time())
+    if requeued:
+        _wake.set()
+    return requeued
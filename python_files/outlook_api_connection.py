@@ -1,6 +1,17 @@
 from urllib import response
+import asyncio
+import base64
+import hashlib
+import json
 import msal
 import os
+import sqlite3
+import threading
+import time
+import httpx
+from async_calendar import calendar_request, gather_limited, run_sync
+from graph_client import GRAPH_BASE, graph_batch
+from database_manager import get_graph_endpoint, store_graph_endpoint
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -11,6 +22,15 @@ AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
 # Note: Do NOT include 'offline_access', 'openid', 'profile' - MSAL handles these automatically
 SCOPES = ["Calendars.ReadWrite", "User.Read"]
 REDIRECT_URI = os.getenv("REDIRECT_URI")
+MAX_CONCURRENT_REQUESTS = 8  # Creates in flight at once for concurrent event creation
+ENDPOINT_CACHE_TTL = 24 * 60 * 60  # Seconds to trust a remembered working endpoint
+
+# Event create endpoints, in order of preference (relative to GRAPH_BASE)
+EVENT_ENDPOINTS = ["/me/events", "/me/calendar/events"]
+
+# Working endpoint per account: {account_key: (endpoint, expires_at)}
+_endpoint_cache = {}
+_endpoint_cache_lock = threading.Lock()
 
 def get_msal_app():
     # Using PublicClientApplication since the app is registered as a public client
@@ -54,20 +74,8 @@ def refresh_token(token_obj):
     else:
         return None
 
-def schedule_outlook_event(token, event):
-    """
-    Schedule an event on Outlook calendar.
-    Tries multiple endpoints to work around account type restrictions.
-    """
-    import requests
-    import json
-
-    # List of endpoints to try (in order of preference)
-    endpoints = [
-        "https://graph.microsoft.com/v1.0/me/events",  # Standard endpoint
-        "https://graph.microsoft.com/v1.0/me/calendar/events",  # Calendar-specific
-    ]
-    
+def _validate_outlook_event(token, event):
+    """Return an error dict if the token or event payload is unusable, else None"""
     # Debug: Check token format
     if not token or not isinstance(token, str):
         return {
@@ -113,19 +121,81 @@ def schedule_outlook_event(token, event):
             "end": event.get("end")
         }
     
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    return None
+
+def _account_key(token, account=None):
+    """
+    Identify the account behind a token for endpoint caching.
+    Uses the explicit account if given, else the tenant and object IDs
+    from a JWT access token, else a hash of the (opaque) token itself.
+    """
+    if account:
+        return account
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        if claims.get("tid") and claims.get("oid"):
+            return f"{claims['tid']}:{claims['oid']}"
+    except (IndexError, ValueError, AttributeError):
+        pass
+    return hashlib.sha256(str(token).encode("utf-8")).hexdigest()
+
+def _ordered_endpoints(account_key):
+    """Return EVENT_ENDPOINTS with the account's known working endpoint first"""
+    now = time.monotonic()
+    with _endpoint_cache_lock:
+        cached = _endpoint_cache.get(account_key)
+    endpoint = cached[0] if cached and cached[1] > now else None
+    if endpoint is None:
+        try:
+            endpoint = get_graph_endpoint(account_key, ENDPOINT_CACHE_TTL)
+        except sqlite3.Error:
+            endpoint = None
+        if endpoint:
+            with _endpoint_cache_lock:
+                _endpoint_cache[account_key] = (endpoint, now + ENDPOINT_CACHE_TTL)
+    if endpoint in EVENT_ENDPOINTS:
+        return [endpoint] + [other for other in EVENT_ENDPOINTS if other != endpoint]
+    return list(EVENT_ENDPOINTS)
+
+def _remember_endpoint(account_key, endpoint):
+    """Record the endpoint that just worked, in memory and in the database"""
+    now = time.monotonic()
+    with _endpoint_cache_lock:
+        cached = _endpoint_cache.get(account_key)
+        if cached and cached[0] == endpoint and cached[1] > now:
+            return
+        _endpoint_cache[account_key] = (endpoint, now + ENDPOINT_CACHE_TTL)
+    try:
+        store_graph_endpoint(account_key, endpoint)
+    except sqlite3.Error as e:
+        print(f"Could not persist Graph endpoint: {e}")
+
+async def schedule_outlook_event_async(token, event, account=None):
+    """
+    Schedule an event on Outlook calendar, on the shared async client.
+    Tries multiple endpoints to work around account type restrictions,
+    starting with the one that last worked for this account.
+    """
+    account_key = _account_key(token, account)
+    
+    # List of endpoints to try (in order of preference). The endpoint cache
+    # can fall through to SQLite, so it is consulted off the I/O loop.
+    endpoints = [f"{GRAPH_BASE}{path}" for path in await asyncio.to_thread(_ordered_endpoints, account_key)]
+    
+    validation_error = _validate_outlook_event(token, event)
+    if validation_error:
+        return validation_error
     
     # Try each endpoint
     last_error = None
     for endpoint in endpoints:
         try:
-            response = requests.post(endpoint, headers=headers, json=event, timeout=10)
+            response = await calendar_request("POST", endpoint, token, json=event)
             
             if response.status_code == 201:
                 # Success!
+                await asyncio.to_thread(_remember_endpoint, account_key, endpoint[len(GRAPH_BASE):])
                 response_data = response.json()
                 return response_data
             else:
@@ -135,13 +205,13 @@ def schedule_outlook_event(token, event):
                     "status_code": response.status_code,
                     "response": response.text if response.text else "(empty response body)"
                 }
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             last_error = {
                 "endpoint": endpoint,
                 "status_code": 408,
                 "response": "Request timeout"
             }
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             last_error = {
                 "endpoint": endpoint,
                 "status_code": 0,
@@ -163,16 +233,110 @@ def schedule_outlook_event(token, event):
         "event_json": event
     }
     return error_info
+
+def schedule_outlook_event(token, event, account=None):
+    """
+    Schedule an event on Outlook calendar (blocking wrapper around
+    schedule_outlook_event_async). Returns the created event or an error dict.
+    """
+    try:
+        return run_sync(schedule_outlook_event_async(token, event, account))
+    except TimeoutError:
+        return {"status_code": 408, "error": "Request timeout"}
     
-def update_outlook_event(event_id, updated_event, token):
-    import requests
+def schedule_outlook_events(token, events, max_workers=MAX_CONCURRENT_REQUESTS, account=None):
+    """
+    Schedule many events on Outlook calendar concurrently.
+    Runs schedule_outlook_event_async with at most max_workers in flight
+    and returns its result for each event, in the same order as events.
+    """
+    if not events:
+        return []
+    calls = [lambda event=event: schedule_outlook_event_async(token, event, account) for event in events]
+    # No overall deadline: every request has its own timeout and retry budget
+    outcomes = run_sync(gather_limited(calls, max_workers), timeout=None)
+    return [{"status_code": 0, "error": str(outcome)} if isinstance(outcome, Exception) else outcome
+            for outcome in outcomes]
 
-    endpoint = f"https://graph.microsoft.com/v1.0/me/events/{event_id}"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    response = requests.patch(endpoint, headers=headers, json=updated_event)
+def _batch_results(responses, count, success_status):
+    """Turn graph_batch responses into one result per operation, in order"""
+    results = []
+    for index in range(count):
+        item = responses.get(str(index), {"status": 0, "headers": {}, "body": "No response for request"})
+        if item["status"] == success_status:
+            results.append(item["body"] if item["body"] is not None else {"status_code": item["status"]})
+        else:
+            results.append({
+                "status_code": item["status"],
+                "error": json.dumps(item["body"], indent=2) if isinstance(item["body"], dict) else item["body"]
+            })
+    return results
+
+def schedule_outlook_events_batch(token, events, account=None):
+    """
+    Schedule many events on Outlook calendar using Graph JSON $batch.
+    Creates are packed 20 per request; throttled items are retried by
+    graph_batch. Creates go to the account's known working endpoint first;
+    any rejected there are retried together on the other endpoint,
+    mirroring the fallback in schedule_outlook_event.
+    Returns one result per event, in order: the created event, or an
+    error dict with status_code.
+    """
+    results = [None] * len(events)
+    to_send = []
+    for index, event in enumerate(events):
+        validation_error = _validate_outlook_event(token, event)
+        if validation_error:
+            results[index] = validation_error
+        else:
+            to_send.append(index)
+    
+    account_key = _account_key(token, account)
+    for url in _ordered_endpoints(account_key):
+        if not to_send:
+            break
+        operations = [{"id": str(position), "method": "POST", "url": url, "body": events[index]}
+                      for position, index in enumerate(to_send)]
+        batch_results = _batch_results(graph_batch(token, operations), len(operations), 201)
+        failed = []
+        for index, result in zip(to_send, batch_results):
+            results[index] = result
+            if "status_code" not in result:
+                _remember_endpoint(account_key, url)
+            # Throttling was already retried; only endpoint rejections go to the fallback
+            if "status_code" in result and result["status_code"] not in (0, 429, 503, 504):
+                failed.append(index)
+        to_send = failed
+    return results
+
+def update_outlook_events_batch(token, updates):
+    """
+    Update many Outlook events using Graph JSON $batch.
+    updates is a list of (event_id, updated_event) pairs. Returns one
+    result per update, in order: the updated event, or an error dict.
+    """
+    operations = [{"id": str(index), "method": "PATCH", "url": f"/me/events/{event_id}", "body": updated_event}
+                  for index, (event_id, updated_event) in enumerate(updates)]
+    return _batch_results(graph_batch(token, operations), len(operations), 200) if operations else []
+
+def delete_outlook_events_batch(token, event_ids):
+    """
+    Delete many Outlook events using Graph JSON $batch.
+    Returns one result per event ID, in order: {"status_code": 204} on
+    success, or an error dict.
+    """
+    operations = [{"id": str(index), "method": "DELETE", "url": f"/me/events/{event_id}"}
+                  for index, event_id in enumerate(event_ids)]
+    return _batch_results(graph_batch(token, operations), len(operations), 204) if operations else []
+
+def update_outlook_event(event_id, updated_event, token):
+    try:
+        response = run_sync(calendar_request("PATCH", f"/me/events/{event_id}", token, json=updated_event))
+    except (httpx.HTTPError, TimeoutError) as e:
+        return {
+            "status_code": 408 if isinstance(e, (httpx.TimeoutException, TimeoutError)) else 0,
+            "error": str(e)
+        }
     if response.status_code == 200:
         response_data = response.json()
         return response_data
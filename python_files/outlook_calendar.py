@@ -1,10 +1,13 @@
-import requests
+import httpx
 import streamlit as st
 from msal import PublicClientApplication
 from datetime import datetime
 import re
 from dotenv import load_dotenv
 import os
+from async_calendar import calendar_request, run_sync
+from graph_client import graph_request
+from calendar_sync import sync_outlook_events
 
 load_dotenv()
 # --------------------------
@@ -15,7 +18,6 @@ TENANT_ID = os.getenv("TENANT_ID")
 REDIRECT_URI = os.getenv("REDIRECT_URI")
 SCOPES = ["User.Read", "Calendars.ReadWrite"]
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
-GRAPH_BASE = "https://graph.microsoft.com/v1.0"
 
 # --------------------------
 # MSAL PKCE app
@@ -61,8 +63,11 @@ def get_access_token():
 # --------------------------
 def get_user_info():
     token = get_access_token()
-    headers = {"Authorization": f"Bearer {token}"}
-    r = requests.get(f"{GRAPH_BASE}/me", headers=headers)
+    try:
+        r = graph_request("GET", "/me", token)
+    except (httpx.HTTPError, TimeoutError) as e:
+        st.error(f"Failed to fetch user info: {e}")
+        return None
     if r.status_code == 200:
         user = r.json()
         return {
@@ -101,7 +106,6 @@ def parse_recurrence_rule(rrule, start_date):
 # --------------------------
 def create_event(event_details):
     token = get_access_token()
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     event_body = {
         "subject": event_details["summary"],
@@ -116,10 +120,25 @@ def create_event(event_details):
             event_details["start"]["dateTime"].split("T")[0]
         )
 
-    response = requests.post(f"{GRAPH_BASE}/me/events", headers=headers, json=event_body)
+    try:
+        response = run_sync(calendar_request("POST", "/me/events", token, json=event_body))
+    except (httpx.HTTPError, TimeoutError) as e:
+        st.error(f"Failed to create event: {e}")
+        return None
     if response.status_code == 201:
         st.success("✅ Outlook event created successfully!")
         return response.json()
     else:
         st.error(f"Failed to create event ({response.status_code}): {response.text}")
         return None
+
+# --------------------------
+# Sync
+# --------------------------
+def sync_events(user_id):
+    token = get_access_token()
+    try:
+        return sync_outlook_events(token, user_id)
+    except (httpx.HTTPError, TimeoutError) as e:
+        st.error(f"Failed to sync Outlook calendar: {e}")
+        return None
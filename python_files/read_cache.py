@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------------------
+# CONFIG
+# -------------------------------------
+CACHE_MAX_ENTRIES = 1024   # Across all users and sessions; least recently used entries go first
+CACHE_TTL_SECONDS = 300    # Also bounds staleness from writers outside this process
+
+# (namespace, user_id, key) -> (expires_at, value), oldest use first
+_entries = OrderedDict()
+# user_id -> keys of that user's entries, so invalidation doesn't scan the cache
+_user_keys = {}
+# user_id -> write generation; a load that raced a write is not cached
+_generations = {}
+_global_generation = 0
+_lock = threading.Lock()
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,      # Dropped to stay under CACHE_MAX_ENTRIES
+    "expirations": 0,    # Found past their TTL
+    "invalidations": 0   # Dropped because the user's data changed
+}
+
+
+# -------------------------------------
+# INTERNALS
+# -------------------------------------
+def _drop(cache_key):
+    """Remove one entry (caller holds _lock)"""
+    _entries.pop(cache_key, None)
+    keys = _user_keys.get(cache_key[1])
+    if keys is not None:
+        keys.discard(cache_key)
+        if not keys:
+            del _user_keys[cache_key[1]]
+
+def _generation(user_id):
+    return _global_generation, _generations.get(user_id, 0), _generations.get(None, 0)
+
+
+# -------------------------------------
+# CACHE
+# -------------------------------------
+def cached_read(namespace, user_id, key, load, ttl=CACHE_TTL_SECONDS):
+    """Return the cached result of a user-scoped read, calling load() on a miss.
+
+    Like st.cache_data, but keyed explicitly by user and dropped by
+    invalidate_user() when that user's data is written, rather than by
+    hashing arguments. Results are shared between callers and must be
+    treated as read-only; copy before mutating.
+
+    Args:
+        namespace (str): Which read this is, e.g. "events".
+        user_id: Owner of the data (None for reads across all users).
+        key: Hashable arguments that distinguish reads in the namespace.
+        load (callable): Produces the value on a miss.
+        ttl (float): Seconds the value may be served.
+    """
+    cache_key = (namespace, user_id, key)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(cache_key)
+        if entry is not None:
+            if entry[0] > now:
+                _entries.move_to_end(cache_key)
+                _stats["hits"] += 1
+                return entry[1]
+            _drop(cache_key)
+            _stats["expirations"] += 1
+        _stats["misses"] += 1
+        generation = _generation(user_id)
+
+    value = load()
+
+    with _lock:
+        # Don't cache a value that a concurrent write has already made stale
+        if _generation(user_id) == generation:
+            _entries[cache_key] = (now + ttl, value)
+            _entries.move_to_end(cache_key)
+            _user_keys.setdefault(user_id, set()).add(cache_key)
+            while len(_entries) > CACHE_MAX_ENTRIES:
+                _drop(next(iter(_entries)))
+                _stats["evictions"] += 1
+    return value
+
+def invalidate_user(user_id):
+    """Drop a user's cached reads, and every all-users read, after that user's data changed"""
+    with _lock:
+        for owner in {user_id, None}:
+            _generations[owner] = _generations.get(owner, 0) + 1
+            for cache_key in list(_user_keys.get(owner, ())):
+                _drop(cache_key)
+                _stats["invalidations"] += 1
+
+def invalidate_all():
+    """Drop every cached read (e.g. after clearing the database)"""
+    global _global_generation
+    with _lock:
+        _global_generation += 1
+        _stats["invalidations"] += len(_entries)
+        _entries.clear()
+        _user_keys.clear()
+        _generations.clear()
+
+def get_cache_stats():
+    """Return a snapshot of the cache counters and current size"""
+    with _lock:
+        return dict(_stats, entries=len(_entries))
@@ -0,0 +1,177 @@
+from datetime import date, datetime, time, timedelta
+import numpy as np
+
+# RFC 5545 day codes in numpy weekday order (0 = Monday)
+DAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+_EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday
+
+
+# -------------------------------------
+# PARSING
+# -------------------------------------
+def parse_rrule(rule):
+    """Parse 'RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=...' into a dict of its parts"""
+    if rule.startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+    return {key.upper(): value for key, value in
+            (part.split("=", 1) for part in rule.split(";") if "=" in part)}
+
+def _parse_ical_datetime(value):
+    """Parse an iCalendar DATE or DATE-TIME ('20251215', '20251215T235959Z') as a naive datetime"""
+    value = value.rstrip("Z")
+    if "T" in value:
+        return datetime.strptime(value, "%Y%m%dT%H%M%S")
+    return datetime.strptime(value, "%Y%m%d")
+
+def parse_recurrence(recurrence):
+    """Split a Google-style recurrence list into (rrule_dict, exdates).
+
+    EXDATE lines may carry a TZID parameter and several comma-separated
+    values; all are returned as naive wall-clock datetimes.
+    """
+    rrule = {}
+    exdates = []
+    for line in recurrence or []:
+        name, _, value = line.partition(":")
+        if name == "RRULE":
+            rrule = parse_rrule(value)
+        elif name.split(";")[0] == "EXDATE":
+            exdates.extend(_parse_ical_datetime(item) for item in value.split(",") if item)
+    return rrule, exdates
+
+
+# -------------------------------------
+# VECTORIZED DATE MATH
+# -------------------------------------
+def weekdays_of(days):
+    """Weekday (0 = Monday) of every element of a datetime64[D] array"""
+    return (days.astype("int64") + _EPOCH_WEEKDAY) % 7
+
+def weekday_mask(day_indexes):
+    """Boolean lookup table, indexed by weekday, that is True for the given weekdays"""
+    mask = np.zeros(7, dtype=bool)
+    mask[list(day_indexes)] = True
+    return mask
+
+def _rule_dates(first_day, last_day, freq, interval, byday):
+    """All dates in [first_day, last_day] matching a DAILY/WEEKLY rule, as datetime64[D]"""
+    days = np.arange(np.datetime64(first_day, "D"), np.datetime64(last_day, "D") + 1)
+    if freq == "DAILY":
+        keep = (days - days[0]).astype("int64") % interval == 0 if len(days) else np.ones(0, dtype=bool)
+        if byday is not None:
+            keep &= byday[weekdays_of(days)]
+        return days[keep]
+    # WEEKLY: weeks start on Monday (WKST=MO); count them from dtstart's week
+    weekdays = weekdays_of(days)
+    week_start = np.datetime64(first_day, "D") - int(weekdays_of(np.array([first_day], dtype="datetime64[D]"))[0])
+    week_index = (days - week_start).astype("int64") // 7
+    return days[byday[weekdays] & (week_index % interval == 0)]
+
+
+# -------------------------------------
+# EXPANSION
+# -------------------------------------
+def expand_occurrences(dtstart, rrule, window_start=None, window_end=None, exdates=(), overrides=None):
+    """Expand a DAILY or WEEKLY recurrence locally, with no API calls.
+
+    Matches python-dateutil's rrule semantics: occurrences fall on or after
+    dtstart, UNTIL is inclusive and COUNT counts rule instances before
+    EXDATEs are removed. Datetimes are naive wall-clock times; a UTC
+    UNTIL ('...Z') is compared as wall-clock time, which is how the
+    scheduler writes it (end date at 23:59:59).
+
+    Args:
+        dtstart (datetime): First occurrence; its time of day is used for all.
+        rrule (str or dict): The RRULE, as a string or parse_rrule() dict.
+        window_start, window_end (datetime): Optional bounds (inclusive).
+        exdates (iterable): Occurrence datetimes (or dates) to drop.
+        overrides (dict): Original occurrence start -> new start datetime,
+            or None to cancel that occurrence.
+
+    Returns:
+        list: Sorted occurrence start datetimes within the window.
+    """
+    rule = parse_rrule(rrule) if isinstance(rrule, str) else dict(rrule)
+    freq = rule.get("FREQ", "WEEKLY").upper()
+    if freq not in ("DAILY", "WEEKLY"):
+        raise ValueError(f"Unsupported recurrence frequency: {freq}")
+    interval = int(rule.get("INTERVAL", 1))
+    count = int(rule["COUNT"]) if "COUNT" in rule else None
+    until = _parse_ical_datetime(rule["UNTIL"]) if "UNTIL" in rule else None
+
+    if "BYDAY" in rule:
+        byday = weekday_mask(DAY_CODES.index(code[-2:]) for code in rule["BYDAY"].split(",") if code[-2:] in DAY_CODES)
+    elif freq == "WEEKLY":
+        byday = weekday_mask([dtstart.weekday()])
+    else:
+        byday = None
+
+    # Pick the last date we ever need to generate
+    first_day = dtstart.date()
+    limits = []
+    if until is not None:
+        until_day = until.date()
+        if until.time() < dtstart.time():
+            until_day -= timedelta(days=1)
+        limits.append(until_day)
+    if count is not None:
+        # Worst case is one match per week-of-intervals (e.g. DAILY;INTERVAL=3;BYDAY=MO)
+        limits.append(first_day + timedelta(days=7 * interval * count + 7))
+    if window_end is not None and count is None:
+        limits.append(window_end.date())
+    if not limits:
+        raise ValueError("An unbounded recurrence needs UNTIL, COUNT or window_end")
+    last_day = min(limits)
+    if last_day < first_day:
+        return []
+
+    days = _rule_dates(first_day, last_day, freq, interval, byday)
+    if count is not None:
+        days = days[:count]
+
+    start_time = dtstart.time()
+    occurrences = [datetime.combine(day, start_time) for day in days.astype(date)]
+
+    excluded = set()
+    for exdate in exdates:
+        excluded.add(exdate if isinstance(exdate, datetime) else datetime.combine(exdate, start_time))
+    if excluded:
+        occurrences = [occurrence for occurrence in occurrences if occurrence not in excluded]
+
+    if overrides:
+        moved = []
+        for occurrence in occurrences:
+            if occurrence in overrides:
+                if overrides[occurrence] is not None:
+                    moved.append(overrides[occurrence])
+            else:
+                moved.append(occurrence)
+        occurrences = sorted(moved)
+
+    if window_start is not None:
+        occurrences = [occurrence for occurrence in occurrences if occurrence >= window_start]
+    if window_end is not None:
+        occurrences = [occurrence for occurrence in occurrences if occurrence <= window_end]
+    return occurrences
+
+def get_series_occurrences(event, window_start=None, window_end=None):
+    """All occurrences of a stored series (an events table row) in a window.
+
+    Rebuilds the weekly rule the scheduler created from the row's days,
+    time slot and date range, so nothing is fetched from the calendar API.
+    """
+    try:
+        start_clock = event['time_slot'].split(' - ')[0]
+        dtstart = datetime.combine(date.fromisoformat(event['start_date']),
+                                   datetime.strptime(start_clock, "%I:%M %p").time())
+        until = datetime.combine(date.fromisoformat(event['end_date']), time(23, 59, 59))
+    except (KeyError, TypeError, ValueError):
+        # Rows that don't look like a scheduler-created series
+        return []
+    byday = [DAY_CODES[DAY_NAMES.index(day)] for day in event['days'] if day in DAY_NAMES]
+    rule = {"FREQ": "WEEKLY", "BYDAY": ",".join(byday), "UNTIL": until.strftime("%Y%m%dT%H%M%S")}
+    if not byday:
+        return []
+    return expand_occurrences(dtstart, rule, window_start, window_end)
@@ -0,0 +1,243 @@
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# -------------------------------------
+# CONFIG
+# -------------------------------------
+MAX_ATTEMPTS = 5          # First try plus up to four retries
+BASE_DELAY = 0.5          # Seconds; doubles on every retry
+MAX_DELAY = 30.0          # Cap on a single backoff sleep
+MAX_RETRY_AFTER = 60.0    # Never wait longer than this, whatever the server asks for
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Per-user client-side limiter: sustained requests per second and burst size
+USER_REQUEST_RATE = 5.0
+USER_REQUEST_BURST = 10
+LIMITER_CACHE_SIZE = 1024  # Max number of users with a limiter; the least recently used is dropped
+
+
+# -------------------------------------
+# BACKOFF
+# -------------------------------------
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds, or None"""
+    if value is None or value == "":
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to wait before retry number `attempt` (1-based).
+
+    Uses full jitter (a random delay up to the exponential cap) so many
+    clients throttled at once don't all retry in lockstep. A server-sent
+    Retry-After is treated as a floor.
+    """
+    delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * (2 ** (attempt - 1))))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+# -------------------------------------
+# RATE LIMITING
+# -------------------------------------
+class TokenBucket:
+    """Thread-safe token bucket: bursts up to `capacity`, refills at `rate` tokens/second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if they are available now. Returns 0.0, or the seconds to wait before trying again.
+
+        At most `capacity` tokens can be taken at once; use acquire() for more.
+        """
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, sleep=time.sleep):
+        """Block until `tokens` are available and take them. Returns seconds waited.
+
+        More than `capacity` tokens are taken in capacity-sized steps, so a
+        large batch waits for its full cost rather than one burst's worth.
+        """
+        waited = 0.0
+        for step in self.steps(tokens):
+            while True:
+                wait = self.try_acquire(step)
+                if not wait:
+                    break
+                sleep(wait)
+                waited += wait
+        return waited
+
+    def steps(self, tokens):
+        """Split `tokens` into chunks of at most `capacity`"""
+        full, rest = divmod(tokens, self.capacity)
+        return [self.capacity] * full + ([rest] if rest else [])
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(user_key):
+    """Return the shared token bucket for a user, creating it on first use"""
+    with _limiters_lock:
+        # Re-inserted on every use, so the first key is the least recently used
+        limiter = _limiters.pop(user_key, None)
+        if limiter is None:
+            limiter = TokenBucket(USER_REQUEST_RATE, USER_REQUEST_BURST)
+            if len(_limiters) >= LIMITER_CACHE_SIZE:
+                _limiters.pop(next(iter(_limiters)))
+        _limiters[user_key] = limiter
+        return limiter
+
+
+# -------------------------------------
+# METRICS
+# -------------------------------------
+_metrics = {
+    "attempts": 0,            # Requests sent, including retries
+    "retries": 0,             # Attempts that were retried
+    "retry_after_honored": 0, # Retries that waited for a server Retry-After
+    "gave_up": 0,             # Calls that were still failing after MAX_ATTEMPTS
+    "throttled_seconds": 0.0  # Time spent waiting on the client-side limiter
+}
+_metrics_lock = threading.Lock()
+
+def record_metric(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+def get_retry_metrics():
+    """Return a snapshot of the retry counters"""
+    with _metrics_lock:
+        return dict(_metrics)
+
+def reset_retry_metrics():
+    with _metrics_lock:
+        for name in _metrics:
+            _metrics[name] = 0.0 if name == "throttled_seconds" else 0
+
+
+# -------------------------------------
+# RETRY LOOP
+# -------------------------------------
+def throttle(user_key, tokens=1, sleep=time.sleep):
+    """Wait on the user's rate limiter before sending `tokens` requests"""
+    if user_key is None:
+        return
+    waited = get_rate_limiter(user_key).acquire(tokens, sleep=sleep)
+    if waited:
+        record_metric("throttled_seconds", waited)
+
+def call_with_retry(send, should_retry, user_key=None, max_attempts=MAX_ATTEMPTS, sleep=time.sleep):
+    """Run one request under the shared retry policy.
+
+    Args:
+        send (callable): Performs a single attempt; returns the outcome or raises.
+        should_retry (callable): Called as should_retry(outcome, error) and
+            returns (retry, retry_after_seconds_or_None).
+        user_key: Identifies the user for the per-user rate limiter (None to skip it).
+        max_attempts (int): Total attempts, including the first.
+        sleep (callable): Injected so tests can run without real waits.
+
+    Returns:
+        The outcome of the last attempt. If the last attempt raised, the
+        exception is re-raised.
+    """
+    for attempt in range(1, max_attempts + 1):
+        throttle(user_key, sleep=sleep)
+        record_metric("attempts")
+        outcome, error = None, None
+        try:
+            outcome = send()
+        except Exception as exc:
+            error = exc
+
+        retry, retry_after = should_retry(outcome, error)
+        if not retry or attempt == max_attempts:
+            if retry:
+                record_metric("gave_up")
+            if error is not None:
+                raise error
+            return outcome
+
+        record_metric("retries")
+        if retry_after is not None:
+            record_metric("retry_after_honored")
+        sleep(backoff_delay(attempt, retry_after))
+
+
+# -------------------------------------
+# ASYNC RETRY LOOP
+# -------------------------------------
+# Same policy for coroutines: waits use asyncio.sleep, so a request that is
+# backing off or rate limited holds no thread, and cancelling the task
+# cancels the wait.
+
+async def throttle_async(user_key, tokens=1):
+    """Await the user's rate limiter before sending `tokens` requests"""
+    if user_key is None:
+        return
+    limiter = get_rate_limiter(user_key)
+    waited = 0.0
+    for step in limiter.steps(tokens):
+        while True:
+            wait = limiter.try_acquire(step)
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+    if waited:
+        record_metric("throttled_seconds", waited)
+
+async def call_with_retry_async(send, should_retry, user_key=None, max_attempts=MAX_ATTEMPTS):
+    """Coroutine version of call_with_retry; send() returns an awaitable for one attempt"""
+    for attempt in range(1, max_attempts + 1):
+        await throttle_async(user_key)
+        record_metric("attempts")
+        outcome, error = None, None
+        try:
+            outcome = await send()
+        except Exception as exc:  # CancelledError is not an Exception, so cancellation propagates
+            error = exc
+
+        retry, retry_after = should_retry(outcome, error)
+        if not retry or attempt == max_attempts:
+            if retry:
+                record_metric("gave_up")
+            if error is not None:
+                raise error
+            return outcome
+
+        record_metric("retries")
+        if retry_after is not None:
+            record_metric("retry_after_honored")
+        await asyncio.sleep(backoff_delay(attempt, retry_after))
@@ -0,0 +1,19 @@
+from datetime import date, timedelta
+from recurrence import DAY_NAMES
+
+
+def _day_indexes(day_names):
+    return [DAY_NAMES.index(day) for day in day_names if day in DAY_NAMES]
+
+def first_occurrence(begin_date, end_date, day_names):
+    """Earliest date in the window falling on one of the given days, as a date (or None).
+
+    Generate Schedule only needs each class's first meeting date (the rest
+    follow from the RRULE), so the semester's dates are never enumerated.
+    """
+    indexes = _day_indexes(day_names)
+    if not indexes:
+        return None
+    # The next matching weekday is at most six days out
+    first = begin_date + timedelta(days=min((index - begin_date.weekday()) % 7 for index in indexes))
+    return first if first <= end_date else None
@@ -0,0 +1,287 @@
+import heapq
+import time
+from calendar_model import SLOT_MINUTES, TIME_SLOTS, WEEKDAYS, event_minutes
+
+# -------------------------------------
+# CONFIG
+# -------------------------------------
+# Meeting patterns a class can be given, as day names
+PATTERNS = {
+    "MWF": ["Monday", "Wednesday", "Friday"],
+    "TTh": ["Tuesday", "Thursday"],
+    "MW": ["Monday", "Wednesday"],
+    "WF": ["Wednesday", "Friday"],
+    "MTWThF": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
+    "M": ["Monday"],
+    "T": ["Tuesday"],
+    "W": ["Wednesday"],
+    "Th": ["Thursday"],
+    "F": ["Friday"]
+}
+
+# Default preference weights; a weight of 0 turns a preference off
+DEFAULT_PREFERENCES = {
+    "early": 3,  # Per meeting that starts before EARLY_MINUTE
+    "late": 1,   # Per meeting that starts at or after LATE_MINUTE
+    "gaps": 2    # Per empty slot between two classes on the same day
+}
+EARLY_MINUTE = 9 * 60   # 9:00 AM
+LATE_MINUTE = 16 * 60   # 4:00 PM
+
+TOP_K = 5                # Ranked schedules to return
+SOLVE_TIME_LIMIT = 0.5   # Seconds before the search returns the best schedules found so far
+COUNT_MAX_STATES = 50000  # Memo entries count_schedules may keep before giving up
+
+# The week is a 5 x 8 grid packed into one int: bit (day * SLOTS_PER_DAY + slot)
+SLOTS_PER_DAY = len(TIME_SLOTS)
+DAY_BITS = (1 << SLOTS_PER_DAY) - 1
+
+
+# -------------------------------------
+# GRID
+# -------------------------------------
+def _cell_mask(days, slot_indexes):
+    mask = 0
+    for day in days:
+        for slot_index in slot_indexes:
+            mask |= 1 << (WEEKDAYS.index(day) * SLOTS_PER_DAY + slot_index)
+    return mask
+
+def blocked_cells(events):
+    """Grid cells already taken by existing events (events table dicts).
+
+    An event blocks every standard slot its time overlaps, on each of its
+    weekdays. Events with unparseable slots or weekend days are ignored.
+    """
+    mask = 0
+    for event in events:
+        minutes = event_minutes(event)
+        if minutes is None:
+            continue
+        start, end = minutes
+        overlapping = [index for index, slot in enumerate(TIME_SLOTS)
+                       if SLOT_MINUTES[slot][0] < end and SLOT_MINUTES[slot][1] > start]
+        mask |= _cell_mask([day for day in event.get('days') or [] if day in WEEKDAYS], overlapping)
+    return mask
+
+def _day_gaps(used):
+    """Empty slots between the first and last occupied slot, summed over the week"""
+    gaps = 0
+    for day in range(len(WEEKDAYS)):
+        occupied = (used >> (day * SLOTS_PER_DAY)) & DAY_BITS
+        if occupied:
+            low = (occupied & -occupied).bit_length() - 1
+            gaps += occupied.bit_length() - low - bin(occupied).count("1")
+    return gaps
+
+def _meeting_cost(slot, preferences):
+    start = SLOT_MINUTES[slot][0]
+    cost = 0
+    if start < EARLY_MINUTE:
+        cost += preferences.get("early", 0)
+    if start >= LATE_MINUTE:
+        cost += preferences.get("late", 0)
+    return cost
+
+def _class_options(spec, preferences):
+    """Every (mask, cost, days, time_slot) placement of one class, cheapest first"""
+    patterns = [PATTERNS[pattern] if isinstance(pattern, str) else pattern for pattern in spec['patterns']]
+    slots = [slot for slot in (spec.get('slots') or TIME_SLOTS) if slot in SLOT_MINUTES]
+    options = []
+    for days in patterns:
+        for slot in slots:
+            options.append((_cell_mask(days, [TIME_SLOTS.index(slot)]),
+                            _meeting_cost(slot, preferences) * len(days), days, slot))
+    options.sort(key=lambda option: (option[1], TIME_SLOTS.index(option[3])))
+    return options
+
+def _required_days(options):
+    """Per-day cell counts every placement of the class needs (days shared by all its patterns)"""
+    required = None
+    for mask, _, _, _ in options:
+        day_mask = {day for day in range(len(WEEKDAYS)) if (mask >> (day * SLOTS_PER_DAY)) & DAY_BITS}
+        required = day_mask if required is None else required & day_mask
+    return required or set()
+
+
+# -------------------------------------
+# SOLVER
+# -------------------------------------
+def solve_schedule(classes, preferences=None, blocked=0, top_k=TOP_K, time_limit=SOLVE_TIME_LIMIT):
+    """Find the best conflict-free placements of classes on the weekly grid.
+
+    Backtracking over the 5 x 8 grid with bitmask conflict checks:
+    - classes with identical requirements are placed as one group in a
+      fixed order, so swapping them never produces a "new" schedule;
+    - the most constrained group is placed next, and a branch is cut as
+      soon as a group runs out of placements or a weekday has fewer free
+      slots than the classes that must meet on it;
+    - branch-and-bound drops any branch whose lower bound (cost so far,
+      meetings forced into early/late slots, gaps no remaining class can
+      fill) can't beat the current top_k.
+
+    Args:
+        classes (list): One dict per class with 'patterns' (pattern names
+            from PATTERNS, or lists of day names; any one may be used) and
+            optional 'slots' (allowed time slots; empty means all).
+        preferences (dict): Weights overriding DEFAULT_PREFERENCES.
+        blocked (int): Cells that are already taken (see blocked_cells).
+        top_k (int): How many ranked schedules to return.
+        time_limit (float): Seconds to search before returning what was found.
+
+    Returns:
+        dict: 'schedules' (best first; each has 'score' and 'assignments',
+        one {'days', 'time_slot'} per class in input order), 'complete'
+        (False if the time limit cut the search short), 'nodes' and 'elapsed'.
+    """
+    weights = dict(DEFAULT_PREFERENCES)
+    weights.update(preferences or {})
+    gap_weight = weights.get("gaps", 0)
+    day_range = range(len(WEEKDAYS))
+
+    # Group classes that have exactly the same placements
+    groups = {}
+    for index, spec in enumerate(classes):
+        class_options = _class_options(spec, weights)
+        key = tuple(option[0] for option in class_options)
+        groups.setdefault(key, {'options': class_options, 'members': []})['members'].append(index)
+    groups = list(groups.values())
+    for group in groups:
+        group['required'] = _required_days(group['options'])
+        group['touched'] = {day for mask, _, _, _ in group['options'] for day in day_range
+                            if (mask >> (day * SLOTS_PER_DAY)) & DAY_BITS}
+        group['min_cost'] = group['options'][0][1] if group['options'] else 0
+
+    # Cells whose slot has no early/late penalty, and the cheapest penalty a meeting can pay
+    slot_costs = [_meeting_cost(slot, weights) for slot in TIME_SLOTS]
+    cheap_day = sum(1 << slot_index for slot_index, cost in enumerate(slot_costs) if cost == 0)
+    min_penalty = min((cost for cost in slot_costs if cost > 0), default=0)
+
+    started = time.perf_counter()
+    deadline = started + time_limit if time_limit else None
+    best = []  # Max-heap of (-score, tiebreak, assignment) holding the top_k so far
+    state = {'nodes': 0, 'complete': True}
+    remaining = [len(group['members']) for group in groups]
+    last_option = [-1] * len(groups)  # Members of a group take options in increasing order
+    chosen = [[] for _ in groups]
+
+    def kth_score():
+        return -best[0][0] if len(best) == top_k else None
+
+    def lower_bound(used, cost, remaining_min_cost):
+        forced = 0
+        unfillable = 0
+        for day in day_range:
+            occupied = (used >> (day * SLOTS_PER_DAY)) & DAY_BITS
+            demand = sum(remaining[g] for g, group in enumerate(groups) if remaining[g] and day in group['required'])
+            free = SLOTS_PER_DAY - bin(occupied).count("1")
+            if demand > free:
+                return None  # Not enough free slots on this day
+            forced += max(0, demand - bin(cheap_day & ~occupied).count("1"))
+            if gap_weight and occupied:
+                low = (occupied & -occupied).bit_length() - 1
+                holes = occupied.bit_length() - low - bin(occupied).count("1")
+                # Each remaining class meeting on this day can fill at most one hole
+                fillers = sum(remaining[g] for g, group in enumerate(groups) if remaining[g] and day in group['touched'])
+                unfillable += max(0, holes - fillers)
+        return cost + max(remaining_min_cost, forced * min_penalty) + gap_weight * unfillable
+
+    def search(used, cost, remaining_min_cost, left):
+        state['nodes'] += 1
+        if deadline is not None and state['nodes'] % 256 == 0 and time.perf_counter() > deadline:
+            state['complete'] = False
+            return
+        if not left:
+            score = cost + gap_weight * _day_gaps(used)
+            limit = kth_score()
+            if limit is None or score < limit:
+                entry = (-score, state['nodes'], [list(placed) for placed in chosen])
+                if limit is None:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heapreplace(best, entry)
+            return
+
+        bound = lower_bound(used, cost, remaining_min_cost)
+        limit = kth_score()
+        if bound is None or (limit is not None and bound >= limit):
+            return
+
+        # Most constrained group first
+        pick, pick_options = None, None
+        for g, group in enumerate(groups):
+            if not remaining[g]:
+                continue
+            feasible = [(position, option) for position, option in enumerate(group['options'])
+                        if position > last_option[g] and not option[0] & used]
+            if len(feasible) < remaining[g]:
+                return
+            if pick_options is None or len(feasible) < len(pick_options):
+                pick, pick_options = g, feasible
+
+        if gap_weight:
+            # Try placements that keep days compact first, so good schedules tighten the bound early
+            gaps = _day_gaps(used)
+            pick_options.sort(key=lambda item: item[1][1] + gap_weight * (_day_gaps(used | item[1][0]) - gaps))
+
+        group = groups[pick]
+        rest_min_cost = remaining_min_cost - group['min_cost']
+        previous_last = last_option[pick]
+        remaining[pick] -= 1
+        for position, (mask, option_cost, days, slot) in pick_options:
+            limit = kth_score()
+            if limit is not None and cost + option_cost + rest_min_cost >= limit:
+                continue
+            last_option[pick] = position
+            chosen[pick].append((days, slot))
+            search(used | mask, cost + option_cost, rest_min_cost, left - 1)
+            chosen[pick].pop()
+            if not state['complete']:
+                break
+        remaining[pick] += 1
+        last_option[pick] = previous_last
+
+    if classes and all(group['options'] for group in groups):
+        search(blocked, 0, sum(group['min_cost'] * len(group['members']) for group in groups), len(classes))
+
+    schedules = []
+    for negative_score, _, placements in sorted(best, key=lambda entry: (-entry[0], entry[1])):
+        assignments = [None] * len(classes)
+        for group, placed in zip(groups, placements):
+            # Members of a group are interchangeable; hand out placements in input order
+            for index, (days, slot) in zip(group['members'], placed):
+                assignments[index] = {'days': days, 'time_slot': slot}
+        schedules.append({'score': -negative_score, 'assignments': assignments})
+    return {
+        'schedules': schedules,
+        'complete': state['complete'],
+        'nodes': state['nodes'],
+        'elapsed': time.perf_counter() - started
+    }
+
+def count_schedules(classes, blocked=0, max_states=COUNT_MAX_STATES):
+    """Number of conflict-free placements of all classes, ignoring preferences.
+
+    Memoized on (class, occupied cells), so a count in the billions usually
+    takes milliseconds. Returns None if more than max_states partial grids
+    would have to be remembered.
+    """
+    options = sorted(([option[0] for option in _class_options(spec, {})] for spec in classes), key=len)
+    memo = {}
+
+    def count(index, used):
+        if index == len(options):
+            return 1
+        key = (index, used)
+        if key not in memo:
+            if len(memo) >= max_states:
+                raise OverflowError
+            memo[key] = sum(count(index + 1, used | mask) for mask in options[index] if not mask & used)
+        return memo[key]
+
+    if not classes:
+        return 0
+    try:
+        return count(0, blocked)
+    except OverflowError:
+        return None
@@ -1,14 +1,31 @@
+import os
+from zoneinfo import ZoneInfo
 import streamlit as st
 import pandas as pd
 from google_api_connection_v2 import *
 from database_manager import *
 import requests
+from time import perf_counter
+from recurrence import get_series_occurrences
+from schedule_expansion import first_occurrence
+from calendar_model import (DAY_CODES, SEMESTERS, SLOT_INDEX, TIME_SLOTS, WEEKDAYS, get_semester_window,
+                            slot_datetimes)
+from conflicts import add_to_index, build_conflict_index, find_conflicts
+from schedule_solver import DEFAULT_PREFERENCES, PATTERNS, blocked_cells, count_schedules, solve_schedule
+from read_cache import cached_read, get_cache_stats
+from outbox import enqueue_job, get_job, new_event_id, retry_dead_ops, start_outbox_workers
 
 st.set_page_config(page_title="Scheduler", page_icon="⏰")
+
+# Per-rerun timing, shown at the bottom of the page when SHOW_TIMINGS is on
+rerun_started = perf_counter()
+cache_stats_before = get_cache_stats()
 st.title("⏰ Scheduler")
 
 # Initialize database
 init_database()
+# Background workers that send queued calendar writes (once per process)
+start_outbox_workers()
 
 # Check if user is authenticated
 if "user_id" not in st.session_state:
@@ -38,48 +55,188 @@ st.divider()
 
 # create a tab that allows the user to select a semester (Fall, Winter, Spring) and then select a date range within that semester. The date range should be limited to the dates of the selected semester. For example, if the user selects Fall, the date range should be limited to September 1 to December 31. If the user selects Winter, the date range should be limited to January 1 to April 30. If the user selects Spring, the date range should be limited to April 1 to July 31.
 
-tabs = st.tabs(["Create", "Manage"])
+# Apply a schedule picked in the Auto Schedule tab before the Create widgets are drawn
+if "pending_schedule" in st.session_state:
+    pending_schedule = st.session_state.pop("pending_schedule")
+    st.session_state.num_classes = len(pending_schedule)
+    for i, item in enumerate(pending_schedule):
+        st.session_state[f"class_{i+1}"] = item['class_name']
+        st.session_state[f"location_{i+1}"] = item['location']
+        st.session_state[f"days_{i+1}"] = item['days']
+        st.session_state[f"time_{i+1}"] = [item['time_slot']]
+    st.session_state.schedule_applied = True
 
+# -------------------------------------
+# RERUN TIMING
+# -------------------------------------
+# Timing captions are a debugging aid: set SHOW_TIMINGS=1 in the environment,
+# or open the app with ?timings=1, to see them
+SHOW_TIMINGS = os.getenv("SHOW_TIMINGS") == "1"
+
+def show_rerun_timing(label, started, stats_before):
+    """Caption with how long a (full or fragment) rerun took and its read-cache hits"""
+    if not (SHOW_TIMINGS or st.query_params.get("timings") == "1"):
+        return
+    stats_after = get_cache_stats()
+    st.caption(f"⏱️ {label} took {(perf_counter() - started) * 1000:.1f} ms · "
+               f"cache hits {stats_after['hits'] - stats_before['hits']}, "
+               f"misses {stats_after['misses'] - stats_before['misses']} "
+               f"({stats_after['entries']} entries cached)")
+
+
+# -------------------------------------
+# MANAGE TAB PAGING
+# -------------------------------------
+# The Manage tab only ever reads and renders one page of events, together
+# with its counts, in one snapshot query. Pages are
+# keyset pages: manage_cursors[n] is the (start_date, event_id) of the last
+# event before page n, so paging forward or back never re-reads the rows
+# that were skipped.
+EVENTS_PAGE_SIZE = 25
+
+def manage_filters():
+    """get_events_from_db filter arguments from the Manage tab's filter widgets"""
+    semester = st.session_state.get("manage_semester", "All")
+    return {
+        'class_name': st.session_state.get("manage_class", "").strip() or None,
+        'semester': None if semester == "All" else semester,
+        'days': st.session_state.get("manage_days") or None
+    }
+
+def reset_manage_page():
+    """Go back to the first page (the filters changed)"""
+    st.session_state.manage_page = 0
+    st.session_state.manage_cursors = [None]
+
+def go_to_manage_page(page, cursor=None):
+    """Move to another page; cursor is the last event shown when moving forward"""
+    if page == len(st.session_state.manage_cursors):
+        st.session_state.manage_cursors.append(cursor)
+    st.session_state.manage_page = page
+
+def current_snapshot():
+    """The Manage tab's counts and current page (see get_events_snapshot)"""
+    if "manage_cursors" not in st.session_state:
+        reset_manage_page()
+    while True:
+        page = st.session_state.manage_page
+        snapshot = get_events_snapshot(st.session_state.user_id, EVENTS_PAGE_SIZE,
+                                       after=st.session_state.manage_cursors[page], **manage_filters())
+        if snapshot['events'] or page == 0:
+            return snapshot
+        # Everything on this page was deleted; show the one before it
+        del st.session_state.manage_cursors[page:]
+        st.session_state.manage_page = page - 1
+
+
+# -------------------------------------
+# CALENDAR JOBS
+# -------------------------------------
+# Creating, updating and deleting series are queued as outbox jobs (see
+# outbox.py) and sent by background workers, so a button click returns
+# right away. Each tab keeps the ids of the jobs it queued in
+# st.session_state[state_key] and shows their progress until dismissed.
+JOB_POLL_SECONDS = 1.0
+JOB_VERBS = {'create': "created", 'update': "updated", 'delete': "deleted", 'delete_occurrence': "cancelled"}
+
+def track_job(state_key, job_id):
+    """Show a newly queued job's progress on the tab that owns state_key"""
+    st.session_state.setdefault(state_key, []).append(job_id)
+
+def dismiss_job(state_key, job_id):
+    st.session_state[state_key].remove(job_id)
+
+def apply_job_to_session(job):
+    """Mirror a job's finished operations into st.session_state.scheduled_events (each only once)"""
+    applied = st.session_state.setdefault("applied_ops", set())
+    scheduled_events = st.session_state.setdefault("scheduled_events", [])
+    for op in job['ops']:
+        if op['status'] != 'done' or op['op_id'] in applied:
+            continue
+        applied.add(op['op_id'])
+        if op['op'] == 'create':
+            scheduled_events.append(op['payload']['event_info'])
+        elif op['op'] == 'update':
+            for event in scheduled_events:
+                if event['event_id'] == op['event_id']:
+                    event.update(op['payload']['updated_info'])
+        elif op['op'] == 'delete':
+            scheduled_events[:] = [event for event in scheduled_events if event['event_id'] != op['event_id']]
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id):
+    """Poll a running job; refresh the whole page once it finishes so the tables catch up"""
+    job = get_job(job_id)
+    finished = job['done'] + job['dead']
+    if finished == job['total']:
+        st.rerun()
+    st.progress(finished / job['total'],
+                text=f"📤 Job `{job_id[:8]}`: {finished} of {job['total']} calendar changes sent")
+    for op in job['ops']:
+        if op['status'] == 'pending' and op['last_error']:
+            st.caption(f"Retrying {op['payload']['label']} (attempt {op['attempts']} failed: {op['last_error']})")
+
+def show_jobs(state_key):
+    """Progress of each job queued from a tab, or its results once it has finished"""
+    for job_id in list(st.session_state.get(state_key, [])):
+        job = get_job(job_id)
+        if job is None:
+            # Nothing was queued (every operation was already in the outbox)
+            dismiss_job(state_key, job_id)
+            continue
+        if job['done'] + job['dead'] < job['total']:
+            job_progress(job_id)
+            continue
+
+        apply_job_to_session(job)
+        for op in job['ops']:
+            if op['status'] == 'done':
+                st.success(f"✅ {op['payload']['label']} {JOB_VERBS[op['op']]} - Event ID: `{op['event_id']}`")
+            else:
+                st.error(f"❌ Failed to {op['op'].replace('_', ' ')} {op['payload']['label']}: {op['last_error']}")
+        col_job1, col_job2 = st.columns(2)
+        with col_job1:
+            if job['dead']:
+                st.button("🔁 Retry failed", key=f"retry_{job_id}", on_click=retry_dead_ops, args=(job_id,))
+        with col_job2:
+            st.button("Dismiss", key=f"dismiss_{job_id}", on_click=dismiss_job, args=(state_key, job_id))
+
+
+# -------------------------------------
+# FRAGMENTS
+# -------------------------------------
+# Each fragment reruns on its own when one of its widgets changes, so typing
+# in the Create form or opening the update form doesn't redo the Manage tab's
+# reads and table render. Anything that changes stored events calls
+# st.rerun() to refresh the whole page.
+
+@st.fragment
+def create_form():
+    fragment_started = perf_counter()
+    fragment_stats = get_cache_stats()
 
-with tabs[0]:
     st.header("Create")
     st.write("This tab will allow you to create a new schedule and add it to your Google Calendar.")
+    if st.session_state.pop("schedule_applied", False):
+        st.success("Auto schedule loaded below. Review the classes, then click Generate Schedule.")
+    # Results of the last Generate Schedule, kept across the full rerun that refreshed the Manage tab
+    for level, message in st.session_state.pop("generation_report", []):
+        getattr(st, level)(message)
     st.write("Select the Semester and Date Range for scheduling.")
 
-    semester = st.selectbox("Select a semester", ["Fall", "Winter", "Spring"])
-
-    if semester == "Fall":
-        st.write("You selected Fall semester.")
-        st.write("Fine tune your date range to be within the semester dates.")
-        # make the default date range from September 1 to December 31 of the current year (ex 2025) (I want it to be dynamic)
-        current_year = pd.to_datetime("today").year
-        if pd.to_datetime("today") < pd.to_datetime(f"{current_year}-09-01") or pd.to_datetime("today") > pd.to_datetime(f"{current_year}-12-31"):
-            current_year += 1
-        begin_date = st.date_input("Select a start date", value=pd.to_datetime(f"{current_year}-09-01").date(), min_value=pd.to_datetime(f"{current_year}-09-01").date(), max_value=pd.to_datetime(f"{current_year}-12-31").date())
-        end_date = st.date_input("Select an end date", value=pd.to_datetime(f"{current_year}-12-31").date(), min_value=pd.to_datetime(f"{current_year}-09-01").date(), max_value=pd.to_datetime(f"{current_year}-12-31").date())
-
-    elif semester == "Winter":
-        st.write("You selected Winter semester.")
-        st.write("Fine tune your date range to be within the semester dates.")
-        # I want to check to see if we are in the range of Jan 1 to apr 30 of the current year. If not, then set it to be the next year
-        current_year = pd.to_datetime("today").year
-        if pd.to_datetime("today") < pd.to_datetime(f"{current_year}-01-01") or pd.to_datetime("today") > pd.to_datetime(f"{current_year}-04-30"):
-            current_year += 1
-        begin_date = st.date_input("Select a start date", value=pd.to_datetime(f"{current_year}-01-01").date(), min_value=pd.to_datetime(f"{current_year}-01-01").date(), max_value=pd.to_datetime(f"{current_year}-04-30").date())
-        end_date = st.date_input("Select an end date", value=pd.to_datetime(f"{current_year}-04-30").date(), min_value=pd.to_datetime(f"{current_year}-01-01").date(), max_value=pd.to_datetime(f"{current_year}-04-30").date())
-
-    elif semester == "Spring":
-        st.write("You selected Spring semester.")
-        st.write("Fine tune your date range to be within the semester dates.")
-        # I want to check to see if we are in the range of Apr 1 to Jul 31 of the current year. If not, then set it to be the next year
-        current_year = pd.to_datetime("today").year
-        if pd.to_datetime("today") < pd.to_datetime(f"{current_year}-04-01") or pd.to_datetime("today") > pd.to_datetime(f"{current_year}-07-31"):
-            current_year += 1
-        begin_date = st.date_input("Select a start date", value=pd.to_datetime(f"{current_year}-04-01").date(), min_value=pd.to_datetime(f"{current_year}-04-01").date(), max_value=pd.to_datetime(f"{current_year}-07-31").date())
-        end_date = st.date_input("Select an end date", value=pd.to_datetime(f"{current_year}-07-31").date(), min_value=pd.to_datetime(f"{current_year}-04-01").date(), max_value=pd.to_datetime(f"{current_year}-07-31").date())
-
-
-    num_class = st.number_input("How many classes do you want to schedule?", key="num_classes", min_value=1, max_value=10, value=1, step=1)
+    semester = st.selectbox("Select a semester", list(SEMESTERS))
+
+    st.write(f"You selected {semester} semester.")
+    st.write("Fine tune your date range to be within the semester dates.")
+    # Default to this year's semester dates, or next year's if today is outside the semester
+    semester_start, semester_end = get_semester_window(semester)
+    begin_date = st.date_input("Select a start date", value=semester_start, min_value=semester_start, max_value=semester_end)
+    end_date = st.date_input("Select an end date", value=semester_end, min_value=semester_start, max_value=semester_end)
+    # Shared with the Auto Schedule tab, which reruns separately
+    st.session_state.schedule_window = (begin_date, end_date)
+
+
+    num_class = st.number_input("How many classes do you want to schedule?", key="num_classes", min_value=1, max_value=10, step=1)
 
     for i in range(num_class):
         st.divider()
@@ -87,10 +244,10 @@ with tabs[0]:
 
         st.text_input(f"Enter class {i+1} location (optional):", key=f"location_{i+1}")
         # Options for days of the week: Monday, Tuesday, Wednesday, Thursday, Friday
-        days_of_week = st.multiselect(f"Select days for class {i+1}", ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"], key=f"days_{i+1}")
+        days_of_week = st.multiselect(f"Select days for class {i+1}", WEEKDAYS, key=f"days_{i+1}")
         #  Time slots staring at 7:45AM and end at 5:30PM each lasting 60 minutes with a 15 minute break in between. I only need one time slot per class
 
-        time_slots = st.multiselect(f"Select time slot for class {i+1}", ["7:45 AM - 8:45 AM", "9:00 AM - 10:00 AM", "10:15 AM - 11:15 AM", "11:30 AM - 12:30 PM", "12:45 PM - 1:45 PM", "2:00 PM - 3:00 PM", "3:15 PM - 4:15 PM", "4:30 PM - 5:30 PM"], key=f"time_{i+1}")    
+        time_slots = st.multiselect(f"Select time slot for class {i+1}", TIME_SLOTS, key=f"time_{i+1}")    
 
     # Write the days and time slots selected for each class
     for i in range(num_class):
@@ -118,6 +275,16 @@ with tabs[0]:
 #  based on the selected start and end date, create a list of all the dates that fall within that range and are on the selected days of the week for each class. For example, if the user selects Fall semester and the date range is September 1 to December 31, and the user selects Monday and Wednesday for class 1, then the list of dates for class 1 should include all Mondays and Wednesdays between September 1 and December 31.
 #  Then, for each date in the list, create an event in Google Calendar with the class name, start time, and end time.
 
+        # Index the user's existing classes in this date range, and ones still queued for
+        # Google, so overlapping ones are caught before anything is sent
+        conflict_index = build_conflict_index(get_events_from_db(st.session_state.user_id,
+                                                                 start_date=begin_date.strftime("%Y-%m-%d"),
+                                                                 end_date=end_date.strftime("%Y-%m-%d"))
+                                              + get_queued_outbox_events(st.session_state.user_id))
+
+        # Build every event body first, then queue them all as one job
+        pending_events = []
+        generation_report = []
         for i in range(num_class):
             class_name = st.session_state.get(f"class_{i+1}", "")
             location = st.session_state.get(f"location_{i+1}", "")
@@ -125,46 +292,32 @@ with tabs[0]:
             time = st.session_state.get(f"time_{i+1}", [])
 
             if class_name and days and time:
-                # Create a list of all the dates that fall within the selected date range and are on the selected days of the week
-                date_range = pd.date_range(start=begin_date, end=end_date)
-                selected_dates = []
-                for single_date in date_range:
-                    if single_date.strftime("%A") in days:
-                        selected_dates.append(single_date.strftime("%Y-%m-%d"))
+                # Use the first occurrence date (earliest date in selected range that matches a selected day),
+                # shared by every time slot of this class
+                first_date = first_occurrence(begin_date, end_date, days)
+                first_date = first_date.strftime("%Y-%m-%d") if first_date else None
 
                 # Create recurring events using recurrence rule instead of individual events for each date
-                # Map day names to RFC 5545 day codes for recurrence rule
-                day_codes = {
-                    "Monday": "MO", 
-                    "Tuesday": "TU", 
-                    "Wednesday": "WE", 
-                    "Thursday": "TH", 
-                    "Friday": "FR", 
-                    "Saturday": "SA", 
-                    "Sunday": "SU"
-                }
-                
-                # Convert selected days to day codes
-                recurring_days = [day_codes[day] for day in days if day in day_codes]
+                # Convert selected days to RFC 5545 day codes
+                recurring_days = [DAY_CODES[day] for day in days if day in DAY_CODES]
                 
                 # Create one recurring event for each time slot
                 for time_slot in time:
-                    start_time = time_slot.split(' - ')[0]
-                    end_time = time_slot.split(' - ')[1]
-                    
-                    # Use the first occurrence date (earliest date in selected range that matches a selected day)
-                    first_occurrence = None
-                    for single_date in pd.date_range(start=begin_date, end=end_date):
-                        if single_date.strftime("%A") in days:
-                            first_occurrence = single_date.strftime("%Y-%m-%d")
-                            break
-                    
-                    if first_occurrence:
-                        start_datetime = pd.to_datetime(f"{first_occurrence} {start_time}").strftime("%Y-%m-%dT%H:%M:%S-06:00")
-                        end_datetime = pd.to_datetime(f"{first_occurrence} {end_time}").strftime("%Y-%m-%dT%H:%M:%S-06:00")
+                    if first_date:
+                        conflicting = find_conflicts(conflict_index, days, time_slot,
+                                                     first_date, end_date.strftime("%Y-%m-%d"))
+                        if conflicting:
+                            generation_report.append(("warning", f"⚠️ Skipping {class_name} ({time_slot}): it overlaps "
+                                                      + ", ".join(f"{event['class_name']} ({event['time_slot']}, {', '.join(event['days'])})"
+                                                                  for event in conflicting)))
+                            continue
+
+                        slot_start, slot_end = slot_datetimes(first_date, time_slot)
+                        start_datetime = slot_start.strftime("%Y-%m-%dT%H:%M:%S-06:00")
+                        end_datetime = slot_end.strftime("%Y-%m-%dT%H:%M:%S-06:00")
                         
                         # Create recurrence rule: weekly on selected days until end date
-                        until_date = pd.to_datetime(end_date).strftime("%Y%m%dT235959Z")
+                        until_date = end_date.strftime("%Y%m%dT235959Z")
                         recurrence_rule = f"RRULE:FREQ=WEEKLY;BYDAY={','.join(recurring_days)};UNTIL={until_date}"
                         
                         st.write(f"Creating recurring event: {class_name}")
@@ -181,328 +334,486 @@ with tabs[0]:
                         }
                         st.write(event_details)
                         
-                        # Schedule the event and capture the event ID
-                        created_event = schedule_event(event_details)
-                        if created_event:
-                            event_id = created_event.get('id')
-                            
-                            # Store event information for later use
-                            if 'scheduled_events' not in st.session_state:
-                                st.session_state.scheduled_events = []
-                            
-                            event_info = {
-                                'event_id': event_id,
-                                'class_name': class_name,
-                                'location': location,
-                                'time_slot': time_slot,
-                                'days': days,
-                                'start_date': first_occurrence,
-                                'end_date': end_date.strftime("%Y-%m-%d"),
-                                'created_at': pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
-                            }
-                            st.session_state.scheduled_events.append(event_info)
-                            
-                            st.success(f"✅ Event created successfully!")
-                            st.write(f"Event ID: `{event_id}`")
-                            
-                            # Store in database with user_id
-                            if store_event_in_db(event_info, st.session_state.user_id):
-                                st.write("Event stored in local database.")
-                            else:
-                                st.warning("Event already exists in database.")
-                        else:
-                            st.error("❌ Failed to create event")
+                        # Event information to store once Google has accepted the event; the ID is
+                        # chosen here so a retried insert can't create a duplicate
+                        event_info = {
+                            'event_id': new_event_id(),
+                            'class_name': class_name,
+                            'location': location,
+                            'time_slot': time_slot,
+                            'days': days,
+                            'start_date': first_date,
+                            'end_date': end_date.strftime("%Y-%m-%d"),
+                            'created_at': pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+                        }
+                        pending_events.append((event_details, event_info))
+                        # Later classes in this batch are checked against this one too
+                        add_to_index(conflict_index, event_info)
 
-# Display scheduled events management section
-with tabs[1]:
-    st.header("📋 Manage Scheduled Events")
+        # Hand the events to the outbox workers; each is stored in the database once Google accepts it
+        if pending_events:
+            job_id, queued = enqueue_job(st.session_state.user_id, [
+                {'op': 'create', 'event_id': event_info['event_id'],
+                 'payload': {'label': f"{event_info['class_name']} ({event_info['time_slot']})",
+                             'event_details': event_details, 'event_info': event_info}}
+                for event_details, event_info in pending_events])
+            track_job("create_jobs", job_id)
+            generation_report.append(("info", f"📤 Queued {queued} events for Google Calendar as job `{job_id[:8]}`."))
+            # Rerun the whole page so the job's progress shows above the form
+            st.session_state.generation_report = generation_report
+            st.rerun()
+
+        for level, message in generation_report:
+            getattr(st, level)(message)
+
+    show_rerun_timing("Create form", fragment_started, fragment_stats)
+
+
+@st.fragment
+def event_panel():
+    fragment_started = perf_counter()
+    fragment_stats = get_cache_stats()
+    # Read the current page through the cache so this fragment sees it on its own reruns
+    page_events = current_snapshot()['events']
+    if not page_events:
+        return
+
+    # Allow user to select an event to manage (from the page shown above)
+    event_options = [f"{event['class_name']} - {event['time_slot']} ({event['event_id'][:8]}...)" 
+                    for event in page_events]
     
-    # Get all events from both session state and database (filtered by current user)
-    all_events = get_all_events(user_id=st.session_state.user_id)
+    selected_event_index = st.selectbox(
+        "Select an event to manage:",
+        range(len(event_options)),
+        format_func=lambda x: event_options[x]
+    )
     
-    if all_events:
-        st.write("Here are your scheduled events:")
+    if selected_event_index is not None:
+        selected_event = page_events[selected_event_index]
+        update_form_key = f"show_update_form_{selected_event['event_id']}"
+        # st.write(f"--- {selected_event['location'][3]}")
+        if selected_event['location'][3] == ' ':
+            # st.write(f"--- space found")
+            building = selected_event['location'][:3]
+            room = selected_event['location'][4:].strip()
+            campus_location = f"{building} {room}"
+        elif selected_event['location'][4] == ' ':
+            building = selected_event['location'][:4]
+            room = selected_event['location'][5:].strip()
+            campus_location = f"{building} {room}"
+        else:
+            # st.write(f"--- no space found")
+            # check for letter-number combination
+            building = ''.join(filter(str.isalpha, selected_event['location']))
+            room = ''.join(filter(str.isdigit, selected_event['location']))
+            campus_location = f"{building} {room}"
+        # st.write(f"**Location:** {building} {room}")
+        campus_map_url = f"https://maps.byui.edu/interactive-map/index.html?building={building}&room={room}"
         
-        # Show data source information
-        session_count = len(st.session_state.get('scheduled_events', []))
-        db_count = len(get_events_from_db(user_id=st.session_state.user_id))
-        total_unique_count = len(all_events)
-        
-        col_info1, col_info2, col_info3 = st.columns(3)
-        with col_info1:
-            st.metric("Session Events", session_count)
-        with col_info2:
-            st.metric("Database Events", db_count)
-        with col_info3:
-            st.metric("Total Unique", total_unique_count)
+        # Show event details
+        st.write("**Selected Event Details:**")
+        st.write(f"- **Class:** {selected_event['class_name']}")
+        st.write(f"- **Time:** {selected_event['time_slot']}")
+        # create a link to the campus map for the building and room
+        # st.write(f"- **Location:** {selected_event['location']}")
+        st.markdown(f"- **Location:** [{campus_location}]({campus_map_url})")
+        st.write(f"- **Days:** {', '.join(selected_event['days'])}")
+        st.write(f"- **Date Range:** {selected_event['start_date']} to {selected_event['end_date']}")
+        # Expanded locally from the stored series - no calendar API calls
+        remaining = get_series_occurrences(selected_event, window_start=pd.Timestamp.now().to_pydatetime())
+        if remaining:
+            st.write(f"- **Remaining Meetings:** {len(remaining)} (next: {remaining[0].strftime('%a %b %d, %I:%M %p')})")
+
+        # Update Options
+        st.write("**Update Options:**")
         
-        # Create a DataFrame for better display
-        events_df = pd.DataFrame(all_events)
-        st.dataframe(events_df, width='content')
+        # Use session state to track if update form should be shown
+        if update_form_key not in st.session_state:
+            st.session_state[update_form_key] = False
         
-        # Allow user to select an event to manage
-        event_options = [f"{event['class_name']} - {event['time_slot']} ({event['event_id'][:8]}...)" 
-                        for event in all_events]
+        col_update1, col_update2 = st.columns(2)
+        with col_update1:
+            if st.button("✏️ Show Update Form", type="primary", help="Show form to update event details"):
+                st.session_state[update_form_key] = True
         
-        selected_event_index = st.selectbox(
-            "Select an event to manage:",
-            range(len(event_options)),
-            format_func=lambda x: event_options[x]
-        )
+        with col_update2:
+            if st.button("❌ Cancel Update", type="secondary", help="Hide update form"):
+                st.session_state[update_form_key] = False
         
-        if selected_event_index is not None:
-            selected_event = all_events[selected_event_index]
-            # st.write(f"--- {selected_event['location'][3]}")
-            if selected_event['location'][3] == ' ':
-                # st.write(f"--- space found")
-                building = selected_event['location'][:3]
-                room = selected_event['location'][4:].strip()
-                campus_location = f"{building} {room}"
-            elif selected_event['location'][4] == ' ':
-                building = selected_event['location'][:4]
-                room = selected_event['location'][5:].strip()
-                campus_location = f"{building} {room}"
-            else:
-                # st.write(f"--- no space found")
-                # check for letter-number combination
-                building = ''.join(filter(str.isalpha, selected_event['location']))
-                room = ''.join(filter(str.isdigit, selected_event['location']))
-                campus_location = f"{building} {room}"
-            # st.write(f"**Location:** {building} {room}")
-            campus_map_url = f"https://maps.byui.edu/interactive-map/index.html?building={building}&room={room}"
-            
-            # Show event details
-            st.write("**Selected Event Details:**")
-            st.write(f"- **Class:** {selected_event['class_name']}")
-            st.write(f"- **Time:** {selected_event['time_slot']}")
-            # create a link to the campus map for the building and room
-            # st.write(f"- **Location:** {selected_event['location']}")
-            st.markdown(f"- **Location:** [{campus_location}]({campus_map_url})")
-            st.write(f"- **Days:** {', '.join(selected_event['days'])}")
-            st.write(f"- **Date Range:** {selected_event['start_date']} to {selected_event['end_date']}")
-
-            # Update Options
-            st.write("**Update Options:**")
-            
-            # Use session state to track if update form should be shown
-            if f"show_update_form_{selected_event_index}" not in st.session_state:
-                st.session_state[f"show_update_form_{selected_event_index}"] = False
-            
-            col_update1, col_update2 = st.columns(2)
-            with col_update1:
-                if st.button("✏️ Show Update Form", type="primary", help="Show form to update event details"):
-                    st.session_state[f"show_update_form_{selected_event_index}"] = True
-            
-            with col_update2:
-                if st.button("❌ Cancel Update", type="secondary", help="Hide update form"):
-                    st.session_state[f"show_update_form_{selected_event_index}"] = False
-            
-            # Show the form if the session state indicates it should be shown
-            if st.session_state[f"show_update_form_{selected_event_index}"]:
-                st.write("---")
-                st.write("**Update Event Form:**")
-                with st.form("update_event_form"):
-                    new_class_name = st.text_input("Class Name", value=selected_event['class_name'])
-                    
-                    # Handle location field safely (it might not exist in older stored events)
-                    current_location = selected_event.get('location', '')
-                    new_location = st.text_input("Location", value=current_location)
-                    
-                    new_days = st.multiselect("Days", ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"], default=selected_event['days'])
+        # Show the form if the session state indicates it should be shown
+        if st.session_state[update_form_key]:
+            st.write("---")
+            st.write("**Update Event Form:**")
+            with st.form("update_event_form"):
+                new_class_name = st.text_input("Class Name", value=selected_event['class_name'])
+                
+                # Handle location field safely (it might not exist in older stored events)
+                current_location = selected_event.get('location', '')
+                new_location = st.text_input("Location", value=current_location)
+                
+                new_days = st.multiselect("Days", WEEKDAYS, default=selected_event['days'])
+                
+                # Handle time slot selection more robustly
+                current_time_slot = selected_event['time_slot']
+                
+                # Find the index of the current time slot, default to 0 if not found
+                current_index = SLOT_INDEX.get(current_time_slot)
+                if current_index is None:
+                    current_index = 0
+                    st.warning(f"Current time slot '{current_time_slot}' not found in options. Defaulting to first option.")
+                
+                new_time_slot = st.selectbox("Time Slot", TIME_SLOTS, index=current_index)
+                
+                submitted = st.form_submit_button("Submit Updates")
+                if submitted:
+                    # Create updated event details
+                    st.write("**Processing Update...**")
                     
-                    # Handle time slot selection more robustly
-                    time_options = ["7:45 AM - 8:45 AM", "9:00 AM - 10:00 AM", "10:15 AM - 11:15 AM", "11:30 AM - 12:30 PM", "12:45 PM - 1:45 PM", "2:00 PM - 3:00 PM", "3:15 PM - 4:15 PM", "4:30 PM - 5:30 PM"]
-                    current_time_slot = selected_event['time_slot']
+                    st.write(f"Time slot: {new_time_slot}")
+                    st.write(f"Start date: {selected_event['start_date']}")
                     
-                    # Find the index of the current time slot, default to 0 if not found
                     try:
-                        current_index = time_options.index(current_time_slot)
-                    except ValueError:
-                        current_index = 0
-                        st.warning(f"Current time slot '{current_time_slot}' not found in options. Defaulting to first option.")
+                        slot_start, slot_end = slot_datetimes(selected_event['start_date'], new_time_slot)
+                        start_datetime = slot_start.strftime("%Y-%m-%dT%H:%M:%S-06:00")
+                        end_datetime = slot_end.strftime("%Y-%m-%dT%H:%M:%S-06:00")
+                        
+                        st.write(f"Formatted start datetime: {start_datetime}")
+                        st.write(f"Formatted end datetime: {end_datetime}")
+                    except Exception as e:
+                        st.error(f"Error formatting datetime: {str(e)}")
+                        st.stop()
                     
-                    new_time_slot = st.selectbox("Time Slot", time_options, index=current_index)
+                    # Create recurrence rule
+                    recurring_days = [DAY_CODES[day] for day in new_days if day in DAY_CODES]
+                    until_date = pd.to_datetime(selected_event['end_date']).strftime("%Y%m%dT235959Z")
+                    recurrence_rule = f"RRULE:FREQ=WEEKLY;BYDAY={','.join(recurring_days)};UNTIL={until_date}"
+                    updated_event_details = {
+                        "summary": new_class_name,
+                        "location": new_location,
+                        "start": {"dateTime": start_datetime, "timeZone": "America/Denver"},
+                        "end": {"dateTime": end_datetime, "timeZone": "America/Denver"},
+                        "recurrence": [recurrence_rule]
+                    }
                     
-                    submitted = st.form_submit_button("Submit Updates")
-                    if submitted:
-                        # Create updated event details
-                        st.write("**Processing Update...**")
-                        
-                        start_time = new_time_slot.split(' - ')[0]
-                        end_time = new_time_slot.split(' - ')[1]
-                        
-                        st.write(f"Parsed start time: {start_time}")
-                        st.write(f"Parsed end time: {end_time}")
-                        st.write(f"Start date: {selected_event['start_date']}")
-                        
-                        try:
-                            start_datetime = pd.to_datetime(f"{selected_event['start_date']} {start_time}").strftime("%Y-%m-%dT%H:%M:%S-06:00")
-                            end_datetime = pd.to_datetime(f"{selected_event['start_date']} {end_time}").strftime("%Y-%m-%dT%H:%M:%S-06:00")
-                            
-                            st.write(f"Formatted start datetime: {start_datetime}")
-                            st.write(f"Formatted end datetime: {end_datetime}")
-                        except Exception as e:
-                            st.error(f"Error formatting datetime: {str(e)}")
-                            st.stop()
-                        
-                        # Create recurrence rule
-                        day_codes = {
-                            "Monday": "MO", 
-                            "Tuesday": "TU", 
-                            "Wednesday": "WE", 
-                            "Thursday": "TH", 
-                            "Friday": "FR"
-                        }
-                        recurring_days = [day_codes[day] for day in new_days if day in day_codes]
-                        until_date = pd.to_datetime(selected_event['end_date']).strftime("%Y%m%dT235959Z")
-                        recurrence_rule = f"RRULE:FREQ=WEEKLY;BYDAY={','.join(recurring_days)};UNTIL={until_date}"
-                        updated_event_details = {
-                            "summary": new_class_name,
-                            "location": new_location,
-                            "start": {"dateTime": start_datetime, "timeZone": "America/Denver"},
-                            "end": {"dateTime": end_datetime, "timeZone": "America/Denver"},
-                            "recurrence": [recurrence_rule]
+                    # Show the details for verification
+                    st.write("**Updated Event Details (for verification):**")
+                    st.json(updated_event_details)
+                    
+                    # Queue the update; the database row changes once Google accepts it
+                    job_id, _ = enqueue_job(st.session_state.user_id, [{
+                        'op': 'update', 'event_id': selected_event['event_id'],
+                        'payload': {
+                            'label': f"{new_class_name} ({new_time_slot})",
+                            'event_details': updated_event_details,
+                            'updated_info': {
+                                'class_name': new_class_name,
+                                'location': new_location,
+                                'days': new_days,
+                                'time_slot': new_time_slot
+                            }
                         }
-                        
-                        # Show the details for verification
-                        st.write("**Updated Event Details (for verification):**")
-                        st.json(updated_event_details)
-                        
-                        # Attempt to update the event
-                        try:
-                            updated_event = update_event(selected_event['event_id'], updated_event_details)
-                            if updated_event:
-                                st.success("Event updated successfully!")
-                                
-                                # Update database
-                                updated_info = {
-                                    'class_name': new_class_name,
-                                    'location': new_location,
-                                    'days': new_days,
-                                    'time_slot': new_time_slot
-                                }
-                                update_event_in_db(selected_event['event_id'], updated_info)
-                                
-                                # Update session state if it exists
-                                if 'scheduled_events' in st.session_state:
-                                    for i, event in enumerate(st.session_state.scheduled_events):
-                                        if event['event_id'] == selected_event['event_id']:
-                                            st.session_state.scheduled_events[i]['class_name'] = new_class_name
-                                            st.session_state.scheduled_events[i]['location'] = new_location
-                                            st.session_state.scheduled_events[i]['days'] = new_days
-                                            st.session_state.scheduled_events[i]['time_slot'] = new_time_slot
-                                            break
-                                
-                                st.write("Updated event info:", updated_event.get('htmlLink'))
-                                
-                                # Close the form after successful update
-                                st.session_state[f"show_update_form_{selected_event_index}"] = False
-                                
-                                # Show success message and rerun
-                                st.balloons()
-                                st.rerun()
-                            else:
-                                st.error("Failed to update event - API returned None")
-                        except Exception as e:
-                            st.error(f"Error updating event: {str(e)}")
-                            st.write("Please check the details above and try again.")
-            # Delete options
-            st.write("**Delete Options:**")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if st.button("🗑️ Delete Single Occurrence", type="secondary", help="Delete only this specific occurrence"):
-                    if delete_event(selected_event['event_id']):
-                        st.success("Single occurrence deleted successfully!")
-                        st.info("Note: Other occurrences in the series will remain.")
-                    else:
-                        st.error("Failed to delete single occurrence")
-            
-            with col2:
-                if st.button("🗑️ Delete Entire Series", type="primary", help="Delete all occurrences of this recurring event"):
-                    if delete_recurring_series(selected_event['event_id']):
-                        # Remove from database
-                        delete_event_from_db(selected_event['event_id'])
-                        
-                        # Remove from session state if it exists
-                        if 'scheduled_events' in st.session_state:
-                            st.session_state.scheduled_events = [
-                                event for event in st.session_state.scheduled_events 
-                                if event['event_id'] != selected_event['event_id']
-                            ]
-                        
-                        st.success("Entire recurring series deleted successfully!")
-                        st.rerun()
-                    else:
-                        st.error("Failed to delete recurring series")
-            
-            st.divider()
-            
-            # Other management options
-            col3, col4, col5 = st.columns(3)
-            
-            with col3:
-                if st.button("📋 Copy Event ID", type="secondary"):
-                    st.code(selected_event['event_id'])
-                    st.info("Event ID copied above - you can use this for external operations")
-            
-            with col4:
-                if st.button("🔄 Refresh Status", type="secondary"):
-                    st.info("Event information refreshed")
-            
-            with col5:
-                if st.button("ℹ️ Event Info", type="secondary"):
-                    st.json(selected_event)
-    
-        # Data management section
-        st.divider()
-        st.write("**Data Management:**")
+                    }])
+                    track_job("manage_jobs", job_id)
+                    
+                    # Close the form and rerun so the job's progress shows above the table
+                    st.session_state[update_form_key] = False
+                    st.rerun()
+        # Delete options
+        st.write("**Delete Options:**")
         
-        col_data1, col_data2, col_data3 = st.columns(3)
+        col1, col2 = st.columns(2)
         
-        with col_data1:
-            if st.button("🔄 Sync Session to Database", help="Save all session events to database"):
-                if 'scheduled_events' in st.session_state:
-                    synced_count = 0
-                    for event in st.session_state.scheduled_events:
-                        if store_event_in_db(event, st.session_state.user_id):
-                            synced_count += 1
-                    st.success(f"Synced {synced_count} events to database!")
+        with col1:
+            # Upcoming meetings, the same local expansion as Remaining Meetings above
+            occurrence = st.selectbox("Occurrence", remaining, key=f"occurrence_{selected_event['event_id']}",
+                                      format_func=lambda moment: moment.strftime('%a %b %d, %I:%M %p'),
+                                      disabled=not remaining)
+            if st.button("🗑️ Delete Single Occurrence", type="secondary", disabled=not remaining,
+                         help="Delete only this occurrence; the rest of the series remains"):
+                # Queue it like the other calendar writes; the series stays in the database
+                job_id, queued = enqueue_job(st.session_state.user_id, [{
+                    'op': 'delete_occurrence', 'event_id': selected_event['event_id'],
+                    'payload': {
+                        'label': f"{selected_event['class_name']} on {occurrence.strftime('%a %b %d, %I:%M %p')}",
+                        # The series was created in this zone (see Generate Schedule)
+                        'original_start': occurrence.replace(tzinfo=ZoneInfo("America/Denver")).isoformat()
+                    }
+                }])
+                if queued:
+                    track_job("manage_jobs", job_id)
+                    st.rerun()
                 else:
-                    st.info("No session events to sync.")
+                    st.info("This occurrence is already queued for deletion.")
         
-        with col_data2:
-            if st.button("📥 Load from Database", help="Load all events from database to session"):
-                db_events = get_events_from_db(user_id=st.session_state.user_id)
-                if db_events:
-                    st.session_state.scheduled_events = db_events
-                    st.success(f"Loaded {len(db_events)} events from database!")
+        with col2:
+            if st.button("🗑️ Delete Entire Series", type="primary", help="Delete all occurrences of this recurring event"):
+                # Queue the delete; the database row goes once Google has removed the series
+                job_id, queued = enqueue_job(st.session_state.user_id, [{
+                    'op': 'delete', 'event_id': selected_event['event_id'],
+                    'payload': {'label': f"{selected_event['class_name']} ({selected_event['time_slot']})"}
+                }])
+                if queued:
+                    track_job("manage_jobs", job_id)
                     st.rerun()
                 else:
-                    st.info("No events found in database.")
+                    st.info("This series is already queued for deletion.")
         
-        with col_data3:
-            if st.button("🗄️ View Database Info", help="Show database statistics"):
-                db_stats = get_database_stats()
-                db_events = get_events_from_db()
-                session_events = st.session_state.get('scheduled_events', [])
-                
-                st.write("**Database Info:**")
-                st.write(f"- Database file: `{db_stats['database_file']}`")
-                st.write(f"- Database events: {db_stats['total_events']}")
-                st.write(f"- Session events: {len(session_events)}")
-                st.write(f"- Total unique events: {len(get_all_events(user_id=st.session_state.user_id))}")
+        st.divider()
         
-    else:
-        st.info("No scheduled events found in session state or database.")
-        st.write("Create some events in the 'Create' tab")
+        # Other management options
+        col3, col4, col5 = st.columns(3)
+        
+        with col3:
+            if st.button("📋 Copy Event ID", type="secondary"):
+                st.code(selected_event['event_id'])
+                st.info("Event ID copied above - you can use this for external operations")
+        
+        with col4:
+            if st.button("🔄 Refresh Status", type="secondary", help="Pull changes made in Google Calendar"):
+                sync_result = sync_calendar()
+                if sync_result is None:
+                    st.error("Failed to refresh from Google Calendar")
+                elif sync_result['updated'] or sync_result['removed']:
+                    # Drop stale session copies so the refreshed database rows show
+                    changed_ids = set(sync_result['updated']) | set(sync_result['removed'])
+                    st.session_state.scheduled_events = [
+                        event for event in st.session_state.get('scheduled_events', [])
+                        if event['event_id'] not in changed_ids
+                    ]
+                    st.success(f"Event information refreshed: {len(sync_result['updated'])} updated, "
+                               f"{len(sync_result['removed'])} removed")
+                    st.rerun()
+                else:
+                    st.info("Event information refreshed - no changes found")
         
-        # Show database status even when no events
-        db_events = get_events_from_db(user_id=st.session_state.user_id)
-        if db_events:
-            st.info(f"Found {len(db_events)} events in database. Click 'Load from Database' above to load them.")
-            if st.button("📥 Load Database Events"):
+        with col5:
+            if st.button("ℹ️ Event Info", type="secondary"):
+                st.json(selected_event)
+
+    show_rerun_timing("Event panel", fragment_started, fragment_stats)
+
+
+@st.fragment
+def data_management():
+    fragment_started = perf_counter()
+    fragment_stats = get_cache_stats()
+
+    # Data management section
+    st.divider()
+    st.write("**Data Management:**")
+    if "sync_message" in st.session_state:
+        st.success(st.session_state.pop("sync_message"))
+    
+    col_data1, col_data2, col_data3 = st.columns(3)
+    
+    with col_data1:
+        if st.button("🔄 Sync Session to Database", help="Save all session events to database"):
+            if 'scheduled_events' in st.session_state:
+                result = store_events_in_db(st.session_state.scheduled_events, st.session_state.user_id)
+                sync_message = (f"Synced {result['inserted'] + result['updated']} events to database! "
+                                f"({result['inserted']} new, {result['updated']} updated, {result['skipped']} unchanged)")
+                if result['inserted'] or result['updated']:
+                    # Rerun the whole page so the counts and table above pick up the changes
+                    st.session_state.sync_message = sync_message
+                    st.rerun()
+                st.success(sync_message)
+            else:
+                st.info("No session events to sync.")
+    
+    with col_data2:
+        if st.button("📥 Load from Database", help="Load all events from database to session"):
+            db_events = get_events_from_db(st.session_state.user_id)
+            if db_events:
                 st.session_state.scheduled_events = db_events
                 st.success(f"Loaded {len(db_events)} events from database!")
                 st.rerun()
+            else:
+                st.info("No events found in database.")
+    
+    with col_data3:
+        if st.button("🗄️ View Database Info", help="Show database statistics"):
+            st.write("**Database Info:**")
+            st.write(f"- Database file: `{DB_NAME}`")
+            st.write(f"- Database events: {count_events()}")
+            st.write(f"- Your database events: {current_snapshot()['total']}")
+            st.write(f"- Session events: {len(st.session_state.get('scheduled_events', []))}")
+
+    show_rerun_timing("Data management", fragment_started, fragment_stats)
+
+
+@st.fragment
+def auto_schedule():
+    fragment_started = perf_counter()
+    fragment_stats = get_cache_stats()
+    st.header("Auto Schedule")
+    st.write("Give each class its meeting pattern and the time slots it may use. "
+             "The solver finds conflict-free schedules around the classes you already have in the selected date range.")
+
+    auto_num_class = st.number_input("How many classes do you want to place?", key="auto_num_classes", min_value=1, max_value=10, step=1)
+
+    for i in range(auto_num_class):
+        st.divider()
+        st.text_input(f"Class {i+1} name or code:", key=f"auto_class_{i+1}")
+        st.text_input(f"Class {i+1} location (optional):", key=f"auto_location_{i+1}")
+        st.multiselect(f"Meeting pattern for class {i+1} (any one may be used)", list(PATTERNS), default=["MWF"], key=f"auto_patterns_{i+1}")
+        st.multiselect(f"Allowed time slots for class {i+1}", TIME_SLOTS, default=TIME_SLOTS, key=f"auto_slots_{i+1}")
+
+    st.divider()
+    st.write("**Preferences**")
+    avoid_early = st.checkbox("Avoid early mornings", value=True)
+    avoid_late = st.checkbox("Avoid late afternoons", value=True)
+    compact_days = st.checkbox("Keep days compact (no gaps between classes)", value=True)
+
+    if st.button("🧩 Find Schedules"):
+        auto_classes = []
+        for i in range(auto_num_class):
+            class_name = st.session_state.get(f"auto_class_{i+1}", "")
+            patterns = st.session_state.get(f"auto_patterns_{i+1}", [])
+            if class_name and patterns:
+                auto_classes.append({
+                    'class_name': class_name,
+                    'location': st.session_state.get(f"auto_location_{i+1}", ""),
+                    'patterns': patterns,
+                    'slots': st.session_state.get(f"auto_slots_{i+1}", [])
+                })
+
+        if not auto_classes:
+            st.warning("Enter a name and at least one meeting pattern for each class.")
+        else:
+            preferences = {
+                'early': DEFAULT_PREFERENCES['early'] if avoid_early else 0,
+                'late': DEFAULT_PREFERENCES['late'] if avoid_late else 0,
+                'gaps': DEFAULT_PREFERENCES['gaps'] if compact_days else 0
+            }
+            # Cells already taken by the user's classes in the date range chosen on the Create tab,
+            # including ones queued by Generate that the calendar hasn't accepted yet
+            begin_date, end_date = st.session_state.schedule_window
+            window_start, window_end = begin_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+            queued_events = [event for event in get_queued_outbox_events(st.session_state.user_id)
+                             if event['start_date'] <= window_end and event['end_date'] >= window_start]
+            blocked = blocked_cells(get_events_from_db(st.session_state.user_id,
+                                                       start_date=window_start, end_date=window_end)
+                                    + queued_events)
+            st.session_state.auto_result = {
+                'classes': auto_classes,
+                'solution': solve_schedule(auto_classes, preferences, blocked),
+                'count': count_schedules(auto_classes, blocked)
+            }
+
+    if "auto_result" in st.session_state:
+        auto_result = st.session_state.auto_result
+        solution = auto_result['solution']
+        st.caption(f"Searched {solution['nodes']} placements in {solution['elapsed'] * 1000:.0f} ms")
+        if auto_result['count'] is not None:
+            st.write(f"{auto_result['count']} conflict-free schedules exist; showing the best {len(solution['schedules'])}.")
+        if not solution['complete']:
+            st.info("The search hit its time budget; these are the best schedules found so far.")
+
+        if not solution['schedules']:
+            st.error("No conflict-free schedule fits these classes. Try allowing more patterns or time slots.")
+
+        for rank, schedule in enumerate(solution['schedules'], start=1):
+            with st.expander(f"Option {rank} (penalty {schedule['score']})", expanded=rank == 1):
+                grid = pd.DataFrame("", index=TIME_SLOTS, columns=WEEKDAYS)
+                for auto_class, assignment in zip(auto_result['classes'], schedule['assignments']):
+                    for day in assignment['days']:
+                        grid.loc[assignment['time_slot'], day] = auto_class['class_name']
+                st.dataframe(grid, width='content')
+
+                if st.button("✅ Use this schedule", key=f"auto_use_{rank}"):
+                    st.session_state.pending_schedule = [
+                        {
+                            'class_name': auto_class['class_name'],
+                            'location': auto_class['location'],
+                            'days': assignment['days'],
+                            'time_slot': assignment['time_slot']
+                        }
+                        for auto_class, assignment in zip(auto_result['classes'], schedule['assignments'])
+                    ]
+                    del st.session_state.auto_result
+                    st.rerun()
+
+    show_rerun_timing("Auto schedule", fragment_started, fragment_stats)
+
+
+tabs = st.tabs(["Create", "Manage", "Auto Schedule"])
+
+
+with tabs[0]:
+    show_jobs("create_jobs")
+    create_form()
+
+# Display scheduled events management section
+with tabs[1]:
+    st.header("📋 Manage Scheduled Events")
+    show_jobs("manage_jobs")
+    
+    # Only counts and the current page are read, as one query; with thousands
+    # of events a rerun still touches EVENTS_PAGE_SIZE rows
+    session_count = len(st.session_state.get('scheduled_events', []))
+    snapshot = current_snapshot()
+    db_count = snapshot['total']
+    
+    if db_count or session_count:
+        st.write("Here are your scheduled events:")
+        
+        # Filters run in the database query; changing one goes back to the first page
+        col_filter1, col_filter2, col_filter3 = st.columns(3)
+        with col_filter1:
+            st.text_input("Class name contains", key="manage_class", on_change=reset_manage_page)
+        with col_filter2:
+            st.selectbox("Semester", ["All"] + list(SEMESTERS), key="manage_semester", on_change=reset_manage_page)
+        with col_filter3:
+            st.multiselect("Meets on", WEEKDAYS, key="manage_days", on_change=reset_manage_page)
+        matching_count = snapshot['matching']
+        
+        col_info1, col_info2, col_info3 = st.columns(3)
+        with col_info1:
+            st.metric("Session Events", session_count)
+        with col_info2:
+            st.metric("Database Events", db_count)
+        with col_info3:
+            st.metric("Matching Filters", matching_count)
+        
+        if not db_count:
+            st.info("Your session events aren't in the database yet. "
+                    "Click 'Sync Session to Database' below to manage them here.")
+        elif not matching_count:
+            st.info("No events match these filters.")
+        else:
+            page_events, has_next_page = snapshot['events'], snapshot['has_more']
+            page = st.session_state.manage_page
+            
+            # Create a DataFrame for better display; rebuilt only when the page's events change
+            events_df = cached_read("events_df", st.session_state.user_id,
+                                    tuple(event['event_id'] for event in page_events),
+                                    lambda: pd.DataFrame(page_events))
+            st.dataframe(events_df, width='content')
+            
+            col_page1, col_page2, col_page3 = st.columns([1, 2, 1])
+            with col_page1:
+                st.button("◀ Previous", disabled=page == 0, on_click=go_to_manage_page, args=(page - 1,))
+            with col_page2:
+                first_shown = page * EVENTS_PAGE_SIZE + 1
+                st.caption(f"Page {page + 1} of {-(-matching_count // EVENTS_PAGE_SIZE)} · "
+                           f"events {first_shown}-{first_shown + len(page_events) - 1} of {matching_count}")
+            with col_page3:
+                last_event = page_events[-1]
+                st.button("Next ▶", disabled=not has_next_page, on_click=go_to_manage_page,
+                          args=(page + 1, (last_event['start_date'], last_event['event_id'])))
+            
+            event_panel()
+
+        data_management()
+    
+    else:
+        st.info("No scheduled events found in session state or database.")
+        st.write("Create some events in the 'Create' tab")
+
+
+# Find conflict-free schedules automatically and send the chosen one to the Create tab
+with tabs[2]:
+    auto_schedule()
+
+# Show how long this full rerun took and how much the read cache saved
+show_rerun_timing("Rerun", rerun_started, cache_stats_before)
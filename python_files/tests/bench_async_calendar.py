@@ -0,0 +1,139 @@
+"""Load test: async_calendar against a local Calendar stub with many concurrent users.
+
+Starts an asyncio HTTP stub in its own process that answers every insert
+after a fixed latency (50 ms by default). Each simulated user is a thread,
+like a Streamlit script thread, that sends its creates and waits for them.
+Compares two paths:
+- async_calendar: run_sync + gather_limited on the shared background loop;
+- googleapiclient on a thread pool of MAX_CONCURRENT_REQUESTS per user,
+  each worker with its own httplib2 connection, which is how
+  schedule_events_concurrently sent them before async_calendar.
+
+The thread count printed is the peak seen, including the user threads.
+Not collected by pytest; run it with
+
+    python python_files/tests/bench_async_calendar.py [users] [creates] [latency_ms]
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import google_auth_httplib2
+import httplib2
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# -------------------------------------
+# STUB
+# -------------------------------------
+async def _handle(reader, writer, latency):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            body = json.loads(await reader.readexactly(length)) if length else {}
+            await asyncio.sleep(latency)
+            out = json.dumps(dict(body, id="created")).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(out), out))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+def serve(port, latency):
+    async def main():
+        server = await asyncio.start_server(lambda reader, writer: _handle(reader, writer, latency),
+                                            "127.0.0.1", 0, backlog=1024)
+        port.value = server.sockets[0].getsockname()[1]
+        await server.serve_forever()
+    asyncio.run(main())
+
+def start_stub(latency):
+    """Run the stub in its own process, so it doesn't compete with the client for the GIL"""
+    port = multiprocessing.Value("i", 0)
+    process = multiprocessing.Process(target=serve, args=(port, latency), daemon=True)
+    process.start()
+    while not port.value:
+        time.sleep(0.01)
+    return process, port.value
+
+
+# -------------------------------------
+# CLIENTS
+# -------------------------------------
+def _body(user, index):
+    return {"summary": f"CSE {user}-{index}", "start": {"dateTime": "2026-09-07T09:00:00-06:00"},
+            "end": {"dateTime": "2026-09-07T10:00:00-06:00"}}
+
+def async_user(user, creates):
+    from async_calendar import gather_limited, google_create_event, run_sync
+    calls = [lambda index=index: google_create_event("token", _body(user, index), user_key=f"user{user}")
+             for index in range(creates)]
+    return run_sync(gather_limited(calls), timeout=None)
+
+def thread_pool_user(service, user, creates):
+    from async_calendar import MAX_CONCURRENT_REQUESTS
+    credentials = Credentials(token="token")
+    worker_http = threading.local()
+
+    def execute(request):
+        # httplib2 is not thread-safe, so every worker has its own connection
+        if not hasattr(worker_http, "http"):
+            worker_http.http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=15))
+        return request.execute(http=worker_http.http)
+    requests = [service.events().insert(calendarId="primary", body=_body(user, index)) for index in range(creates)]
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, creates)) as executor:
+        return list(executor.map(execute, requests))
+
+def timed(label, run_user, users, creates):
+    results = [None] * users
+    peak_threads = [threading.active_count()]
+
+    def user_thread(user):
+        results[user] = run_user(user, creates)
+        peak_threads[0] = max(peak_threads[0], threading.active_count())
+    threads = [threading.Thread(target=user_thread, args=(user,)) for user in range(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    assert all(len(result) == creates and all(event["id"] == "created" for event in result) for result in results)
+    total = users * creates
+    print(f"{label:<34} {total / elapsed:8.0f} req/s  {elapsed:6.2f} s total  {peak_threads[0]:4d} threads")
+
+
+def main(users=100, creates=10, latency_ms=50):
+    process, port = start_stub(latency_ms / 1000)
+    base = f"http://127.0.0.1:{port}/calendar/v3"
+    import async_calendar
+    async_calendar.GOOGLE_CALENDAR_BASE = base
+
+    service = build("calendar", "v3", credentials=Credentials(token="token"), static_discovery=True,
+                    cache_discovery=False, client_options={"api_endpoint": f"http://127.0.0.1:{port}"})
+
+    print(f"-- {users} users x {creates} creates, {latency_ms} ms stub latency")
+    for round_name in ("warm-up", "measured"):
+        print(f"-- {round_name}")
+        timed("googleapiclient thread pools", lambda user, count: thread_pool_user(service, user, count),
+              users, creates)
+        timed("async_calendar (gather_limited)", async_user, users, creates)
+    process.terminate()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
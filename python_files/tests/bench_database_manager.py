@@ -0,0 +1,108 @@
+"""Benchmark: database_manager helpers against the connect-per-call code they replaced.
+
+Runs against a throwaway database file in a temporary directory. Not
+collected by pytest; run it with
+
+    python python_files/tests/bench_database_manager.py [section ...]
+
+Sections: pool (pooled connections vs. sqlite3.connect per call), bulk
+(store_events_in_db vs. a store_event_in_db loop at 1k and 10k rows).
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_manager
+
+
+def _event(event_id):
+    return {
+        'event_id': event_id,
+        'class_name': f"CSE {event_id}",
+        'location': "STC 394",
+        'time_slot': "9:00 AM - 10:00 AM",
+        'days': ["Monday", "Wednesday"],
+        'start_date': "2026-09-07",
+        'end_date': "2026-12-15",
+        'created_at': "2026-09-01 09:00:00"
+    }
+
+
+def timed(label, call, count):
+    call()
+    started = time.perf_counter()
+    for _ in range(count):
+        call()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed * 1e6 / count:9.1f} us/call")
+
+
+# -------------------------------------
+# POOL
+# -------------------------------------
+def _unpooled_get_user(user_id):
+    # What every helper did before the pool: open, query, close
+    conn = sqlite3.connect(database_manager.DB_NAME)
+    try:
+        return conn.execute("SELECT user_id, email, name, credentials FROM users WHERE user_id = ?",
+                            (user_id,)).fetchone()
+    finally:
+        conn.close()
+
+def _unpooled_get_events(user_id):
+    conn = sqlite3.connect(database_manager.DB_NAME)
+    try:
+        return [database_manager._row_to_event(row) for row in
+                conn.execute("SELECT * FROM events WHERE user_id = ?", (user_id,)).fetchall()]
+    finally:
+        conn.close()
+
+def bench_pool(count=2000, rows=200):
+    database_manager.store_user("bench", "bench@example.com", "Bench", "{}")
+    database_manager.store_events_in_db([_event(f"pool{index}") for index in range(rows)], "bench")
+    # Measure the query itself, not the read cache in front of it
+    database_manager.cached_read = lambda namespace, user_id, key, load, ttl=None: load()
+
+    print(f"-- pool: {count} calls, {rows} events")
+    timed("get_user, connect per call", lambda: _unpooled_get_user("bench"), count)
+    timed("get_user, pooled", lambda: database_manager.get_user("bench"), count)
+    timed("get_events_from_db(user_id), connect per call", lambda: _unpooled_get_events("bench"), count)
+    timed("get_events_from_db(user_id), pooled", lambda: database_manager.get_events_from_db("bench"), count)
+
+
+# -------------------------------------
+# BULK
+# -------------------------------------
+def _timed_once(label, call):
+    started = time.perf_counter()
+    call()
+    print(f"{label:<44} {(time.perf_counter() - started) * 1e3:9.1f} ms")
+
+def bench_bulk(sizes=(1000, 10000)):
+    for size in sizes:
+        # Fresh ids for each run, so both paths insert rather than skip
+        looped = [_event(f"loop{size}-{index}") for index in range(size)]
+        bulk = [_event(f"bulk{size}-{index}") for index in range(size)]
+        print(f"-- bulk: {size} rows")
+        _timed_once("store_event_in_db, one call per event",
+                    lambda: [database_manager.store_event_in_db(event, "bench") for event in looped])
+        _timed_once("store_events_in_db", lambda: database_manager.store_events_in_db(bulk, "bench"))
+
+
+SECTIONS = {'pool': bench_pool, 'bulk': bench_bulk}
+
+def main(sections):
+    with tempfile.TemporaryDirectory() as directory:
+        database_manager.DB_NAME = os.path.join(directory, "bench.db")
+        database_manager.init_database()
+        for name in sections or SECTIONS:
+            SECTIONS[name]()
+        database_manager.close_all_connections()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
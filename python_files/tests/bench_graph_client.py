@@ -0,0 +1,100 @@
+"""Benchmark: Graph calls over the shared keep-alive pools vs. a new connection per call.
+
+Starts a local HTTPS stub (self-signed certificate made with the openssl
+command-line tool) and times the same GETs sent by graph_request and by
+plain requests.get, which is what the Outlook modules used to do (a new
+TCP and TLS handshake for every call). Not collected by pytest; run it with
+
+    python python_files/tests/bench_graph_client.py [requests] [threads]
+"""
+import json
+import multiprocessing
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.connections.get_lock():
+            self.server.connections.value += 1
+
+    def do_GET(self):
+        out = json.dumps({"id": self.path.rsplit("/", 1)[-1], "subject": "CSE 110"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def serve(cert, key, port, connections):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    server.connections = connections
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    port.value = server.server_port
+    server.serve_forever()
+
+
+def start_https_stub(directory):
+    """Run the stub in its own process, so it doesn't compete with the client for the GIL"""
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                    "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                    "-keyout", key, "-out", cert], check=True, capture_output=True)
+    port, connections = multiprocessing.Value("i", 0), multiprocessing.Value("i", 0)
+    process = multiprocessing.Process(target=serve, args=(cert, key, port, connections), daemon=True)
+    process.start()
+    while not port.value:
+        time.sleep(0.01)
+    return process, port.value, connections, cert
+
+
+def timed(connections, label, call, count, threads):
+    connections.value = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        statuses = list(pool.map(call, range(count)))
+    elapsed = time.perf_counter() - started
+    assert all(status == 200 for status in statuses)
+    print(f"{label:<28} {count / elapsed:8.0f} req/s  {elapsed * 1000 / count:6.2f} ms/req  "
+          f"{connections.value:4d} new connections")
+
+
+def main(count=500, threads=8):
+    with tempfile.TemporaryDirectory() as directory:
+        process, port, connections, cert = start_https_stub(directory)
+        # The shared httpx clients verify against this file (read when they are created)
+        os.environ["SSL_CERT_FILE"] = cert
+        import requests
+        from graph_client import graph_request
+
+        url = f"https://127.0.0.1:{port}/v1.0/me/events"
+        print(f"{count} GETs, {threads} threads, HTTPS on localhost")
+        for round_name in ("warm-up", "measured"):
+            print(f"-- {round_name}")
+            timed(connections, "requests.get per call", lambda index: requests.get(
+                f"{url}/{index}", headers={"Authorization": "Bearer token"}, verify=cert, timeout=15).status_code,
+                count, threads)
+            timed(connections, "graph_request (pooled)", lambda index: graph_request(
+                "GET", f"{url}/{index}", "token").status_code, count, threads)
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
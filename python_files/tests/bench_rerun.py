@@ -0,0 +1,75 @@
+"""Benchmark: Scheduler page rerun latency, full script against each fragment.
+
+Runs scheduler.py under Streamlit's AppTest against a throwaway database
+seeded with one user's events. Not collected by pytest; run it with
+
+    python python_files/tests/bench_rerun.py [events] [reruns]
+
+AppTest always reruns the whole script, so the fragment figures come from
+the page's own timing captions (SHOW_TIMINGS=1). Before the fragments, a
+widget change anywhere cost the full rerun; now a widget inside a
+fragment costs only that fragment's time.
+"""
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["SHOW_TIMINGS"] = "1"
+
+from streamlit.testing.v1 import AppTest
+
+import database_manager
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scheduler.py")
+TIMING = re.compile(r"⏱️ (.+?) took ([\d.]+) ms")
+# Seeding the database outside a script run logs a harmless warning per st.* call
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+
+def _event(index):
+    return {
+        'event_id': f"bench{index}",
+        'class_name': f"CSE {index % 40}",
+        'location': "STC 394",
+        'time_slot': "9:00 AM - 10:00 AM",
+        'days': ["Monday", "Wednesday"],
+        'start_date': "2026-09-07",
+        'end_date': "2026-12-15",
+        'created_at': "2026-09-01 09:00:00"
+    }
+
+
+def main(events=500, reruns=20):
+    with tempfile.TemporaryDirectory() as directory:
+        database_manager.DB_NAME = os.path.join(directory, "bench.db")
+        database_manager.init_database()
+        database_manager.store_user("bench", "bench@example.com", "Bench", "{}")
+        database_manager.store_events_in_db([_event(index) for index in range(events)], "bench")
+
+        app = AppTest.from_file(SCRIPT, default_timeout=30)
+        app.session_state["user_id"] = "bench"
+        app.run()  # Cold run: imports, cache fills
+        walls, captions = [], {}
+        for _ in range(reruns):
+            started = time.perf_counter()
+            app.run()
+            walls.append((time.perf_counter() - started) * 1e3)
+            for caption in app.caption:
+                match = TIMING.search(caption.value)
+                if match:
+                    captions.setdefault(match.group(1), []).append(float(match.group(2)))
+        database_manager.close_all_connections()
+
+    print(f"-- {events} events, median of {reruns} warm reruns")
+    print(f"{'AppTest full rerun (wall clock)':<36} {statistics.median(walls):8.1f} ms")
+    for label, values in captions.items():
+        print(f"{label + ' (in-script)':<36} {statistics.median(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,70 @@
+"""Benchmark: Generate Schedule's first-meeting-date lookup against the pandas scan it replaced.
+
+Not collected by pytest; run it with
+
+    python python_files/tests/bench_schedule_expansion.py [classes] [years]
+
+Defaults to 300 classes with 3 time slots each over 4 years. The old
+loop built the date range and formatted every day's name once per class
+and scanned it again per slot; first_occurrence does date arithmetic.
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recurrence import DAY_NAMES
+from schedule_expansion import first_occurrence
+
+SLOTS_PER_CLASS = 3
+
+
+def _old_generate(begin_date, end_date, class_days):
+    firsts = []
+    for days in class_days:
+        selected_dates = []
+        for single_date in pd.date_range(start=begin_date, end=end_date):
+            if single_date.strftime("%A") in days:
+                selected_dates.append(single_date.strftime("%Y-%m-%d"))
+        for _ in range(SLOTS_PER_CLASS):
+            first = None
+            for single_date in pd.date_range(start=begin_date, end=end_date):
+                if single_date.strftime("%A") in days:
+                    first = single_date.strftime("%Y-%m-%d")
+                    break
+        firsts.append(first)
+    return firsts
+
+def _new_generate(begin_date, end_date, class_days):
+    firsts = []
+    for days in class_days:
+        first = first_occurrence(begin_date, end_date, days)
+        firsts.append(first.strftime("%Y-%m-%d") if first else None)
+    return firsts
+
+def timed(label, call):
+    started = time.perf_counter()
+    result = call()
+    print(f"{label:<36} {(time.perf_counter() - started) * 1e3:10.2f} ms")
+    return result
+
+
+def main(classes=300, years=4):
+    rng = random.Random(0)
+    begin_date = date(2025, 1, 1)
+    end_date = begin_date + timedelta(days=365 * years - 1)
+    class_days = [rng.sample(DAY_NAMES[:5], rng.randint(1, 3)) for _ in range(classes)]
+
+    print(f"-- {classes} classes x {SLOTS_PER_CLASS} slots, {begin_date} .. {end_date}")
+    old = timed("pandas date_range scan", lambda: _old_generate(begin_date, end_date, class_days))
+    new = timed("first_occurrence", lambda: _new_generate(begin_date, end_date, class_days))
+    assert old == new
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
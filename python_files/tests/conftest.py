@@ -0,0 +1,119 @@
+import json
+import os
+import queue
+import sys
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+
+# The app modules are imported by bare name (streamlit runs from python_files/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database_manager
+import google_api_connection_v2
+import retry_policy
+from read_cache import invalidate_all
+
+
+def _event_info(event_id, class_name="CSE 110", start_date="2026-09-07", end_date="2026-12-15"):
+    return {
+        'event_id': event_id,
+        'class_name': class_name,
+        'location': "STC 394",
+        'time_slot': "9:00 AM - 10:00 AM",
+        'days': ["Monday", "Wednesday"],
+        'start_date': start_date,
+        'end_date': end_date,
+        'created_at': "2026-09-01 09:00:00"
+    }
+
+
+@pytest.fixture
+def make_event():
+    """Factory for event dicts as store_events_in_db and the outbox's event_info take them"""
+    return _event_info
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """database_manager pointed at a fresh, fully migrated database file"""
+    monkeypatch.setattr(database_manager, "DB_NAME", str(tmp_path / "scheduled_events.db"))
+    monkeypatch.setattr(database_manager, "_pool", queue.LifoQueue(maxsize=database_manager.POOL_SIZE))
+    monkeypatch.setattr(database_manager, "_schema_ready", False)
+    invalidate_all()
+    database_manager.init_database()
+    yield database_manager
+    database_manager.close_all_connections()
+    invalidate_all()
+
+
+class BatchStub(BaseHTTPRequestHandler):
+    """Calendar batch endpoint: answers every inserted event and counts round trips.
+
+    An event whose summary starts with "throttle" gets a 429 the first time it is seen,
+    one starting with "conflict" always gets a 409 (its ID is taken) and one starting
+    with "invalid" always gets a 400.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server.round_trips.append(self.path)
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+
+        boundary = "batch_stub_boundary"
+        parts = []
+        for part in message.get_payload():
+            content_id = part["Content-ID"].strip("<>")
+            # Each part is a whole HTTP request; the event body follows its blank line
+            event = json.loads(part.get_payload().replace("\r\n", "\n").split("\n\n", 1)[1])
+            with server.lock:
+                if event["summary"].startswith("throttle") and event["summary"] not in server.throttled:
+                    server.throttled.add(event["summary"])
+                    status, payload = "429 Too Many Requests", {"error": {"code": 429, "message": "slow down"}}
+                elif event["summary"].startswith("conflict"):
+                    status, payload = "409 Conflict", {"error": {"code": 409, "message": "duplicate"}}
+                elif event["summary"].startswith("invalid"):
+                    status, payload = "400 Bad Request", {"error": {"code": 400, "message": "bad request"}}
+                else:
+                    server.created += 1
+                    status, payload = "200 OK", dict(event, id=f"stub{server.created}")
+            parts.append(f"--{boundary}\r\nContent-Type: application/http\r\n"
+                         f"Content-ID: <response-{content_id}>\r\n\r\n"
+                         f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n")
+        out = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+@pytest.fixture
+def calendar_service(monkeypatch):
+    """A Calendar service whose requests go to a local batch stub (server.round_trips counts them)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchStub)
+    server.round_trips, server.throttled, server.created, server.lock = [], set(), 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    stub_root = f"http://127.0.0.1:{server.server_port}"
+
+    class LocalHttp(httplib2.Http):
+        def request(self, uri, *args, **kwargs):
+            return super().request(uri.replace("https://www.googleapis.com", stub_root), *args, **kwargs)
+
+    # Retry immediately instead of backing off
+    monkeypatch.setattr(google_api_connection_v2, "backoff_delay", lambda attempt, retry_after=None: 0.0)
+    retry_policy.reset_retry_metrics()
+    service = build("calendar", "v3", http=LocalHttp(), static_discovery=True, cache_discovery=False)
+    yield service, server
+    server.shutdown()
+    server.server_close()
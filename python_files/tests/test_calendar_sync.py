@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import calendar_sync
+from calendar_sync import google_event_to_update, outlook_event_to_update, sync_google_events, sync_outlook_events
+
+
+def _occurrence(occurrence_id, master_id, subject="CSE 110", hour=9, kind="occurrence"):
+    return {"id": occurrence_id, "seriesMasterId": master_id, "subject": subject, "type": kind,
+            "start": {"dateTime": f"2026-09-07T{hour:02d}:00:00.0000000", "timeZone": "America/Denver"},
+            "end": {"dateTime": f"2026-09-07T{hour + 1:02d}:00:00.0000000", "timeZone": "America/Denver"}}
+
+
+def _serve_pages(monkeypatch, pages):
+    """graph_request that answers each delta request with the next page; returns the Prefer headers sent"""
+    remaining, prefers = list(pages), []
+
+    def fake_request(method, url, token, **kwargs):
+        prefers.append(kwargs["headers"]["Prefer"])
+        page = remaining.pop(0)
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: page)
+    monkeypatch.setattr(calendar_sync, "graph_request", fake_request)
+    return prefers
+
+
+def test_google_events_are_listed_and_mapped_in_the_scheduler_zone(temp_db, make_event):
+    temp_db.store_events_in_db([make_event("g1")], "u1")
+    moved = {"id": "g1", "summary": "CSE 110", "recurrence": ["RRULE:FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20261210T235959Z"],
+             "start": {"dateTime": "2026-09-08T20:30:00Z"}, "end": {"dateTime": "2026-09-08T21:45:00Z"}}
+    requests = []
+
+    class Events:
+        def list(self, **params):
+            requests.append(params)
+            return {"items": [moved], "nextSyncToken": "sync-1"}
+    service = SimpleNamespace(events=Events)
+
+    assert sync_google_events(service, "u1", execute=lambda request: request)['updated'] == ["g1"]
+    assert requests[0]["timeZone"] == "America/Denver"
+    # A UTC time (the calendar's own zone may differ) is still stored as Denver wall-clock time
+    update = google_event_to_update(moved)
+    assert (update['time_slot'], update['days'], update['end_date']) == \
+        ("2:30 PM - 3:45 PM", ["Tuesday", "Thursday"], "2026-12-10")
+
+
+def test_utc_times_are_converted_to_the_scheduler_zone():
+    event = {"id": "a", "subject": "CSE 110",
+             "start": {"dateTime": "2026-09-07T15:00:00.0000000", "timeZone": "UTC"},
+             "end": {"dateTime": "2026-09-07T16:15:00.0000000", "timeZone": "UTC"}}
+    assert outlook_event_to_update(event)['time_slot'] == "9:00 AM - 10:15 AM"
+    # Already in the requested zone: taken as sent
+    assert outlook_event_to_update(_occurrence("o1", "a"))['time_slot'] == "9:00 AM - 10:00 AM"
+
+
+def test_removed_occurrences_remove_the_series_once_all_are_gone(temp_db, make_event, monkeypatch):
+    temp_db.store_events_in_db([make_event("master"), make_event("single")], "u1")
+    prefers = _serve_pages(monkeypatch, [
+        {"value": [_occurrence("o1", "master"), _occurrence("o2", "master")],
+         "@odata.deltaLink": "delta-1"},
+        # One occurrence cancelled: the series stays
+        {"value": [{"id": "o1", "@removed": {"reason": "deleted"}}], "@odata.deltaLink": "delta-2"},
+        # The rest of the series and a single event deleted
+        {"value": [{"id": "o2", "@removed": {"reason": "deleted"}},
+                   {"id": "single", "@removed": {"reason": "deleted"}}], "@odata.deltaLink": "delta-3"},
+    ])
+
+    assert sync_outlook_events("token", "u1")['updated'] == ["master"]
+    assert sync_outlook_events("token", "u1")['removed'] == []
+    assert temp_db.count_events(user_id="u1") == 2
+    assert sorted(sync_outlook_events("token", "u1")['removed']) == ["master", "single"]
+    assert temp_db.count_events(user_id="u1") == 0
+    assert all('outlook.timezone="America/Denver"' in prefer for prefer in prefers)
+
+
+def test_a_moved_occurrence_does_not_overwrite_its_series(temp_db, make_event, monkeypatch):
+    temp_db.store_events_in_db([make_event("master")], "u1")
+    _serve_pages(monkeypatch, [
+        {"value": [_occurrence("o1", "master"),
+                   _occurrence("o2", "master", subject="CSE 110 (review)", hour=14, kind="exception")],
+         "@odata.deltaLink": "delta-1"},
+        # The exception alone: nothing to update, but it still counts as seen
+        {"value": [_occurrence("o2", "master", subject="CSE 110 (review)", hour=14, kind="exception")],
+         "@odata.deltaLink": "delta-2"},
+        {"value": [{"id": "o1", "@removed": {"reason": "deleted"}}], "@odata.deltaLink": "delta-3"},
+    ])
+
+    sync_outlook_events("token", "u1")
+    assert sync_outlook_events("token", "u1")['updated'] == []
+    stored = temp_db.get_events_from_db("u1")[0]
+    assert (stored['class_name'], stored['time_slot']) == ("CSE 110", "9:00 AM - 10:00 AM")
+    # o2 is still on the calendar, so removing o1 keeps the series
+    assert sync_outlook_events("token", "u1")['removed'] == []
@@ -0,0 +1,88 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from calendar_model import event_minutes, slot_minutes
+from conflicts import add_to_index, build_conflict_index, find_conflicts
+from recurrence import DAY_NAMES
+
+
+def _event(event_id, days, time_slot, start_date="2026-09-07", end_date="2026-12-15"):
+    return {'event_id': event_id, 'days': days, 'time_slot': time_slot,
+            'start_date': start_date, 'end_date': end_date}
+
+
+def _ids(events):
+    return sorted(event['event_id'] for event in events)
+
+
+def test_touching_slots_do_not_conflict_but_one_shared_minute_does():
+    index = build_conflict_index([_event("a", ["Monday"], "9:00 AM - 10:00 AM")])
+
+    assert find_conflicts(index, ["Monday"], "10:00 AM - 11:00 AM") == []
+    assert find_conflicts(index, ["Monday"], "8:00 AM - 9:00 AM") == []
+    assert _ids(find_conflicts(index, ["Monday"], "9:59 AM - 11:00 AM")) == ["a"]
+    assert _ids(find_conflicts(index, ["Monday"], "8:00 AM - 9:01 AM")) == ["a"]
+    # Containing and contained slots overlap too
+    assert _ids(find_conflicts(index, ["Monday"], "8:00 AM - 11:00 AM")) == ["a"]
+    assert _ids(find_conflicts(index, ["Monday"], "9:15 AM - 9:45 AM")) == ["a"]
+
+
+def test_date_ranges_overlap_inclusively():
+    index = build_conflict_index([_event("a", ["Monday"], "9:00 AM - 10:00 AM", "2026-09-07", "2026-12-15")])
+
+    assert _ids(find_conflicts(index, ["Monday"], "9:00 AM - 10:00 AM", "2026-12-15", "2027-04-30")) == ["a"]
+    assert find_conflicts(index, ["Monday"], "9:00 AM - 10:00 AM", "2026-12-16", "2027-04-30") == []
+    assert find_conflicts(index, ["Monday"], "9:00 AM - 10:00 AM", "2026-01-05", "2026-09-06") == []
+
+
+def test_same_time_on_other_days_does_not_conflict():
+    index = build_conflict_index([_event("mwf", ["Monday", "Wednesday", "Friday"], "9:00 AM - 10:00 AM")])
+
+    assert find_conflicts(index, ["Tuesday", "Thursday"], "9:00 AM - 10:00 AM") == []
+    # Sharing more than one day still lists the event once
+    assert _ids(find_conflicts(index, ["Monday", "Friday"], "9:30 AM - 10:30 AM")) == ["mwf"]
+
+
+def test_accepted_candidates_block_later_ones():
+    index = build_conflict_index([])
+    add_to_index(index, _event("first", ["Tuesday"], "1:00 PM - 2:15 PM"))
+
+    assert _ids(find_conflicts(index, ["Tuesday"], "2:00 PM - 3:00 PM")) == ["first"]
+
+
+def _random_slot(rng):
+    start = rng.randrange(7 * 60, 20 * 60, 5)
+    end = start + rng.choice([50, 75, 110, 170])
+    clock = lambda minutes: f"{(minutes // 60) % 12 or 12}:{minutes % 60:02d} {'AM' if minutes < 720 else 'PM'}"
+    return f"{clock(start)} - {clock(end)}"
+
+
+def _random_event(rng, event_id):
+    first = date(2026, 1, 1) + timedelta(days=rng.randrange(365))
+    last = first + timedelta(days=rng.randrange(150))
+    return _event(event_id, rng.sample(DAY_NAMES, rng.randint(1, 3)), _random_slot(rng),
+                  first.isoformat(), last.isoformat())
+
+
+def _pairwise(events, candidate):
+    """The straightforward check: compare the candidate with every event"""
+    start, end = slot_minutes(candidate['time_slot'])
+    return [event for event in events
+            if set(event['days']) & set(candidate['days'])
+            and event_minutes(event)[0] < end and start < event_minutes(event)[1]
+            and event['start_date'] <= candidate['end_date'] and candidate['start_date'] <= event['end_date']]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_index_matches_a_pairwise_check(seed):
+    rng = random.Random(seed)
+    events = [_random_event(rng, f"e{index}") for index in range(rng.randint(0, 300))]
+    index = build_conflict_index(events)
+
+    for query in range(25):
+        candidate = _random_event(rng, f"q{query}")
+        found = find_conflicts(index, candidate['days'], candidate['time_slot'],
+                               candidate['start_date'], candidate['end_date'])
+        assert _ids(found) == _ids(_pairwise(events, candidate))
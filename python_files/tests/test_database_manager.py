@@ -0,0 +1,49 @@
+import threading
+
+
+def test_store_events_counts_inserts_updates_and_skips(temp_db, make_event):
+    assert temp_db.store_events_in_db([make_event("a"), make_event("b")], "u1") == \
+        {'inserted': 2, 'updated': 0, 'skipped': 0}
+    # "a" changes, "b" is identical, "c" is new
+    assert temp_db.store_events_in_db([make_event("a", "CSE 111"), make_event("b"), make_event("c")], "u1") == \
+        {'inserted': 1, 'updated': 1, 'skipped': 1}
+    # Another user's rows are never overwritten
+    assert temp_db.store_events_in_db([make_event("a", "MATH 112")], "u2") == \
+        {'inserted': 0, 'updated': 0, 'skipped': 1}
+    assert temp_db.count_events() == 3
+
+
+def test_store_events_counts_ignore_concurrent_writers(temp_db, make_event):
+    # Other users writing at the same time don't leak into this batch's counts
+    results = []
+
+    def writer(user):
+        for batch in range(10):
+            results.append(temp_db.store_events_in_db(
+                [make_event(f"{user}-{batch}-{index}") for index in range(20)], user))
+
+    threads = [threading.Thread(target=writer, args=(f"u{user}",)) for user in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result == {'inserted': 20, 'updated': 0, 'skipped': 0} for result in results)
+    assert temp_db.count_events() == 800
+
+
+def test_snapshot_pages_and_counts_in_one_read(temp_db, make_event):
+    temp_db.store_events_in_db([make_event(f"e{index:02d}", "CSE 110" if index % 2 else "MATH 112")
+                                for index in range(12)], "u1")
+    temp_db.store_events_in_db([make_event("other")], "u2")
+
+    first = temp_db.get_events_snapshot("u1", 4, class_name="cse")
+    assert (first['total'], first['matching'], first['has_more']) == (12, 6, True)
+    assert [event['event_id'] for event in first['events']] == ["e01", "e03", "e05", "e07"]
+    last = first['events'][-1]
+    second = temp_db.get_events_snapshot("u1", 4, after=(last['start_date'], last['event_id']), class_name="cse")
+    assert ([event['event_id'] for event in second['events']], second['has_more']) == (["e09", "e11"], False)
+
+    # Counts still come back for an empty page, and a write is seen right away
+    temp_db.delete_event_from_db("e01")
+    empty = temp_db.get_events_snapshot("u1", 4, class_name="no such class")
+    assert (empty['events'], empty['total'], empty['matching']) == ([], 11, 0)
@@ -0,0 +1,63 @@
+import asyncio
+import math
+
+import pytest
+
+import google_api_connection_v2
+import retry_policy
+from google_api_connection_v2 import BATCH_SIZE, insert_events_batch, insert_events_concurrently
+
+
+def _bodies(count, prefix="CSE"):
+    return [{"summary": f"{prefix} {index}", "start": {"dateTime": "2026-09-07T09:00:00-06:00"},
+             "end": {"dateTime": "2026-09-07T10:00:00-06:00"}} for index in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, BATCH_SIZE, BATCH_SIZE + 1, 120])
+def test_inserts_take_one_round_trip_per_batch(calendar_service, count):
+    service, server = calendar_service
+    results = insert_events_batch(service, _bodies(count), user_key=None)
+
+    assert len(server.round_trips) == math.ceil(count / BATCH_SIZE)
+    assert all(path == "/batch/calendar/v3" for path in server.round_trips)
+    # Each result maps back to the body at the same position
+    assert [event["summary"] for event, error in results] == [f"CSE {index}" for index in range(count)]
+    assert all(error is None for event, error in results)
+
+
+def test_only_throttled_items_are_resubmitted(calendar_service):
+    service, server = calendar_service
+    bodies = _bodies(60) + _bodies(3, prefix="throttle")
+    results = insert_events_batch(service, bodies, user_key=None)
+
+    # Two batches for the 63 items, then one more for the three 429s
+    assert len(server.round_trips) == 3
+    assert server.created == 63
+    assert all(event is not None and error is None for event, error in results)
+    metrics = retry_policy.get_retry_metrics()
+    assert metrics["attempts"] == 66
+    assert metrics["retries"] == 3
+
+
+def test_concurrent_inserts_are_bounded_and_ordered(monkeypatch):
+    in_flight, peak = 0, 0
+
+    async def create(token, event_details, calendar_id="primary", user_key=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later items finish first, so completion order differs from input order
+        await asyncio.sleep(0.01 * (20 - int(event_details["summary"].split()[-1])))
+        in_flight -= 1
+        if event_details["summary"].startswith("fail"):
+            raise RuntimeError("insert refused")
+        return {"id": event_details["summary"]}
+    monkeypatch.setattr(google_api_connection_v2, "google_create_event", create)
+    bodies = _bodies(20) + _bodies(1, prefix="fail")
+
+    results = insert_events_concurrently("token", bodies, user_key=None, max_workers=4)
+
+    assert peak == 4
+    assert [event["id"] for event, error in results[:-1]] == [f"CSE {index}" for index in range(20)]
+    event, error = results[-1]
+    assert event is None and isinstance(error, RuntimeError)
@@ -0,0 +1,75 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import retry_policy
+from graph_client import graph_batch, graph_request
+
+
+class GraphStub(BaseHTTPRequestHandler):
+    """Echoes Graph requests and counts the TCP connections it accepts"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _reply(self, status, payload):
+        out = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        self._reply(200, {"path": self.path, "authorization": self.headers["Authorization"]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path.endswith("/$batch"):
+            self._reply(200, {"responses": [{"id": item["id"], "status": 201, "body": {"id": f"graph-{item['id']}"}}
+                                            for item in body["requests"]]})
+        else:
+            self._reply(201, body)
+
+
+@pytest.fixture
+def graph_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GraphStub)
+    server.connections, server.lock = 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_port}/v1.0"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sequential_requests_reuse_one_connection(graph_stub):
+    server, base = graph_stub
+    for index in range(30):
+        response = graph_request("GET", f"{base}/me/events/{index}", "token-1")
+        assert response.status_code == 200
+        assert response.json() == {"path": f"/v1.0/me/events/{index}", "authorization": "Bearer token-1"}
+    assert server.connections == 1
+
+
+def test_graph_batch_splits_at_the_batch_limit(graph_stub, monkeypatch):
+    server, base = graph_stub
+    # "/$batch" resolves against the base URL in async_calendar
+    monkeypatch.setattr("async_calendar.GRAPH_BASE", base)
+    monkeypatch.setattr("graph_client.GRAPH_BASE", base)
+    retry_policy.reset_retry_metrics()
+    operations = [{"method": "POST", "url": "/me/events", "body": {"subject": f"CSE {index}"}} for index in range(45)]
+
+    results = graph_batch("token-1", operations)
+
+    assert sorted(results, key=int) == [str(index) for index in range(45)]
+    assert all(result["status"] == 201 for result in results.values())
+    # 45 operations fit in three $batch calls of at most 20
+    assert retry_policy.get_retry_metrics()["attempts"] == 45 + 3
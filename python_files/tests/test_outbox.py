@@ -0,0 +1,212 @@
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import database_manager
+import outbox
+
+
+def _queue(user_id="u1", event_id="e1"):
+    job_id, queued = outbox.enqueue_job(user_id, [{'op': 'delete', 'event_id': event_id,
+                                                   'payload': {'label': "CSE 110"}}])
+    assert queued == 1
+    return job_id
+
+
+def _status_error(status):
+    request = httpx.Request("DELETE", "https://www.googleapis.com/calendar/v3/calendars/primary/events/e1")
+    return httpx.HTTPStatusError(str(status), request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.fixture
+def claim(temp_db):
+    return lambda now=None: temp_db.claim_outbox_op(time.time() if now is None else now,
+                                                    outbox.LEASE_SECONDS, outbox.MAX_ATTEMPTS)
+
+
+def test_unexpected_error_is_dead_lettered_not_left_running(claim, monkeypatch):
+    # Stored credentials without a refresh_token make google-auth raise ValueError
+    def broken_credentials(user_id, force_refresh=False):
+        raise ValueError("Authorized user info was not in the expected format, missing fields refresh_token.")
+    monkeypatch.setattr(outbox, "get_stored_token", broken_credentials)
+    job_id = _queue()
+
+    outbox._process(claim())
+
+    job = outbox.get_job(job_id)
+    assert (job['dead'], job['running']) == (1, 0)
+    assert job['ops'][0]['last_error'].startswith("ValueError")
+
+
+def test_401_forces_a_token_refresh_and_retries_once(claim, monkeypatch):
+    refreshes = []
+
+    def stored_token(user_id, force_refresh=False):
+        refreshes.append(force_refresh)
+        return ("fresh" if force_refresh else "stale"), None
+
+    async def handler(token, user_key, op):
+        if token == "stale":
+            raise _status_error(401)
+        return {'id': op['event_id']}
+    monkeypatch.setattr(outbox, "get_stored_token", stored_token)
+    monkeypatch.setitem(outbox.HANDLERS, 'delete', handler)
+    job_id = _queue()
+
+    outbox._process(claim())
+
+    assert refreshes == [False, True]
+    assert outbox.get_job(job_id)['done'] == 1
+
+
+def test_a_dead_lettered_delete_can_be_queued_again(claim):
+    first_job = _queue()
+    database_manager.dead_letter_outbox_op(claim()['op_id'], "HttpError 400")
+
+    # Pressing the button again queues a fresh delete instead of "already queued"
+    second_job = _queue()
+    job = outbox.get_job(second_job)
+    assert (job['pending'], job['ops'][0]['attempts']) == (1, 0)
+    assert outbox.get_job(first_job) is None
+    # While that one is pending, a third press is deduplicated
+    assert outbox.enqueue_job("u1", [{'op': 'delete', 'event_id': "e1", 'payload': {'label': "CSE 110"}}])[1] == 0
+
+
+def test_expired_lease_on_the_last_attempt_is_dead_lettered(claim):
+    job_id = _queue()
+    now = time.time()
+    # The worker holding the op dies every time; each expired lease is a new claim
+    for _ in range(outbox.MAX_ATTEMPTS):
+        assert claim(now)['op_id']
+        now += outbox.LEASE_SECONDS + 1
+
+    assert claim(now) is None
+    job = outbox.get_job(job_id)
+    assert (job['dead'], job['running']) == (1, 0)
+    assert job['ops'][0]['attempts'] == outbox.MAX_ATTEMPTS
+
+
+def test_due_creates_are_sent_as_batches(claim, calendar_service, monkeypatch):
+    service, server = calendar_service
+    fallbacks, completion_calls, renewed = [], [], []
+
+    async def single_create(token, user_key, op):
+        # The one-at-a-time path finds the event the 409 says already exists
+        fallbacks.append(op['event_id'])
+        return {'id': op['event_id']}
+
+    def complete_ops(completions):
+        completion_calls.append(len(completions))
+        database_manager.complete_outbox_ops(completions)
+
+    def extend_leases(op_ids, lease_until):
+        renewed.append(list(op_ids))
+        database_manager.extend_outbox_leases(op_ids, lease_until)
+    monkeypatch.setattr(outbox, "get_stored_service", lambda user_id: (service, None))
+    monkeypatch.setattr(outbox, "get_stored_token", lambda user_id, force_refresh=False: ("token", None))
+    monkeypatch.setattr(outbox, "complete_outbox_ops", complete_ops)
+    monkeypatch.setattr(outbox, "extend_outbox_leases", extend_leases)
+    monkeypatch.setitem(outbox.HANDLERS, 'create', single_create)
+    names = [f"CSE {index}" for index in range(59)] + ["invalid 1", "conflict 1"]
+    event_ids = [outbox.new_event_id() for _ in names]
+    job_id, queued = outbox.enqueue_job("u1", [{
+        'op': 'create', 'event_id': event_id,
+        'payload': {'label': name, 'event_details': {'summary': name},
+                    'event_info': {'event_id': event_id, 'class_name': name, 'location': "STC 394",
+                                   'time_slot': "9:00 AM - 10:00 AM", 'days': ["Monday"],
+                                   'start_date': "2026-09-07", 'end_date': "2026-12-15",
+                                   'created_at': "2026-09-01 09:00:00"}}} for name, event_id in zip(names, event_ids)])
+
+    while outbox._run_next():
+        pass
+
+    # 61 creates: a batch of 50 and one of 11, instead of 61 inserts
+    assert len(server.round_trips) == 2
+    # Each batch's created events are recorded in one transaction
+    assert completion_calls == [50, 9]
+    job = outbox.get_job(job_id)
+    assert queued == 61 and (job['done'], job['dead']) == (60, 1)
+    # The 400 is dead-lettered directly; only the 409 goes one at a time, under a renewed lease
+    assert job['ops'][59]['last_error'].startswith("HttpError")
+    assert fallbacks == [event_ids[-1]]
+    assert renewed == [[job['ops'][60]['op_id']]]
+    assert database_manager.count_events(user_id="u1") == 60
+
+
+def test_failed_batch_items_are_classified_without_resending(claim, monkeypatch):
+    sent = []
+
+    async def single_create(token, user_key, op):
+        sent.append(op['event_id'])
+        return {'id': op['event_id']}
+    monkeypatch.setattr(outbox, "get_stored_token", lambda user_id, force_refresh=False: ("token", None))
+    monkeypatch.setitem(outbox.HANDLERS, 'create', single_create)
+    # The whole batch call failed: a connection reset is retried later, not resent one by one
+    monkeypatch.setattr(outbox, "get_stored_service", lambda user_id: (object(), None))
+    monkeypatch.setattr(outbox, "insert_events_batch", lambda service, bodies, user_key: [
+        (None, ConnectionResetError("reset"))] * len(bodies))
+    job_id, _ = outbox.enqueue_job("u1", [{'op': 'create', 'event_id': outbox.new_event_id(),
+                                           'payload': {'label': f"CSE {index}", 'event_details': {},
+                                                       'event_info': {}}} for index in range(3)])
+
+    assert outbox._run_next()
+
+    job = outbox.get_job(job_id)
+    assert (job['pending'], job['running'], sent) == (3, 0, [])
+    assert all(op['last_error'].startswith("ConnectionResetError") for op in job['ops'])
+
+
+def test_delete_occurrence_cancels_only_that_instance(claim, monkeypatch):
+    calls = []
+
+    async def list_instances(token, event_id, user_key=None, **params):
+        calls.append(("instances", event_id, params['originalStart']))
+        return [{'id': f"{event_id}_20260914T150000Z", 'recurringEventId': event_id}]
+
+    async def delete_event(token, event_id, user_key=None):
+        calls.append(("delete", event_id))
+        return True
+    monkeypatch.setattr(outbox, "get_stored_token", lambda user_id, force_refresh=False: ("token", None))
+    monkeypatch.setattr(outbox, "google_list_instances", list_instances)
+    monkeypatch.setattr(outbox, "google_delete_event", delete_event)
+    operation = {'op': 'delete_occurrence', 'event_id': "series1",
+                 'payload': {'label': "CSE 110 on Mon Sep 14", 'original_start': "2026-09-14T09:00:00-06:00"}}
+    job_id, queued = outbox.enqueue_job("u1", [operation])
+    # The same occurrence is only queued once; another one of the series is its own op
+    assert outbox.enqueue_job("u1", [operation])[1] == 0
+    assert outbox.enqueue_job("u1", [dict(operation, payload=dict(
+        operation['payload'], original_start="2026-09-16T09:00:00-06:00"))])[1] == 1
+
+    outbox._process(claim())
+
+    assert calls == [("instances", "series1", "2026-09-14T09:00:00-06:00"),
+                     ("delete", "series1_20260914T150000Z")]
+    assert outbox.get_job(job_id)['done'] == queued == 1
+
+
+def test_finished_operations_are_purged_after_retention(claim, monkeypatch):
+    monkeypatch.setattr(outbox, "get_stored_token", lambda user_id, force_refresh=False: (None, None))
+    monkeypatch.setattr(outbox, "_last_purge", None)
+    done_job = _queue(event_id="e1")
+    dead_job = _queue(event_id="e2")
+    pending_job = _queue(event_id="e3")
+    database_manager.complete_outbox_op(claim(), {'id': "e1"})
+    database_manager.dead_letter_outbox_op(claim()['op_id'], "HttpError 400")
+
+    # Nothing has been finished for RETENTION yet
+    outbox._purge_finished()
+    assert outbox.get_job(done_job) and outbox.get_job(dead_job)
+
+    monkeypatch.setattr(outbox, "datetime", type("Later", (), {
+        "now": staticmethod(lambda: datetime.now() + outbox.RETENTION + timedelta(minutes=1))}))
+    outbox._purge_finished()
+    # At most one purge per PURGE_INTERVAL
+    assert outbox.get_job(done_job)
+    monkeypatch.setattr(outbox, "_last_purge", None)
+    outbox._purge_finished()
+
+    assert outbox.get_job(done_job) is None
+    assert outbox.get_job(dead_job) is None
+    assert outbox.get_job(pending_job)['pending'] == 1
@@ -0,0 +1,82 @@
+import pytest
+
+import database_manager
+
+
+@pytest.fixture
+def events_db(temp_db, make_event, monkeypatch):
+    """A migrated database with a few users' events; every statement run against it is recorded"""
+    for user in range(3):
+        temp_db.store_user(f"user{user}", f"user{user}@example.com", f"user{user}", "{}")
+        temp_db.store_events_in_db([make_event(f"u{user}e{index}", f"CSE {index}", f"2026-0{1 + index % 8}-05")
+                                    for index in range(20)], f"user{user}")
+
+    statements = []
+    open_connection = database_manager._open_connection
+
+    def traced_connection():
+        conn = open_connection()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    # New connections only, so the pooled ones can't record
+    database_manager.close_all_connections()
+    monkeypatch.setattr(database_manager, "_open_connection", traced_connection)
+    return statements
+
+
+def _plans(statements):
+    """EXPLAIN QUERY PLAN detail lines for each recorded statement on the events table"""
+    plans = []
+    with database_manager.get_connection() as conn:
+        conn.set_trace_callback(None)
+        for statement in statements:
+            if " events" in statement and not statement.lstrip().upper().startswith(("BEGIN", "COMMIT", "PRAGMA")):
+                plans.append((statement, [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement)]))
+    assert plans, "no events query was recorded"
+    return plans
+
+
+def _assert_index_search(plans):
+    for statement, details in plans:
+        assert any(detail.startswith("SEARCH events USING") and "INDEX" in detail for detail in details), \
+            f"{statement!r} doesn't search an index: {details}"
+        assert not any(detail.startswith("SCAN events") for detail in details), \
+            f"{statement!r} scans the events table: {details}"
+
+
+def test_per_user_listing_uses_index(events_db):
+    database_manager.get_events_from_db("user1")
+    _assert_index_search(_plans(events_db))
+
+
+def test_per_user_count_uses_index(events_db):
+    database_manager.count_events("user1")
+    _assert_index_search(_plans(events_db))
+
+
+def test_event_id_lookup_uses_primary_key(events_db):
+    database_manager.update_event_in_db("u1e3", {'class_name': "CSE 111", 'location': "STC 394",
+                                                 'days': ["Friday"], 'time_slot': "9:00 AM - 10:00 AM"})
+    database_manager.delete_event_from_db("u1e4")
+    _assert_index_search(_plans(events_db))
+
+
+def test_user_date_range_uses_index(events_db):
+    database_manager.get_events_from_db("user2", start_date="2026-03-01", end_date="2026-04-30")
+    _assert_index_search(_plans(events_db))
+
+
+def test_keyset_page_uses_index_without_sorting(events_db):
+    database_manager.get_events_from_db("user0", limit=5, after=("2026-02-05", "u0e1"))
+    plans = _plans(events_db)
+    _assert_index_search(plans)
+    for statement, details in plans:
+        assert not any("TEMP B-TREE" in detail for detail in details), f"{statement!r} sorts: {details}"
+
+
+def test_manage_snapshot_is_one_indexed_query(events_db):
+    database_manager.get_events_snapshot("user1", 5, after=("2026-02-05", "u1e1"))
+    plans = _plans(events_db)
+    assert len(plans) == 1
+    _assert_index_search(plans)
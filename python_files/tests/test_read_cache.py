@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+import read_cache
+from read_cache import cached_read, get_cache_stats, invalidate_user
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    read_cache.invalidate_all()
+    yield
+    read_cache.invalidate_all()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(read_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _loader(value):
+    """load() that counts its calls"""
+    def load():
+        load.calls += 1
+        return value
+    load.calls = 0
+    return load
+
+
+def test_least_recently_used_entry_is_evicted_first(monkeypatch):
+    monkeypatch.setattr(read_cache, "CACHE_MAX_ENTRIES", 2)
+    loads = {name: _loader(name) for name in "abc"}
+    cached_read("events", "u1", "a", loads["a"])
+    cached_read("events", "u1", "b", loads["b"])
+    # Reading "a" again makes "b" the oldest use
+    cached_read("events", "u1", "a", loads["a"])
+    cached_read("events", "u1", "c", loads["c"])
+
+    # "a" and "c" are still cached; "b" was evicted and loads again
+    for name in "acb":
+        cached_read("events", "u1", name, loads[name])
+    assert {name: load.calls for name, load in loads.items()} == {"a": 1, "b": 2, "c": 1}
+    assert get_cache_stats()["evictions"] == 2
+
+
+def test_entries_expire_after_their_ttl(clock):
+    load = _loader(["e1"])
+    assert cached_read("events", "u1", None, load, ttl=10) == ["e1"]
+    clock[0] += 9.9
+    cached_read("events", "u1", None, load, ttl=10)
+    assert load.calls == 1
+
+    clock[0] += 0.2
+    cached_read("events", "u1", None, load, ttl=10)
+    assert load.calls == 2
+    assert get_cache_stats()["expirations"] == 1
+
+
+def test_a_write_drops_only_that_users_reads_and_all_user_reads():
+    loads = {owner: _loader(owner) for owner in ("u1", "u2", None)}
+    for owner, load in loads.items():
+        cached_read("event_count", owner, None, load)
+
+    invalidate_user("u1")
+
+    for owner, load in loads.items():
+        cached_read("event_count", owner, None, load)
+    assert {owner: load.calls for owner, load in loads.items()} == {"u1": 2, "u2": 1, None: 2}
+
+
+def test_a_load_that_races_a_write_is_not_cached():
+    def load():
+        # The user's data changes while this read is in flight
+        invalidate_user("u1")
+        return "stale"
+    assert cached_read("events", "u1", None, load) == "stale"
+
+    fresh = _loader("fresh")
+    assert cached_read("events", "u1", None, fresh) == "fresh"
+    assert fresh.calls == 1
@@ -0,0 +1,76 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from dateutil.rrule import rruleset, rrulestr
+
+from recurrence import DAY_CODES, expand_occurrences, get_series_occurrences, parse_recurrence
+
+
+def _random_rule(rng):
+    """A random DAILY/WEEKLY RRULE (without the 'RRULE:' prefix) and its dtstart"""
+    dtstart = datetime.combine(date(2026, 1, 1) + timedelta(days=rng.randrange(365)),
+                               time(rng.randrange(24), rng.choice([0, 15, 30, 45])))
+    parts = [f"FREQ={rng.choice(['DAILY', 'WEEKLY'])}"]
+    if rng.random() < 0.6:
+        parts.append(f"INTERVAL={rng.randint(1, 4)}")
+    if rng.random() < 0.7:
+        parts.append("BYDAY=" + ",".join(rng.sample(DAY_CODES, rng.randint(1, 7))))
+    if rng.random() < 0.5:
+        parts.append(f"COUNT={rng.randint(1, 60)}")
+    else:
+        until = dtstart + timedelta(days=rng.randrange(400), hours=rng.randrange(24))
+        parts.append(f"UNTIL={until:%Y%m%dT%H%M%S}")
+    return dtstart, ";".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_expansion_matches_dateutil(seed):
+    rng = random.Random(seed)
+    dtstart, rule = _random_rule(rng)
+    expected = list(rrulestr(rule, dtstart=dtstart))
+
+    assert expand_occurrences(dtstart, rule) == expected, rule
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_exdates_and_window_match_dateutil(seed):
+    rng = random.Random(1000 + seed)
+    dtstart, rule = _random_rule(rng)
+    occurrences = list(rrulestr(rule, dtstart=dtstart))
+    exdates = rng.sample(occurrences, min(len(occurrences), rng.randint(0, 3)))
+    window_start = dtstart + timedelta(days=rng.randrange(60))
+    window_end = window_start + timedelta(days=rng.randrange(1, 120))
+
+    expected_set = rruleset()
+    expected_set.rrule(rrulestr(rule, dtstart=dtstart))
+    for exdate in exdates:
+        expected_set.exdate(exdate)
+    expected = expected_set.between(window_start, window_end, inc=True)
+
+    assert expand_occurrences(dtstart, rule, window_start, window_end, exdates=exdates) == expected, rule
+
+
+def test_google_recurrence_lines_match_dateutil():
+    dtstart = datetime(2026, 9, 7, 9, 0)
+    recurrence = ["RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=20261215T235959Z",
+                  "EXDATE;TZID=America/Denver:20260907T090000,20261123T090000"]
+    rule, exdates = parse_recurrence(recurrence)
+
+    expected_set = rruleset()
+    # dateutil refuses a UTC UNTIL with a naive dtstart; the scheduler writes it as wall-clock time
+    expected_set.rrule(rrulestr("FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=20261215T235959", dtstart=dtstart))
+    for exdate in exdates:
+        expected_set.exdate(exdate)
+
+    assert expand_occurrences(dtstart, rule, exdates=exdates) == list(expected_set)
+
+
+def test_stored_series_matches_dateutil():
+    event = {'time_slot': "1:30 PM - 2:45 PM", 'days': ["Tuesday", "Thursday"],
+             'start_date': "2026-09-08", 'end_date': "2026-12-10"}
+    expected = list(rrulestr("FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20261210T235959",
+                             dtstart=datetime(2026, 9, 8, 13, 30)))
+
+    assert get_series_occurrences(event) == expected
+    assert len(expected) == 28
@@ -0,0 +1,171 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+import retry_policy
+from google_api_connection_v2 import _retry_decision, execute_request
+from retry_policy import MAX_ATTEMPTS, TokenBucket, call_with_retry, get_retry_metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    retry_policy.reset_retry_metrics()
+
+
+def _http_error(status, reason=None, retry_after=None):
+    headers = {"status": str(status)}
+    if retry_after is not None:
+        headers["retry-after"] = retry_after
+    body = {"error": {"code": status, "errors": [{"reason": reason}] if reason else []}}
+    return HttpError(httplib2.Response(headers), json.dumps(body).encode())
+
+
+def _sequence(*outcomes):
+    """send() that raises or returns each outcome in turn"""
+    remaining = list(outcomes)
+
+    def send():
+        outcome = remaining.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return send
+
+
+def _call(send, sleeps, user_key=None):
+    return call_with_retry(send, lambda outcome, error: _retry_decision(error),
+                           user_key=user_key, sleep=sleeps.append)
+
+
+def test_429_and_503_are_retried_honoring_retry_after():
+    sleeps = []
+    result = _call(_sequence(_http_error(429, retry_after="7"), _http_error(503), {"id": "abc"}), sleeps)
+
+    assert result == {"id": "abc"}
+    assert len(sleeps) == 2
+    assert sleeps[0] >= 7
+    assert sleeps[1] <= retry_policy.BASE_DELAY * 2
+    metrics = get_retry_metrics()
+    assert (metrics["attempts"], metrics["retries"], metrics["retry_after_honored"], metrics["gave_up"]) == (3, 2, 1, 0)
+
+
+def test_rate_limit_403_is_retried_but_permission_403_is_not():
+    sleeps = []
+    assert _call(_sequence(_http_error(403, "rateLimitExceeded"), "ok"), sleeps) == "ok"
+
+    with pytest.raises(HttpError):
+        _call(_sequence(_http_error(403, "forbidden")), sleeps)
+    assert len(sleeps) == 1
+    assert get_retry_metrics()["retries"] == 1
+
+
+def test_persistent_5xx_gives_up_after_max_attempts():
+    sleeps = []
+    with pytest.raises(HttpError) as raised:
+        _call(_sequence(*[_http_error(500) for _ in range(MAX_ATTEMPTS)]), sleeps)
+
+    assert raised.value.resp.status == 500
+    assert len(sleeps) == MAX_ATTEMPTS - 1
+    metrics = get_retry_metrics()
+    assert (metrics["attempts"], metrics["retries"], metrics["gave_up"]) == (MAX_ATTEMPTS, MAX_ATTEMPTS - 1, 1)
+
+
+def test_retry_after_http_date_and_bounds():
+    assert retry_policy.parse_retry_after("2") == 2.0
+    assert retry_policy.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_policy.parse_retry_after("100000") == retry_policy.MAX_RETRY_AFTER
+    assert retry_policy.parse_retry_after("soon") is None
+
+
+def test_token_bucket_waits_once_the_burst_is_spent():
+    bucket = TokenBucket(rate=10.0, capacity=3)
+    sleeps = []
+    assert [bucket.acquire(sleep=sleeps.append) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert not sleeps
+    # The fourth request has to wait about one refill interval
+    assert 0 < bucket.try_acquire() <= 0.1
+
+
+
+def test_token_bucket_charges_large_requests_in_full():
+    bucket = TokenBucket(rate=10.0, capacity=10)
+
+    def sleep(seconds):
+        # Refill as if the time had passed
+        bucket._updated -= seconds
+    waited = bucket.acquire(25, sleep=sleep)
+
+    # One burst of 10 is free; the other 15 refill at 10 per second
+    assert waited == pytest.approx(1.5, abs=0.05)
+
+
+def test_limiters_are_bounded_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(retry_policy, "_limiters", {})
+    monkeypatch.setattr(retry_policy, "LIMITER_CACHE_SIZE", 3)
+    first = retry_policy.get_rate_limiter("a")
+    retry_policy.get_rate_limiter("b")
+    retry_policy.get_rate_limiter("c")
+    assert retry_policy.get_rate_limiter("a") is first
+    retry_policy.get_rate_limiter("d")
+
+    assert list(retry_policy._limiters) == ["c", "a", "d"]
+
+
+class FlakyCalendar(BaseHTTPRequestHandler):
+    """events.insert that answers 429 (Retry-After: 0), then 503, then creates the event"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests += 1
+            attempt = self.server.requests
+        if attempt == 1:
+            status, payload, headers = 429, {"error": {"code": 429}}, {"Retry-After": "0"}
+        elif attempt == 2:
+            status, payload, headers = 503, {"error": {"code": 503}}, {}
+        else:
+            status, payload, headers = 200, dict(body, id="created"), {}
+        out = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in dict(headers, **{"Content-Type": "application/json",
+                                            "Content-Length": str(len(out))}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def test_execute_request_against_fake_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyCalendar)
+    server.requests, server.lock = 0, threading.Lock()
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    stub_root = f"http://127.0.0.1:{server.server_port}"
+
+    class LocalHttp(httplib2.Http):
+        def request(self, uri, *args, **kwargs):
+            return super().request(uri.replace("https://www.googleapis.com", stub_root), *args, **kwargs)
+
+    waits = []
+    monkeypatch.setattr(retry_policy, "backoff_delay", lambda attempt, retry_after=None: waits.append(retry_after) or 0.0)
+    try:
+        service = build("calendar", "v3", http=LocalHttp(), static_discovery=True, cache_discovery=False)
+        creds = SimpleNamespace(client_id="test-client", refresh_token="retry-test", token=None)
+        event = execute_request(service.events().insert(calendarId="primary", body={"summary": "CSE 110"}), creds)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert event == {"summary": "CSE 110", "id": "created"}
+    assert server.requests == 3
+    assert waits == [0.0, None]
+    metrics = get_retry_metrics()
+    assert (metrics["attempts"], metrics["retries"], metrics["retry_after_honored"]) == (3, 2, 1)
@@ -0,0 +1,30 @@
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from recurrence import DAY_NAMES
+from schedule_expansion import first_occurrence
+
+
+def _scan(begin_date, end_date, days):
+    """The loop Generate Schedule used before: walk the range until a day matches"""
+    for single_date in pd.date_range(start=begin_date, end=end_date):
+        if single_date.strftime("%A") in days:
+            return single_date.date()
+    return None
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_first_occurrence_matches_a_scan_of_the_range(seed):
+    rng = random.Random(seed)
+    begin_date = date(2026, 1, 1) + timedelta(days=rng.randrange(365))
+    end_date = begin_date + timedelta(days=rng.randrange(10))
+    days = rng.sample(DAY_NAMES, rng.randint(1, 7))
+
+    assert first_occurrence(begin_date, end_date, days) == _scan(begin_date, end_date, days)
+
+
+def test_no_valid_days_has_no_occurrence():
+    assert first_occurrence(date(2026, 9, 7), date(2026, 12, 15), ["Someday"]) is None
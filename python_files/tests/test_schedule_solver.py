@@ -0,0 +1,74 @@
+import itertools
+import random
+import time
+
+import pytest
+
+from calendar_model import TIME_SLOTS
+from schedule_solver import (DEFAULT_PREFERENCES, PATTERNS, _class_options, _day_gaps, blocked_cells,
+                             count_schedules, solve_schedule)
+
+
+def _random_classes(rng):
+    return [{'patterns': rng.sample(list(PATTERNS), rng.randint(1, 3)),
+             'slots': rng.sample(TIME_SLOTS, rng.randint(1, 4))} for _ in range(rng.randint(1, 4))]
+
+
+def _brute_force(classes, blocked, weights):
+    """Score of every distinct conflict-free schedule, by trying every combination"""
+    options = [_class_options(spec, weights) for spec in classes]
+    # Classes with the same placements are interchangeable: swapping them is the same schedule
+    groups = {}
+    for index, class_options in enumerate(options):
+        groups.setdefault(tuple(option[0] for option in class_options), []).append(index)
+    scores = {}
+    placements = 0
+    for combination in itertools.product(*options):
+        used = blocked
+        for mask, _, _, _ in combination:
+            if mask & used:
+                break
+            used |= mask
+        else:
+            placements += 1
+            key = tuple(tuple(sorted(combination[index][0] for index in members)) for members in groups.values())
+            scores[key] = sum(option[1] for option in combination) + weights["gaps"] * _day_gaps(used)
+    return sorted(scores.values()), placements
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_solver_and_count_match_brute_force(seed):
+    rng = random.Random(seed)
+    classes = _random_classes(rng)
+    if rng.random() < 0.3:
+        # Two identical classes exercise the grouping
+        classes.append(dict(classes[0]))
+    blocked = blocked_cells([{'days': rng.sample(list(PATTERNS["MTWThF"]), 2),
+                              'time_slot': rng.choice(TIME_SLOTS)} for _ in range(rng.randint(0, 4))])
+    scores, placements = _brute_force(classes, blocked, DEFAULT_PREFERENCES)
+
+    result = solve_schedule(classes, blocked=blocked, time_limit=None)
+
+    assert result['complete']
+    assert [schedule['score'] for schedule in result['schedules']] == scores[:5]
+    assert count_schedules(classes, blocked) == placements
+    for schedule in result['schedules']:
+        # Every returned schedule is conflict-free and honours each class's choices
+        used = blocked
+        for spec, assignment in zip(classes, schedule['assignments']):
+            assert assignment['time_slot'] in spec['slots']
+            assert assignment['days'] in [PATTERNS[pattern] for pattern in spec['patterns']]
+            mask = blocked_cells([assignment])
+            assert not mask & used
+            used |= mask
+
+
+def test_ten_classes_over_every_slot_solve_within_budget():
+    classes = [{'patterns': patterns} for patterns in [["MWF", "TTh"]] * 4 + [["MWF"]] * 3 + [["TTh"]] * 3]
+
+    started = time.perf_counter()
+    result = solve_schedule(classes, time_limit=None)
+    elapsed = time.perf_counter() - started
+
+    assert result['complete'] and len(result['schedules']) == 5
+    assert elapsed < 1.0